@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional, Set, Tuple
+from app.compression import compress
+from app.metrics import registry
+
+
+class LRUCache:
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class WishlistMembershipCache(LRUCache):
+    """Per-user set of wishlisted product ids, loaded once and kept in sync on add/remove.
+
+    A load runs outside the lock, so a change made while it is reading could be
+    overwritten by its stale result. Each load therefore registers a token, any
+    change for that user drops it, and the result is only cached if the token
+    is still current.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        super().__init__(max_entries)
+        self._loading: Dict[int, object] = {}
+
+    def members(self, user_id: int, load: Callable[[], Iterable[int]]) -> Set[int]:
+        members = self.get(user_id)
+        if members is not None:
+            return members
+        token = object()
+        with self._lock:
+            self._loading[user_id] = token
+        members = frozenset(load())
+        with self._lock:
+            if self._loading.get(user_id) is token:
+                del self._loading[user_id]
+                self._data[user_id] = members
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)
+        return members
+
+    def add(self, user_id: int, product_id: int) -> None:
+        with self._lock:
+            self._loading.pop(user_id, None)
+            members = self._data.get(user_id)
+            if members is not None:
+                self._data[user_id] = members | {product_id}
+
+    def discard(self, user_id: int, product_id: int) -> None:
+        with self._lock:
+            self._loading.pop(user_id, None)
+            members = self._data.get(user_id)
+            if members is not None:
+                self._data[user_id] = members - {product_id}
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._loading.pop(user_id, None)
+            self._data.pop(user_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._loading.clear()
+            self._data.clear()
+
+
+class CachedResponse:
+    __slots__ = ("body", "expires_at", "variants", "_lock")
+
+    def __init__(self, body: bytes, expires_at: float):
+        self.body = body
+        self.expires_at = expires_at
+        self.variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def variant(self, encoding: str) -> bytes:
+        data = self.variants.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self.variants.get(encoding)
+                if data is None:
+                    data = compress(self.body, encoding)
+                    self.variants[encoding] = data
+        return data
+
+
+class ResponseCache(LRUCache):
+    """Rendered response bodies plus their compressed variants, compressed once per encoding."""
+
+    def __init__(self, max_entries: int = 512, ttl: float = 60):
+        super().__init__(max_entries)
+        self.ttl = ttl
+
+    def get_entry(self, key: Hashable) -> Optional[CachedResponse]:
+        entry = self.get(key)
+        if entry is not None and entry.expires_at < time.monotonic():
+            self.invalidate(key)
+            return None
+        return entry
+
+    def put(self, key: Hashable, body: bytes) -> CachedResponse:
+        entry = CachedResponse(body, time.monotonic() + self.ttl)
+        self.set(key, entry)
+        return entry
+
+
+class ProductFragmentCache:
+    """Rendered ProductResponse JSON per product, LRU-bounded by total bytes.
+
+    Entries carry the version tuple they were rendered from and are only
+    served for an identical version. Changes that don't show up in the
+    version, such as seller profile edits, invalidate explicitly.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[int, Tuple[Hashable, int, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, product_id: int, version: Hashable) -> Optional[bytes]:
+        with self._lock:
+            entry = self._data.get(product_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._data.move_to_end(product_id)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, product_id: int, version: Hashable, seller_id: int, data: bytes) -> None:
+        with self._lock:
+            self._pop(product_id)
+            self._data[product_id] = (version, seller_id, data)
+            self.size += len(data)
+            while self.size > self.max_bytes and self._data:
+                _, (_, _, evicted) = self._data.popitem(last=False)
+                self.size -= len(evicted)
+
+    def _pop(self, product_id: int) -> None:
+        entry = self._data.pop(product_id, None)
+        if entry is not None:
+            self.size -= len(entry[2])
+
+    def invalidate(self, product_id: int) -> None:
+        with self._lock:
+            self._pop(product_id)
+
+    def invalidate_seller(self, seller_id: int) -> None:
+        with self._lock:
+            for product_id in [pid for pid, entry in self._data.items() if entry[1] == seller_id]:
+                self._pop(product_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+wishlist_membership = WishlistMembershipCache(max_entries=10000)
+catalog_cache = ResponseCache(max_entries=512, ttl=60)
+product_fragments = ProductFragmentCache(
+    max_bytes=int(os.environ.get("PRODUCT_FRAGMENT_CACHE_BYTES", str(16 * 1024 * 1024)))
+)
+
+registry.track_cache("wishlist_membership", wishlist_membership)
+registry.track_cache("catalog", catalog_cache)
+registry.track_cache("product_fragments", product_fragments)
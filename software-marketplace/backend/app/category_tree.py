@@ -0,0 +1,85 @@
+"""Category hierarchy as a closure table, plus an in-memory slug lookup.
+
+``category_closure`` holds one row per (ancestor, descendant) pair, including
+each category paired with itself at depth 0. "Products in this category or any
+subcategory" is then a single indexed ``IN (SELECT descendant_id ...)``,
+whatever the depth of the tree.
+"""
+import threading
+from typing import Dict, Optional
+from sqlalchemy import func, insert, literal, select
+from sqlalchemy.orm import Session
+from app.models import Category, CategoryClosure, Product, ProductStatus
+
+
+def add_category(db: Session, category: Category) -> None:
+    """Insert closure rows for a newly flushed category; its parent's rows already exist."""
+    db.add(CategoryClosure(ancestor_id=category.id, descendant_id=category.id, depth=0))
+    if category.parent_id:
+        db.execute(insert(CategoryClosure).from_select(
+            ["ancestor_id", "descendant_id", "depth"],
+            select(
+                CategoryClosure.ancestor_id,
+                literal(category.id),
+                CategoryClosure.depth + 1
+            ).where(CategoryClosure.descendant_id == category.parent_id)
+        ))
+
+
+def rebuild(db: Session) -> None:
+    parents = dict(db.query(Category.id, Category.parent_id).all())
+    rows = []
+    for category_id in parents:
+        ancestor_id, depth, seen = category_id, 0, set()
+        while ancestor_id is not None and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            rows.append({"ancestor_id": ancestor_id, "descendant_id": category_id, "depth": depth})
+            ancestor_id, depth = parents.get(ancestor_id), depth + 1
+    db.query(CategoryClosure).delete(synchronize_session=False)
+    db.bulk_insert_mappings(CategoryClosure, rows)
+    db.commit()
+
+
+def in_category(category_id: int):
+    """Filter clause matching products in ``category_id`` or any of its descendants."""
+    return Product.category_id.in_(
+        select(CategoryClosure.descendant_id).where(CategoryClosure.ancestor_id == category_id)
+    )
+
+
+def product_counts(db: Session) -> Dict[int, int]:
+    """Active products per category, each category counting its whole subtree."""
+    return dict(
+        db.query(CategoryClosure.ancestor_id, func.count(Product.id))
+        .join(Product, Product.category_id == CategoryClosure.descendant_id)
+        .filter(Product.status == ProductStatus.ACTIVE)
+        .group_by(CategoryClosure.ancestor_id)
+        .all()
+    )
+
+
+class CategorySlugCache:
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def load(self, db: Session) -> None:
+        ids = dict(db.query(Category.slug, Category.id).all())
+        with self._lock:
+            self._ids = ids
+
+    def add(self, category: Category) -> None:
+        with self._lock:
+            self._ids[category.slug] = category.id
+
+    def resolve(self, db: Session, slug: str) -> Optional[int]:
+        category_id = self._ids.get(slug)
+        if category_id is None:
+            category_id = db.query(Category.id).filter(Category.slug == slug).scalar()
+            if category_id is not None:
+                with self._lock:
+                    self._ids[slug] = category_id
+        return category_id
+
+
+category_slugs = CategorySlugCache()
@@ -0,0 +1,217 @@
+"""Signed, expiring download links for purchased product files.
+
+Sellers upload one file per product. Each upload is stored under a fresh
+version directory, ``<DOWNLOADS_ROOT>/<product_id>/<version>/<filename>``, and
+``Product.download_file`` holds ``<version>/<filename>``. A buyer exchanges an
+order item for a link valid for ``DOWNLOAD_LINK_TTL`` seconds. The token in the
+link carries the user, product, stored file name and expiry, signed with
+HMAC-SHA256. The download route checks the signature and expiry without
+touching the database.
+
+Replacing a product's file does not break links already handed out. The old
+version is removed by a ``downloads.remove_file`` job that runs once every link
+to it has expired.
+
+Files are sent with ``FileResponse``, which answers ``Range`` and ``If-Range``
+requests, so interrupted downloads can resume. It also hands the path to the
+server for zero-copy sending when the server supports the ASGI ``pathsend``
+extension.
+
+``DOWNLOAD_MAX_CONCURRENT`` caps how many downloads one user runs at once, but
+the count is kept in each worker's memory. A user can therefore have up to
+``DOWNLOAD_MAX_CONCURRENT`` x the number of workers transfers in flight,
+because their requests can land on any worker. Set it to the per-user cap
+divided by the worker count when the overall figure matters.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import FileResponse, JSONResponse
+from sqlalchemy.orm import Session
+from starlette.types import Receive, Scope, Send
+from app import jobs
+from app.auth import SECRET_KEY
+from app.models import Product
+
+DOWNLOADS_ROOT = os.environ.get("DOWNLOADS_ROOT", "downloads")
+LINK_TTL = int(os.environ.get("DOWNLOAD_LINK_TTL", "900"))
+# Per user and per worker; see the module docstring.
+MAX_CONCURRENT = int(os.environ.get("DOWNLOAD_MAX_CONCURRENT", "2"))
+MAX_UPLOAD_BYTES = int(os.environ.get("DOWNLOAD_MAX_UPLOAD_BYTES", str(2 * 1024 * 1024 * 1024)))
+SIGNING_KEY = os.environ.get("DOWNLOAD_SIGNING_KEY", SECRET_KEY).encode()
+CHUNK_SIZE = 1024 * 1024
+
+
+class DownloadGrant(NamedTuple):
+    user_id: int
+    product_id: int
+    filename: str
+    expires_at: int
+
+
+def safe_filename(name: Optional[str]) -> Optional[str]:
+    name = os.path.basename((name or "").replace("\\", "/")).strip()
+    if not name or name.startswith("."):
+        return None
+    return name
+
+
+def safe_stored_name(name: str) -> bool:
+    """``<version>/<filename>``, or a bare file name stored before uploads were versioned."""
+    parts = name.split("/")
+    return len(parts) <= 2 and all(safe_filename(part) == part for part in parts)
+
+
+def display_name(stored_name: str) -> str:
+    return stored_name.rsplit("/", 1)[-1]
+
+
+def product_file_path(product_id: int, stored_name: str) -> str:
+    return os.path.join(DOWNLOADS_ROOT, str(product_id), *stored_name.split("/"))
+
+
+async def store_product_file(product_id: int, upload: UploadFile) -> Tuple[str, int]:
+    """Stream an upload into a new version directory; returns (stored name, size)."""
+    filename = safe_filename(upload.filename)
+    if filename is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="A file name is required")
+    version = secrets.token_hex(8)
+    directory = os.path.join(DOWNLOADS_ROOT, str(product_id), version)
+    os.makedirs(directory)
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".upload")
+    size = 0
+    try:
+        with os.fdopen(handle, "wb") as out:
+            while chunk := await upload.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Uploads are limited to {MAX_UPLOAD_BYTES} bytes"
+                    )
+                out.write(chunk)
+        os.replace(temp_path, os.path.join(directory, filename))
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        os.rmdir(directory)
+        raise
+    return f"{version}/{filename}", size
+
+
+def schedule_removal(db: Session, product_id: int, stored_name: str) -> None:
+    """Delete a replaced file after the last link that can name it has expired."""
+    jobs.enqueue(
+        db, "downloads.remove_file", {"product_id": product_id, "file": stored_name},
+        delay=timedelta(seconds=LINK_TTL)
+    )
+
+
+@jobs.handler("downloads.remove_file")
+def remove_file(payload: Dict[str, Any], db: Session) -> None:
+    product_id, stored_name = payload["product_id"], payload["file"]
+    current = db.query(Product.download_file).filter(Product.id == product_id).scalar()
+    if current == stored_name or not safe_stored_name(stored_name):
+        return
+    path = product_file_path(product_id, stored_name)
+    if os.path.exists(path):
+        os.remove(path)
+    if "/" in stored_name:
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+
+
+def _encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(payload: bytes) -> bytes:
+    return hmac.new(SIGNING_KEY, payload, hashlib.sha256).digest()
+
+
+def sign_download(user_id: int, product_id: int, filename: str, ttl: int = LINK_TTL) -> Tuple[str, int]:
+    """Returns (token, expires_at)."""
+    expires_at = int(time.time()) + ttl
+    payload = f"{user_id}:{product_id}:{expires_at}:{filename}".encode()
+    return f"{_encode(payload)}.{_encode(_signature(payload))}", expires_at
+
+
+def verify_download(token: str) -> Optional[DownloadGrant]:
+    try:
+        encoded_payload, encoded_signature = token.split(".", 1)
+        payload = _decode(encoded_payload)
+        if not hmac.compare_digest(_signature(payload), _decode(encoded_signature)):
+            return None
+        user_id, product_id, expires_at, filename = payload.decode().split(":", 3)
+        grant = DownloadGrant(int(user_id), int(product_id), filename, int(expires_at))
+    except ValueError:
+        return None
+    if grant.expires_at < time.time() or not safe_stored_name(grant.filename):
+        return None
+    return grant
+
+
+class DownloadSlots:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._active: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, user_id: int) -> bool:
+        with self._lock:
+            active = self._active.get(user_id, 0)
+            if active >= self.limit:
+                return False
+            self._active[user_id] = active + 1
+            return True
+
+    def release(self, user_id: int) -> None:
+        with self._lock:
+            active = self._active.get(user_id, 0) - 1
+            if active > 0:
+                self._active[user_id] = active
+            else:
+                self._active.pop(user_id, None)
+
+
+download_slots = DownloadSlots(MAX_CONCURRENT)
+
+
+class SlotFileResponse(FileResponse):
+    """FileResponse that holds one of the user's download slots while it is sent.
+
+    The slot is taken when the response starts rather than when the route
+    returns it, so a response that is never sent cannot leak one.
+    """
+
+    def __init__(self, *args, user_id: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.user_id = user_id
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not download_slots.acquire(self.user_id):
+            busy = JSONResponse(
+                {"detail": f"At most {download_slots.limit} downloads can run at once"},
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={"Retry-After": "5"}
+            )
+            await busy(scope, receive, send)
+            return
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            download_slots.release(self.user_id)
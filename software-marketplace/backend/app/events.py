@@ -0,0 +1,229 @@
+"""Entity-change events broadcast to every worker process.
+
+In-process caches subscribe to events by name. ``publish`` runs the local
+handlers straight away, then hands the event to a transport that delivers it to
+the other workers:
+
+- ``local`` (default): single process, nothing to broadcast. Deployments with
+  more than one worker must use ``sqlite`` or ``redis``; startup fails if the
+  worker count from ``WEB_CONCURRENCY`` or a ``--workers`` flag is above one.
+- ``sqlite:///path``: events are appended to a small SQLite table. Every worker
+  polls it every ``EVENT_POLL_INTERVAL`` seconds, so remote staleness is
+  bounded by the poll interval plus handler time.
+- ``redis://...``: Redis pub/sub, if the ``redis`` package is installed.
+
+Choose the transport with ``INVALIDATION_BUS``. ``benchmarks/invalidation_staleness.py``
+measures delivery lag across several processes.
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+from app.metrics import registry
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = float(os.environ.get("EVENT_POLL_INTERVAL", "0.2"))
+RETENTION_SECONDS = 300
+REDIS_CHANNEL = "softmarket:invalidation"
+
+Handler = Callable[[Dict[str, Any]], None]
+
+
+class LocalTransport:
+    def publish(self, message: Dict[str, Any]) -> None:
+        pass
+
+    async def start(self, deliver: Callable[[Dict[str, Any]], None]) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class SQLiteTransport:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._task: Optional[asyncio.Task] = None
+        self._last_id = 0
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, message TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.connection = connection
+        return connection
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        self._connect().execute(
+            "INSERT INTO events (message, created_at) VALUES (?, ?)", (json.dumps(message), time.time())
+        )
+
+    def poll(self) -> List[Dict[str, Any]]:
+        connection = self._connect()
+        rows = connection.execute(
+            "SELECT id, message FROM events WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        if rows:
+            self._last_id = rows[-1][0]
+        return [json.loads(message) for _, message in rows]
+
+    def prune(self) -> None:
+        self._connect().execute("DELETE FROM events WHERE created_at < ?", (time.time() - RETENTION_SECONDS,))
+
+    async def start(self, deliver: Callable[[Dict[str, Any]], None]) -> None:
+        self._last_id = self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+        self._task = asyncio.create_task(self._poll_loop(deliver))
+
+    async def _poll_loop(self, deliver: Callable[[Dict[str, Any]], None]) -> None:
+        polls = 0
+        while True:
+            try:
+                for message in await asyncio.to_thread(self.poll):
+                    await asyncio.to_thread(deliver, message)
+                polls += 1
+                if polls % 1000 == 0:
+                    await asyncio.to_thread(self.prune)
+            except Exception:
+                logger.exception("Failed to poll invalidation events")
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+class RedisTransport:
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("INVALIDATION_BUS is a redis:// URL but the redis package is not installed")
+        self.client = redis.Redis.from_url(url)
+        self._pubsub = None
+        self._thread: Optional[threading.Thread] = None
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        self.client.publish(REDIS_CHANNEL, json.dumps(message))
+
+    async def start(self, deliver: Callable[[Dict[str, Any]], None]) -> None:
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(REDIS_CHANNEL)
+
+        def listen() -> None:
+            for item in self._pubsub.listen():
+                try:
+                    deliver(json.loads(item["data"]))
+                except Exception:
+                    logger.exception("Failed to handle invalidation event")
+
+        self._thread = threading.Thread(target=listen, name="invalidation-bus", daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+
+def create_transport(url: str):
+    if url.startswith("sqlite:///"):
+        return SQLiteTransport(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://")):
+        return RedisTransport(url)
+    return LocalTransport()
+
+
+def configured_workers(argv: Optional[List[str]] = None) -> int:
+    """Worker count from ``WEB_CONCURRENCY`` or a ``--workers``/``-w`` flag of uvicorn, gunicorn or ``fastapi run``."""
+    argv = sys.argv if argv is None else argv
+    value = os.environ.get("WEB_CONCURRENCY")
+    for i, arg in enumerate(argv):
+        if arg.startswith("--workers="):
+            value = arg.split("=", 1)[1]
+        elif arg in ("--workers", "-w") and i + 1 < len(argv):
+            value = argv[i + 1]
+    try:
+        return int(value) if value else 1
+    except ValueError:
+        return 1
+
+
+class InvalidationBus:
+    def __init__(self, transport=None):
+        self.transport = transport or LocalTransport()
+        self.origin = uuid.uuid4().hex
+        self.received = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+
+    def subscribe(self, name: str):
+        def register(handler: Handler) -> Handler:
+            self._handlers[name].append(handler)
+            return handler
+        return register
+
+    def dispatch(self, name: str, payload: Dict[str, Any]) -> None:
+        for handler in self._handlers.get(name, ()):
+            try:
+                handler(payload)
+            except Exception:
+                logger.exception("Invalidation handler for %s failed", name)
+
+    def deliver(self, message: Dict[str, Any]) -> None:
+        if message.get("origin") == self.origin:
+            return
+        lag = max(0.0, time.time() - message["published_at"])
+        self.received += 1
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.dispatch(message["name"], message["payload"])
+
+    def publish(self, name: str, payload: Dict[str, Any], local: bool = True) -> None:
+        """Apply an event here (unless ``local`` is False) and broadcast it to the other workers."""
+        if local:
+            self.dispatch(name, payload)
+        message = {"origin": self.origin, "name": name, "payload": payload, "published_at": time.time()}
+        try:
+            self.transport.publish(message)
+        except Exception:
+            logger.exception("Failed to broadcast invalidation event %s", name)
+
+    async def start(self) -> None:
+        workers = configured_workers()
+        if isinstance(self.transport, LocalTransport) and workers > 1:
+            raise RuntimeError(
+                f"Running {workers} workers with INVALIDATION_BUS=local would leave every worker's caches stale "
+                "after writes in another; set INVALIDATION_BUS to a sqlite:/// or redis:// URL"
+            )
+        await self.transport.start(self.deliver)
+
+    async def stop(self) -> None:
+        await self.transport.stop()
+
+
+bus = InvalidationBus(create_transport(os.environ.get("INVALIDATION_BUS", "local")))
+registry.add_gauge(
+    "invalidation_lag_max_seconds", "Longest delay seen between publishing and applying a remote event.",
+    lambda: bus.max_lag
+)
@@ -0,0 +1,78 @@
+"""Streamed CSV/NDJSON exports.
+
+Responses are produced by a generator that opens its own session, because the
+request's session is closed before a streaming body is sent. Rows are pulled
+with ``yield_per`` and flushed every ``CHUNK_ROWS``, so memory stays flat
+however large the export is.
+"""
+import csv
+import enum
+import io
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CHUNK_ROWS = 500
+YIELD_PER = 1000
+MEDIA_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+RowSource = Callable[[Session], Iterable[Dict[str, Any]]]
+
+
+def export_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _session_rows(source: RowSource) -> Iterator[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        yield from source(db)
+    finally:
+        db.close()
+
+
+def ndjson_chunks(rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    chunk: List[bytes] = []
+    for row in rows:
+        row = {key: export_value(value) for key, value in row.items()}
+        chunk.append(orjson.dumps(row) if orjson else json.dumps(row).encode())
+        if len(chunk) >= CHUNK_ROWS:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+def csv_chunks(columns: List[str], rows: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for count, row in enumerate(rows, 1):
+        writer.writerow({key: export_value(value) for key, value in row.items()})
+        if count % CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def stream_export(source: RowSource, columns: List[str], format: str, filename: str) -> StreamingResponse:
+    rows = _session_rows(source)
+    body = csv_chunks(columns, rows) if format == "csv" else ndjson_chunks(rows)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'}
+    )
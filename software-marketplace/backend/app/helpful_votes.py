@@ -0,0 +1,145 @@
+"""Deduplicated "helpful" votes with batched counter updates.
+
+Each vote is one conflict-ignoring insert into ``review_helpful_votes``, whose
+primary key is (review_id, user_id), so a user counts at most once per review.
+Accepted votes only mark the review dirty in memory. A background task
+recounts the dirty reviews from ``review_helpful_votes`` with a single
+executemany every ``FLUSH_INTERVAL`` seconds, so a popular review is not
+rewritten on every click. Because the flush writes the true count rather
+than adding a per-worker delta, workers cannot double count each other's
+votes, and votes whose flush was lost to a crash are picked up by the next
+vote on that review or by ``recount_all`` at startup.
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Optional, Set
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import Review, ReviewHelpfulVote
+
+logger = logging.getLogger(__name__)
+
+FLUSH_INTERVAL = float(os.environ.get("HELPFUL_FLUSH_INTERVAL", "5"))
+
+_flusher: Optional[asyncio.Task] = None
+
+
+def insert_vote(db: Session, review_id: int, user_id: int) -> bool:
+    """Record a vote; returns False if the user had already voted for this review."""
+    values = {"review_id": review_id, "user_id": user_id}
+    dialect = db.bind.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        result = db.execute(insert(ReviewHelpfulVote).values(**values).on_conflict_do_nothing())
+        return result.rowcount == 1
+    try:
+        with db.begin_nested():
+            db.add(ReviewHelpfulVote(**values))
+        return True
+    except IntegrityError:
+        return False
+
+
+def _vote_count(review_id):
+    return select(func.count()).select_from(ReviewHelpfulVote).where(
+        ReviewHelpfulVote.review_id == review_id
+    ).scalar_subquery()
+
+
+def count_votes(db: Session, review_id: int) -> int:
+    return db.execute(select(_vote_count(review_id))).scalar_one()
+
+
+def recount_all(db: Session) -> int:
+    """Rewrite every review's helpful_count that disagrees with its votes."""
+    reviews = Review.__table__
+    result = db.execute(
+        update(reviews)
+        .where(reviews.c.helpful_count.is_distinct_from(_vote_count(reviews.c.id)))
+        .values(helpful_count=_vote_count(reviews.c.id), updated_at=reviews.c.updated_at)
+    )
+    db.commit()
+    return result.rowcount
+
+
+class HelpfulCountBuffer:
+    def __init__(self):
+        self._dirty: Set[int] = set()
+        self._lock = threading.Lock()
+
+    def add(self, review_id: int) -> None:
+        with self._lock:
+            self._dirty.add(review_id)
+
+    def discard(self, review_id: int) -> None:
+        with self._lock:
+            self._dirty.discard(review_id)
+
+    def flush(self, db: Session) -> int:
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+        reviews = Review.__table__
+        try:
+            db.execute(
+                update(reviews)
+                .where(reviews.c.id == bindparam("review_id_"))
+                .values(helpful_count=_vote_count(bindparam("review_id_")), updated_at=reviews.c.updated_at),
+                [{"review_id_": review_id} for review_id in dirty]
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._dirty |= dirty
+            raise
+        return len(dirty)
+
+
+helpful_counts = HelpfulCountBuffer()
+
+
+def flush_now() -> int:
+    db = SessionLocal()
+    try:
+        return helpful_counts.flush(db)
+    finally:
+        db.close()
+
+
+async def flush_loop() -> None:
+    while True:
+        await asyncio.sleep(FLUSH_INTERVAL)
+        try:
+            await asyncio.to_thread(flush_now)
+        except Exception:
+            logger.exception("Failed to flush helpful vote counts")
+
+
+async def start_flusher() -> None:
+    global _flusher
+    db = SessionLocal()
+    try:
+        corrected = recount_all(db)
+    finally:
+        db.close()
+    if corrected:
+        logger.info("Recounted helpful votes on %s reviews", corrected)
+    _flusher = asyncio.create_task(flush_loop())
+
+
+async def stop_flusher() -> None:
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        await asyncio.gather(_flusher, return_exceptions=True)
+        _flusher = None
+    await asyncio.to_thread(flush_now)
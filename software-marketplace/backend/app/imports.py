@@ -0,0 +1,168 @@
+"""Bulk product import from CSV or NDJSON uploads.
+
+The upload is parsed row by row from the spooled file, so it is never held in
+memory as a whole. Rows are validated against ``ProductCreate`` and inserted in
+batches of ``BATCH_SIZE``. Each batch does one query for category checks, one
+for slug collisions and one transaction. Rows that fail are reported by line
+number and do not abort the rest of the import. Every failure is counted, but
+only the first ``MAX_REPORTED_ERRORS`` are listed in the response.
+
+The whole import is blocking work (file reads, validation, inserts), so the
+route runs it in a worker thread.
+"""
+import codecs
+import csv
+import json
+from typing import Iterator, List, Optional, Set, Tuple
+from fastapi import HTTPException, UploadFile, status
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app import jobs
+from app.events import bus
+from app.models import Category, Product, User
+from app.routers.products import generate_slug
+from app.schemas import ProductCreate, ProductImportError, ProductImportResult
+
+BATCH_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+ParsedRow = Tuple[int, Optional[dict], Optional[str]]
+
+
+def detect_format(upload: UploadFile, format: Optional[str]) -> str:
+    if format:
+        return format
+    filename = (upload.filename or "").lower()
+    content_type = upload.content_type or ""
+    if filename.endswith((".ndjson", ".jsonl")) or "ndjson" in content_type:
+        return "ndjson"
+    if filename.endswith(".csv") or content_type.startswith("text/csv"):
+        return "csv"
+    raise HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Could not detect the file format; pass format=csv or format=ndjson"
+    )
+
+
+def read_rows(upload: UploadFile, format: str) -> Iterator[ParsedRow]:
+    upload.file.seek(0)
+    lines = codecs.getreader("utf-8-sig")(upload.file, errors="replace")
+    if format == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if key and value != ""}, None
+        return
+
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as exc:
+            yield line_number, None, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(data, dict):
+            yield line_number, None, "Expected a JSON object"
+            continue
+        yield line_number, data, None
+
+
+def format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+
+class ImportErrors:
+    def __init__(self, limit: int = MAX_REPORTED_ERRORS):
+        self.limit = limit
+        self.count = 0
+        self.reported: List[ProductImportError] = []
+
+    def add(self, row: int, message: str) -> None:
+        self.count += 1
+        if len(self.reported) < self.limit:
+            self.reported.append(ProductImportError(row=row, message=message))
+
+
+def insert_batch(
+    db: Session,
+    seller: User,
+    batch: List[Tuple[int, ProductCreate]],
+    known_categories: Set[int],
+    errors: ImportErrors
+) -> int:
+    wanted_categories = {data.category_id for _, data in batch if data.category_id} - known_categories
+    if wanted_categories:
+        known_categories.update(
+            category_id for (category_id,) in
+            db.query(Category.id).filter(Category.id.in_(wanted_categories))
+        )
+
+    candidates = {slug for _, data in batch for slug in (data.slug, f"{data.slug}-{seller.id}")}
+    taken = {slug for (slug,) in db.query(Product.slug).filter(Product.slug.in_(candidates))}
+
+    products = []
+    rows = []
+    for row_number, data in batch:
+        if data.category_id and data.category_id not in known_categories:
+            errors.add(row_number, "Category not found")
+            continue
+        slug = data.slug if data.slug not in taken else f"{data.slug}-{seller.id}"
+        if slug in taken:
+            errors.add(row_number, f"Slug '{data.slug}' already exists")
+            continue
+        taken.add(slug)
+        products.append(Product(seller_id=seller.id, **data.model_dump(exclude={"slug"}), slug=slug))
+        rows.append(row_number)
+
+    if not products:
+        return 0
+    db.add_all(products)
+    try:
+        db.flush()
+    except IntegrityError as exc:
+        db.rollback()
+        for row_number in rows:
+            errors.add(row_number, f"Could not be saved: {exc.orig}")
+        return 0
+    db.commit()
+    bus.publish("product.changed", {"ids": [product.id for product in products]})
+    return len(products)
+
+
+def import_products(db: Session, seller: User, upload: UploadFile, format: Optional[str]) -> ProductImportResult:
+    format = detect_format(upload, format)
+    errors = ImportErrors()
+    known_categories: Set[int] = set()
+    batch: List[Tuple[int, ProductCreate]] = []
+    created = 0
+
+    for row_number, data, error in read_rows(upload, format):
+        if error:
+            errors.add(row_number, error)
+            continue
+        if not data.get("slug") and isinstance(data.get("name"), str):
+            data["slug"] = generate_slug(data["name"])
+        try:
+            batch.append((row_number, ProductCreate.model_validate(data)))
+        except ValidationError as exc:
+            errors.add(row_number, format_validation_error(exc))
+            continue
+        if len(batch) >= BATCH_SIZE:
+            created += insert_batch(db, seller, batch, known_categories, errors)
+            batch = []
+    if batch:
+        created += insert_batch(db, seller, batch, known_categories, errors)
+
+    if created:
+        jobs.enqueue(db, "similarity.rebuild", {})
+        db.commit()
+
+    return ProductImportResult(
+        created=created,
+        failed=errors.count,
+        errors=errors.reported,
+        errors_truncated=errors.count > len(errors.reported)
+    )
@@ -0,0 +1,86 @@
+"""Cache invalidation handlers subscribed to the event bus.
+
+The same handlers run in the worker that made a change and in every other
+worker when the event arrives, so each one reloads what it needs from the
+database rather than trusting objects from the publishing request.
+"""
+from typing import Any, Dict
+from sqlalchemy.orm import joinedload
+from app.cache import catalog_cache, product_fragments, wishlist_membership
+from app.category_tree import category_slugs
+from app.database import SessionLocal
+from app.events import bus
+from app.licenses import license_index
+from app.models import Category, Product, User
+from app.recommendations import also_bought
+from app.suggest import suggestions
+
+
+@bus.subscribe("product.changed")
+def on_products_changed(payload: Dict[str, Any]) -> None:
+    product_ids = payload["ids"]
+    catalog_cache.clear()
+    for product_id in product_ids:
+        product_fragments.invalidate(product_id)
+    db = SessionLocal()
+    try:
+        products = db.query(Product).options(joinedload(Product.seller)).filter(Product.id.in_(product_ids)).all()
+        for product in products:
+            suggestions.update_product(product)
+    finally:
+        db.close()
+    for product_id in set(product_ids) - {product.id for product in products}:
+        suggestions.remove_product(product_id)
+
+
+@bus.subscribe("product.deleted")
+def on_products_deleted(payload: Dict[str, Any]) -> None:
+    catalog_cache.clear()
+    for product_id in payload["ids"]:
+        product_fragments.invalidate(product_id)
+        suggestions.remove_product(product_id)
+
+
+@bus.subscribe("seller.changed")
+def on_seller_changed(payload: Dict[str, Any]) -> None:
+    catalog_cache.clear()
+    product_fragments.invalidate_seller(payload["id"])
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.id == payload["id"]).first()
+        if user:
+            suggestions.update_seller(user)
+    finally:
+        db.close()
+
+
+@bus.subscribe("category.changed")
+def on_category_changed(payload: Dict[str, Any]) -> None:
+    catalog_cache.clear()
+    db = SessionLocal()
+    try:
+        category = db.query(Category).filter(Category.id == payload["id"]).first()
+        if category:
+            category_slugs.add(category)
+            suggestions.update_category(category)
+    finally:
+        db.close()
+
+
+@bus.subscribe("review.changed")
+def on_review_changed(payload: Dict[str, Any]) -> None:
+    catalog_cache.clear()
+
+
+@bus.subscribe("wishlist.changed")
+def on_wishlist_changed(payload: Dict[str, Any]) -> None:
+    wishlist_membership.invalidate(payload["user_id"])
+
+
+@bus.subscribe("order.placed")
+def on_order_placed(payload: Dict[str, Any]) -> None:
+    purchased = dict(payload["items"])
+    also_bought.add_order(purchased)
+    for product_id, quantity in purchased.items():
+        suggestions.record_purchase(product_id, quantity)
+    license_index.add(payload["licenses"])
@@ -0,0 +1,196 @@
+"""Durable background jobs stored in the application database.
+
+Jobs are enqueued inside the caller's transaction, so they exist exactly when
+the work that produced them was committed. In-process asyncio workers claim
+them with ``FOR UPDATE SKIP LOCKED`` on PostgreSQL; on SQLite, which has a
+single writer anyway, one process holds a lease and does all the claiming.
+Failed jobs are retried with exponential backoff and marked ``dead`` once
+``max_attempts`` is exhausted.
+"""
+import asyncio
+import json
+import logging
+import os
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models import Job, JobLease, JobStatus
+
+logger = logging.getLogger(__name__)
+
+WORKER_COUNT = int(os.environ.get("JOB_WORKERS", "2"))
+POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", "1.0"))
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_MAX_SECONDS = 600
+LOCK_TIMEOUT = timedelta(minutes=5)
+LEASE_DURATION = timedelta(seconds=30)
+LEASE_NAME = "jobs"
+
+_handlers: Dict[str, Callable[[Dict[str, Any], Session], None]] = {}
+_workers: List[asyncio.Task] = []
+_wakeup: Optional[asyncio.Event] = None
+_process_id = uuid.uuid4().hex[:12]
+
+
+def handler(name: str):
+    def register(func: Callable[[Dict[str, Any], Session], None]):
+        _handlers[name] = func
+        return func
+    return register
+
+
+def enqueue(
+    db: Session, name: str, payload: Dict[str, Any], max_attempts: int = 5, delay: timedelta = timedelta()
+) -> Job:
+    job = Job(name=name, payload=json.dumps(payload), max_attempts=max_attempts, run_at=datetime.utcnow() + delay)
+    db.add(job)
+    return job
+
+
+def notify() -> None:
+    if _wakeup is not None:
+        _wakeup.set()
+
+
+def backoff_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** (attempts - 1), BACKOFF_MAX_SECONDS))
+
+
+def acquire_lease(db: Session) -> bool:
+    now = datetime.utcnow()
+    result = db.execute(
+        update(JobLease)
+        .where(JobLease.name == LEASE_NAME)
+        .where((JobLease.holder == _process_id) | (JobLease.expires_at < now))
+        .values(holder=_process_id, expires_at=now + LEASE_DURATION)
+    )
+    if result.rowcount == 0 and db.get(JobLease, LEASE_NAME) is None:
+        db.add(JobLease(name=LEASE_NAME, holder=_process_id, expires_at=now + LEASE_DURATION))
+        try:
+            db.commit()
+        except Exception:
+            db.rollback()
+            return False
+        return True
+    db.commit()
+    return result.rowcount == 1
+
+
+def claim_next(db: Session, worker_id: str) -> Optional[Job]:
+    now = datetime.utcnow()
+    if db.bind.dialect.name == "postgresql":
+        job = db.query(Job).filter(
+            Job.status == JobStatus.PENDING,
+            Job.run_at <= now
+        ).order_by(Job.run_at).with_for_update(skip_locked=True).first()
+        if job is None:
+            db.rollback()
+            return None
+        job.status = JobStatus.RUNNING
+        job.locked_by = worker_id
+        job.locked_at = now
+        job.attempts += 1
+        db.commit()
+        return job
+
+    if not acquire_lease(db):
+        return None
+    next_id = select(Job.id).where(
+        Job.status == JobStatus.PENDING,
+        Job.run_at <= now
+    ).order_by(Job.run_at).limit(1).scalar_subquery()
+    result = db.execute(
+        update(Job)
+        .where(Job.id == next_id, Job.status == JobStatus.PENDING)
+        .values(status=JobStatus.RUNNING, locked_by=worker_id, locked_at=now, attempts=Job.attempts + 1)
+    )
+    db.commit()
+    if result.rowcount == 0:
+        return None
+    return db.query(Job).filter(
+        Job.status == JobStatus.RUNNING,
+        Job.locked_by == worker_id
+    ).order_by(Job.locked_at.desc()).first()
+
+
+def requeue_stale(db: Session) -> int:
+    count = db.query(Job).filter(
+        Job.status == JobStatus.RUNNING,
+        Job.locked_at < datetime.utcnow() - LOCK_TIMEOUT
+    ).update({Job.status: JobStatus.PENDING, Job.locked_by: None}, synchronize_session=False)
+    db.commit()
+    return count
+
+
+def run_job(db: Session, job: Job) -> None:
+    func = _handlers.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f"No handler registered for job {job.name!r}")
+        func(json.loads(job.payload), db)
+        job.status = JobStatus.COMPLETED
+        job.locked_by = None
+        job.last_error = None
+        db.commit()
+    except Exception:
+        db.rollback()
+        job.last_error = traceback.format_exc()
+        job.locked_by = None
+        if job.attempts >= job.max_attempts:
+            job.status = JobStatus.DEAD
+            logger.error("Job %s (%s) moved to dead letter after %s attempts", job.id, job.name, job.attempts)
+        else:
+            job.status = JobStatus.PENDING
+            job.run_at = datetime.utcnow() + backoff_delay(job.attempts)
+            logger.warning("Job %s (%s) failed, retrying in %s", job.id, job.name, backoff_delay(job.attempts))
+        db.commit()
+
+
+def process_one(worker_id: str) -> bool:
+    db = SessionLocal()
+    try:
+        job = claim_next(db, worker_id)
+        if job is None:
+            return False
+        run_job(db, job)
+        return True
+    finally:
+        db.close()
+
+
+async def worker_loop(worker_id: str) -> None:
+    while True:
+        try:
+            processed = await asyncio.to_thread(process_one, worker_id)
+        except Exception:
+            logger.exception("Job worker %s failed to poll", worker_id)
+            processed = False
+        if not processed:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+
+
+async def start_workers(count: int = WORKER_COUNT) -> None:
+    global _wakeup
+    _wakeup = asyncio.Event()
+    db = SessionLocal()
+    try:
+        requeue_stale(db)
+    finally:
+        db.close()
+    for index in range(count):
+        _workers.append(asyncio.create_task(worker_loop(f"{_process_id}-{index}")))
+
+
+async def stop_workers() -> None:
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,64 @@
+"""In-memory index of issued license keys for ``/licenses/verify``.
+
+Every key from a live order (not cancelled or refunded) is loaded into a dict at
+startup. Checkout adds new keys through the ``order.placed`` event, so other
+workers learn them within the event bus delay. A lookup is a shape check
+followed by one dict probe, and never touches the database.
+
+A Bloom filter in front of the dict would not save anything here. The dict
+already holds every key, and probing k bit positions in Python costs several
+times more than one hash lookup.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.models import Order, OrderItem, OrderStatus
+
+KEY_PREFIX = "LIC-"
+KEY_LENGTH = 21
+REVOKED_STATUSES = (OrderStatus.CANCELLED, OrderStatus.REFUNDED)
+
+
+def normalize_key(key: str) -> Optional[str]:
+    key = key.strip().upper()
+    if len(key) != KEY_LENGTH or not key.startswith(KEY_PREFIX) or key[12] != "-":
+        return None
+    return key
+
+
+class LicenseIndex:
+    def __init__(self):
+        self._products: Dict[str, int] = {}
+
+    def load(self, db: Session) -> None:
+        rows = db.query(OrderItem.license_key, OrderItem.product_id).join(Order).filter(
+            OrderItem.license_key.isnot(None),
+            Order.status.notin_(REVOKED_STATUSES)
+        ).yield_per(10000)
+        self._products = {key: product_id for key, product_id in rows}
+
+    def add(self, licenses: Iterable[Tuple[str, int]]) -> None:
+        for key, product_id in licenses:
+            self._products[key] = product_id
+
+    def lookup(self, key: str) -> Optional[int]:
+        """Product id the key was issued for, or None if it is unknown."""
+        key = normalize_key(key)
+        if key is None:
+            return None
+        return self._products.get(key)
+
+    def verify_many(self, keys: List[str], product_id: Optional[int] = None) -> List[dict]:
+        products = self._products
+        results = []
+        for key in keys:
+            normalized = normalize_key(key)
+            issued_for = products.get(normalized) if normalized is not None else None
+            valid = issued_for is not None and (product_id is None or issued_for == product_id)
+            results.append({"key": key, "valid": valid, "product_id": issued_for if valid else None})
+        return results
+
+    def __len__(self) -> int:
+        return len(self._products)
+
+
+license_index = LicenseIndex()
@@ -1,29 +1,61 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.database import engine, Base, SessionLocal
-from app.routers import auth, categories, products, cart, wishlist, orders, reviews, seller
+from app.responses import FastJSONResponse
+from app.compression import CompressionMiddleware
+from app.metrics import MetricsMiddleware, registry
+from app.profiling import ProfilingMiddleware
+from app.ratelimit import RateLimitMiddleware
+from app.routers import auth, categories, products, cart, wishlist, orders, reviews, seller, media, admin, licenses, downloads
 from app.seed_data import seed_database
+from app import category_tree, helpful_votes, jobs, migrations
+# Imported for its side effect: the module registers the cache invalidation
+# handlers on the event bus.
+from app import invalidation  # noqa: F401
+from app.events import bus
+from app.licenses import license_index
+from app.recommendations import also_bought
+from app.similarity import schedule_initial_build
+from app.suggest import suggestions
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     Base.metadata.create_all(bind=engine)
+    migrations.add_missing_columns(engine)
     db = SessionLocal()
     try:
+        migrations.backfill_order_snapshots(db)
+        migrations.run_data_migrations(db)
         seed_database(db)
+        category_tree.rebuild(db)
+        category_tree.category_slugs.load(db)
+        also_bought.load(db)
+        license_index.load(db)
+        suggestions.load(db)
+        schedule_initial_build(db)
     finally:
         db.close()
+    await bus.start()
+    await jobs.start_workers()
+    await helpful_votes.start_flusher()
     yield
+    await helpful_votes.stop_flusher()
+    await jobs.stop_workers()
+    await bus.stop()
 
 
 app = FastAPI(
     title="SoftMarket API",
     description="A marketplace for software companies to sell their services, tools, and software",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
+app.add_middleware(RateLimitMiddleware)
+
 # Disable CORS. Do not remove this for full-stack development.
 app.add_middleware(
     CORSMiddleware,
@@ -33,6 +65,10 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(ProfilingMiddleware, routes=app.router.routes)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(auth.router)
 app.include_router(categories.router)
 app.include_router(products.router)
@@ -41,6 +77,10 @@ app.include_router(wishlist.router)
 app.include_router(orders.router)
 app.include_router(reviews.router)
 app.include_router(seller.router)
+app.include_router(media.router)
+app.include_router(admin.router)
+app.include_router(licenses.router)
+app.include_router(downloads.router)
 
 
 @app.get("/healthz")
@@ -48,6 +88,11 @@ async def healthz():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/")
 async def root():
     return {
@@ -0,0 +1,224 @@
+"""Content-addressed storage for uploaded images.
+
+Uploads are parsed straight off the request stream, so the body is never
+spooled first. The file part is hashed and written to a temporary file as it
+arrives, with a running size limit, then renamed to ``<root>/<aa>/<sha256>.<ext>``.
+Requests whose Content-Length is already over the limit are refused before any
+of the body is read. Re-uploading the same
+bytes reuses the stored file. Since a path never changes content, files can be
+served with an immutable, year-long Cache-Control.
+
+``thumbnail`` and ``card`` WebP variants are rendered with Pillow in a thread
+pool after upload. A variant missing on disk (an older upload, or a failed
+render) is rendered on its first request. Only rendered variants are served
+with the immutable header; if one cannot be rendered, its URL redirects to the
+original with a short ``FALLBACK_CACHE_CONTROL`` so a later render is picked up.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import HTTPException, Request, status
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+MEDIA_ROOT = os.environ.get("MEDIA_ROOT", "media")
+MAX_UPLOAD_BYTES = int(os.environ.get("MEDIA_MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MULTIPART_OVERHEAD = 16 * 1024
+VARIANTS: Dict[str, Tuple[int, int]] = {"thumbnail": (200, 200), "card": (600, 400)}
+VARIANT_QUALITY = 80
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+FALLBACK_CACHE_CONTROL = "public, max-age=60"
+CONTENT_TYPES = {"jpg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
+
+_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("MEDIA_WORKERS", "2")), thread_name_prefix="media")
+
+
+def sniff_extension(header: bytes) -> Optional[str]:
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header.startswith((b"GIF87a", b"GIF89a")):
+        return "gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def require_image(extension: Optional[str]) -> str:
+    if extension is None:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Only JPEG, PNG, GIF and WebP images are supported"
+        )
+    return extension
+
+
+def original_path(digest: str, extension: str) -> str:
+    return os.path.join(MEDIA_ROOT, digest[:2], f"{digest}.{extension}")
+
+
+def variant_path(digest: str, variant: str) -> str:
+    return os.path.join(MEDIA_ROOT, digest[:2], f"{digest}.{variant}.webp")
+
+
+def find_original(digest: str) -> Optional[str]:
+    """Extension of the stored original for ``digest``, or None if there is none."""
+    for extension in CONTENT_TYPES:
+        if os.path.exists(original_path(digest, extension)):
+            return extension
+    return None
+
+
+def media_urls(digest: str, extension: str) -> Dict[str, str]:
+    urls = {"original": f"/media/{digest}.{extension}"}
+    for variant in VARIANTS:
+        urls[variant] = f"/media/{digest}/{variant}.webp"
+    return urls
+
+
+def render_variants(digest: str, extension: str) -> None:
+    if Image is None:
+        return
+    with Image.open(original_path(digest, extension)) as image:
+        image.load()
+        for variant, size in VARIANTS.items():
+            target = variant_path(digest, variant)
+            if os.path.exists(target):
+                continue
+            resized = image.copy()
+            resized.thumbnail(size)
+            if resized.mode not in ("RGB", "RGBA"):
+                resized = resized.convert("RGBA")
+            handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+            with os.fdopen(handle, "wb") as out:
+                resized.save(out, "WEBP", quality=VARIANT_QUALITY)
+            os.replace(temp_path, target)
+
+
+def too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Uploads are limited to {MAX_UPLOAD_BYTES} bytes"
+    )
+
+
+async def multipart_file(request: Request, field: str = "file") -> AsyncIterator[bytes]:
+    """Yield the bytes of one file field of a multipart body as they arrive."""
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD:
+        raise too_large()
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a multipart/form-data upload")
+
+    headers: Dict[bytes, bytes] = {}
+    header_field: List[bytes] = []
+    header_value: List[bytes] = []
+    pending: List[bytes] = []
+    state = {"in_file": False, "done": False}
+
+    def on_header_field(data: bytes, start: int, end: int) -> None:
+        header_field.append(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int) -> None:
+        header_value.append(data[start:end])
+
+    def on_header_end() -> None:
+        headers[b"".join(header_field).lower()] = b"".join(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished() -> None:
+        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+        state["in_file"] = not state["done"] and options.get(b"name") == field.encode() and b"filename" in options
+        headers.clear()
+
+    def on_part_data(data: bytes, start: int, end: int) -> None:
+        if state["in_file"]:
+            pending.append(data[start:end])
+
+    def on_part_end() -> None:
+        if state["in_file"]:
+            state["in_file"] = False
+            state["done"] = True
+
+    parser = MultipartParser(boundary, {
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    async for chunk in request.stream():
+        parser.write(chunk)
+        for piece in pending:
+            yield piece
+        pending.clear()
+        if state["done"]:
+            return
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"A file field named '{field}' is required")
+
+
+async def store_upload(chunks: AsyncIterator[bytes]) -> Tuple[str, str, int]:
+    """Write streamed upload bytes to content-addressed storage; returns (digest, extension, size)."""
+    os.makedirs(MEDIA_ROOT, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=MEDIA_ROOT, suffix=".upload")
+    digest = hashlib.sha256()
+    size = 0
+    header = b""
+    extension = None
+    try:
+        with os.fdopen(handle, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > MAX_UPLOAD_BYTES:
+                    raise too_large()
+                if extension is None and len(header) < 12:
+                    header += chunk[:12 - len(header)]
+                    if len(header) == 12:
+                        extension = require_image(sniff_extension(header))
+                digest.update(chunk)
+                out.write(chunk)
+        if not header:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Empty upload")
+        if extension is None:
+            extension = require_image(sniff_extension(header))
+
+        target = original_path(digest.hexdigest(), extension)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.exists(target):
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    await ensure_variants(digest.hexdigest(), extension)
+    return digest.hexdigest(), extension, size
+
+
+async def ensure_variants(digest: str, extension: str) -> bool:
+    """Render any missing variants in the thread pool; returns False if that was not possible."""
+    if Image is None:
+        return False
+    try:
+        await asyncio.wrap_future(_executor.submit(render_variants, digest, extension))
+    except Exception:
+        logger.exception("Could not render variants for %s", digest)
+        return False
+    return True
@@ -0,0 +1,261 @@
+"""Process metrics in the Prometheus text format, served at ``/metrics``.
+
+``MetricsMiddleware`` records latency, status and database time per route
+template, so ``/products/{product_id}`` is one series however many ids are
+requested. Route stats are only touched from the event loop thread, so they are
+plain ints and floats without locks. The middleware adds one contextvar set, two
+``perf_counter`` calls and a bisect to each request.
+
+Database time is collected by cursor events and charged to the request that is
+current in the calling context. That also covers work pushed to threads with
+``asyncio.to_thread``. Queries outside a request, such as job workers, count as
+background. Other modules register caches and gauges here at import time.
+Each worker process reports its own numbers.
+
+This module must not import other ``app`` modules, because ``app.database``
+imports it for ``TimedQueuePool``.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, labels: str, lines: List[str]) -> None:
+        prefix = f"{labels}," if labels else ""
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {cumulative}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{suffix} {self.sum}")
+        lines.append(f"{name}_count{suffix} {cumulative}")
+
+
+class RequestTimer:
+    """Database work done on behalf of one request, possibly from several threads."""
+
+    __slots__ = ("db_times",)
+
+    def __init__(self):
+        self.db_times: List[float] = []
+
+
+class RouteStats:
+    __slots__ = ("latency", "db_time", "queries", "statuses")
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.db_time = Histogram(LATENCY_BUCKETS)
+        self.queries = 0
+        self.statuses: Dict[int, int] = {}
+
+
+current_request: ContextVar[Optional[RequestTimer]] = ContextVar("current_request", default=None)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteStats] = {}
+        self.in_flight = 0
+        self.pool_wait = Histogram(POOL_WAIT_BUCKETS)
+        self.background_db_time = 0.0
+        self.background_queries = 0
+        self.caches: Dict[str, object] = {}
+        self.gauges: List[Tuple[str, str, Callable[[], float]]] = []
+        self._lock = threading.Lock()
+
+    def observe_request(self, method: str, route: str, status: int, duration: float, timer: RequestTimer) -> None:
+        stats = self.routes.get((method, route))
+        if stats is None:
+            stats = self.routes[(method, route)] = RouteStats()
+        stats.latency.observe(duration)
+        stats.db_time.observe(sum(timer.db_times))
+        stats.queries += len(timer.db_times)
+        stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def observe_query(self, duration: float) -> None:
+        timer = current_request.get()
+        if timer is not None:
+            timer.db_times.append(duration)
+            return
+        with self._lock:
+            self.background_db_time += duration
+            self.background_queries += 1
+
+    def observe_pool_wait(self, duration: float) -> None:
+        with self._lock:
+            self.pool_wait.observe(duration)
+
+    def track_cache(self, name: str, cache) -> None:
+        """Export ``hits``, ``misses`` and ``len()`` of a cache."""
+        self.caches[name] = cache
+
+    def add_gauge(self, name: str, help: str, read: Callable[[], float]) -> None:
+        self.gauges.append((name, help, read))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        routes = list(self.routes.items())
+
+        lines.append("# HELP http_requests_in_flight Requests currently being handled.")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {self.in_flight}")
+
+        lines.append("# HELP http_requests_total Requests by route and status code.")
+        lines.append("# TYPE http_requests_total counter")
+        for (method, route), stats in routes:
+            for status, count in list(stats.statuses.items()):
+                lines.append(f'http_requests_total{{method="{method}",route="{route}",status="{status}"}} {count}')
+
+        lines.append("# HELP http_request_duration_seconds Request latency by route.")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route), stats in routes:
+            stats.latency.render("http_request_duration_seconds", f'method="{method}",route="{route}"', lines)
+
+        lines.append("# HELP http_request_db_seconds Time spent in database queries per request, by route.")
+        lines.append("# TYPE http_request_db_seconds histogram")
+        for (method, route), stats in routes:
+            stats.db_time.render("http_request_db_seconds", f'method="{method}",route="{route}"', lines)
+
+        lines.append("# HELP http_request_db_queries_total Database queries issued by route.")
+        lines.append("# TYPE http_request_db_queries_total counter")
+        for (method, route), stats in routes:
+            lines.append(f'http_request_db_queries_total{{method="{method}",route="{route}"}} {stats.queries}')
+
+        lines.append("# HELP db_background_seconds_total Time spent in database queries outside requests.")
+        lines.append("# TYPE db_background_seconds_total counter")
+        lines.append(f"db_background_seconds_total {self.background_db_time}")
+        lines.append("# HELP db_background_queries_total Database queries issued outside requests.")
+        lines.append("# TYPE db_background_queries_total counter")
+        lines.append(f"db_background_queries_total {self.background_queries}")
+
+        lines.append("# HELP db_pool_checkout_wait_seconds Time spent waiting for a pooled connection.")
+        lines.append("# TYPE db_pool_checkout_wait_seconds histogram")
+        with self._lock:
+            self.pool_wait.render("db_pool_checkout_wait_seconds", "", lines)
+
+        if self.caches:
+            for metric, kind, help in (
+                ("cache_hits_total", "counter", "Cache lookups that were served from the cache."),
+                ("cache_misses_total", "counter", "Cache lookups that missed."),
+                ("cache_hit_ratio", "gauge", "Hits divided by lookups since startup."),
+                ("cache_entries", "gauge", "Entries currently held."),
+            ):
+                lines.append(f"# HELP {metric} {help}")
+                lines.append(f"# TYPE {metric} {kind}")
+                for name, cache in self.caches.items():
+                    lookups = cache.hits + cache.misses
+                    value = {
+                        "cache_hits_total": cache.hits,
+                        "cache_misses_total": cache.misses,
+                        "cache_hit_ratio": cache.hits / lookups if lookups else 0.0,
+                        "cache_entries": len(cache),
+                    }[metric]
+                    lines.append(f'{metric}{{cache="{name}"}} {value}')
+
+        for name, help, read in self.gauges:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {read()}")
+
+        lines.append("")
+        return "\n".join(lines)
+
+
+registry = MetricsRegistry()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            registry.observe_pool_wait(time.perf_counter() - start)
+
+
+def instrument_engine(engine: Engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        registry.observe_query(time.perf_counter() - conn.info["query_start"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(context):
+        # after_cursor_execute does not fire for a failed statement; pop its
+        # start here so pooled connections do not collect one per error.
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts and context.execution_context is not None:
+            registry.observe_query(time.perf_counter() - starts.pop())
+
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        registry.add_gauge("db_pool_size", "Connections the pool may hold, including overflow.", lambda: capacity)
+        registry.add_gauge("db_pool_checked_out", "Connections currently checked out.", lambda: engine.pool.checkedout())
+        registry.add_gauge(
+            "db_pool_saturation", "Checked-out connections as a fraction of pool capacity.",
+            lambda: engine.pool.checkedout() / capacity
+        )
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        timer = RequestTimer()
+        token = current_request.set(timer)
+        registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            registry.in_flight -= 1
+            current_request.reset(token)
+            route = scope.get("route")
+            registry.observe_request(
+                scope["method"], route.path if route is not None else UNMATCHED_ROUTE, status_code, duration, timer
+            )
@@ -0,0 +1,105 @@
+"""Startup schema upgrades for databases created by an older build.
+
+``Base.metadata.create_all`` creates missing tables but never alters existing
+ones. A database from before a model gained a column would then fail on the
+first query that selects it. ``add_missing_columns`` adds every such column with
+``ALTER TABLE ... ADD COLUMN``. That works for nullable columns and for columns
+with a scalar default, which covers every column added since the first
+release. ``backfill_order_snapshots`` then fills the order item product
+snapshots from the live products for orders placed before they were recorded.
+
+Data conversions that must not run twice are listed in ``DATA_MIGRATIONS`` and
+recorded by name in ``applied_migrations`` once they succeed.
+"""
+import logging
+import math
+from sqlalchemy import Column, DateTime, String, Table, bindparam, func, inspect, literal, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.database import Base
+from app.models import OrderItem, Product, User
+
+logger = logging.getLogger(__name__)
+
+applied_migrations = Table(
+    "applied_migrations",
+    Base.metadata,
+    Column("name", String(100), primary_key=True),
+    Column("applied_at", DateTime, nullable=False, server_default=func.current_timestamp())
+)
+
+
+def add_missing_columns(engine: Engine) -> None:
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                definition = f"{column.name} {column.type.compile(dialect=engine.dialect)}"
+                default = column.default.arg if column.default is not None and column.default.is_scalar else None
+                if default is not None:
+                    value = literal(getattr(default, "name", default))
+                    definition += f" DEFAULT {value.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True})}"
+                elif not column.nullable:
+                    logger.warning("Cannot add NOT NULL column %s.%s without a default", table.name, column.name)
+                    continue
+                connection.exec_driver_sql(f"ALTER TABLE {table.name} ADD COLUMN {definition}")
+                logger.info("Added column %s.%s", table.name, column.name)
+
+
+def backfill_order_snapshots(db: Session) -> None:
+    """Snapshot product details onto order items placed before snapshots existed."""
+    product = select(Product).where(Product.id == OrderItem.product_id)
+    seller_name = select(func.coalesce(func.nullif(User.company_name, ""), User.name)).join(
+        Product, Product.seller_id == User.id
+    ).where(Product.id == OrderItem.product_id)
+    result = db.execute(
+        update(OrderItem).where(
+            OrderItem.product_name.is_(None),
+            OrderItem.product_id.in_(select(Product.id))
+        ).values(
+            product_name=product.with_only_columns(Product.name).scalar_subquery(),
+            product_slug=product.with_only_columns(Product.slug).scalar_subquery(),
+            product_image_url=product.with_only_columns(Product.image_url).scalar_subquery(),
+            license_type=product.with_only_columns(Product.license_type).scalar_subquery(),
+            seller_name=seller_name.scalar_subquery()
+        ).execution_options(synchronize_session=False)
+    )
+    db.commit()
+    if result.rowcount:
+        logger.info("Backfilled product snapshots on %s order items", result.rowcount)
+
+
+def convert_trending_scores(db: Session) -> None:
+    """Turn linear forward-decayed trending scores into their base-2 logs."""
+    products = Product.__table__
+    rows = db.query(Product.id, Product.trending_score).filter(Product.trending_score > 0).all()
+    values = [{"row_id": product_id, "score": math.log2(score)} for product_id, score in rows if math.isfinite(score)]
+    if values:
+        db.execute(
+            update(products).where(products.c.id == bindparam("row_id")).values(
+                trending_score=bindparam("score"), updated_at=products.c.updated_at
+            ),
+            values
+        )
+
+
+DATA_MIGRATIONS = [
+    ("trending_log_scores", convert_trending_scores),
+]
+
+
+def run_data_migrations(db: Session) -> None:
+    applied = {name for (name,) in db.execute(select(applied_migrations.c.name))}
+    for name, migrate in DATA_MIGRATIONS:
+        if name in applied:
+            continue
+        migrate(db)
+        db.execute(applied_migrations.insert().values(name=name))
+        db.commit()
+        logger.info("Applied data migration %s", name)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Boolean, Index, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -40,6 +40,13 @@ class OrderStatus(str, enum.Enum):
     REFUNDED = "refunded"
 
 
+class JobStatus(str, enum.Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    DEAD = "dead"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -77,6 +84,18 @@ class Category(Base):
     products = relationship("Product", back_populates="category")
 
 
+class CategoryClosure(Base):
+    __tablename__ = "category_closure"
+
+    ancestor_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_category_closure_descendant", "descendant_id"),
+    )
+
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -96,15 +115,21 @@ class Product(Base):
     images = Column(Text, nullable=True)
     version = Column(String(50), nullable=True)
     demo_url = Column(String(500), nullable=True)
+    download_file = Column(String(255), nullable=True)
     documentation_url = Column(String(500), nullable=True)
     features = Column(Text, nullable=True)
     requirements = Column(Text, nullable=True)
     is_featured = Column(Boolean, default=False)
     download_count = Column(Integer, default=0)
     view_count = Column(Integer, default=0)
+    trending_score = Column(Float, default=0, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_products_status_trending_score", "status", "trending_score"),
+    )
+
     seller = relationship("User", back_populates="products")
     category = relationship("Category", back_populates="products")
     reviews = relationship("Review", back_populates="product")
@@ -131,6 +156,18 @@ class Review(Base):
     product = relationship("Product", back_populates="reviews")
     user = relationship("User", back_populates="reviews")
 
+    __table_args__ = (
+        Index("ix_reviews_product_helpful_count", "product_id", "helpful_count"),
+    )
+
+
+class ReviewHelpfulVote(Base):
+    __tablename__ = "review_helpful_votes"
+
+    review_id = Column(Integer, ForeignKey("reviews.id"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 
 class Cart(Base):
     __tablename__ = "carts"
@@ -191,6 +228,11 @@ class OrderItem(Base):
     price = Column(Float, nullable=False)
     license_key = Column(String(255), nullable=True)
     download_url = Column(String(500), nullable=True)
+    product_name = Column(String(255), nullable=True)
+    product_slug = Column(String(255), nullable=True)
+    product_image_url = Column(String(500), nullable=True)
+    seller_name = Column(String(255), nullable=True)
+    license_type = Column(SQLEnum(LicenseType), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     order = relationship("Order", back_populates="items")
@@ -207,3 +249,54 @@ class WishlistItem(Base):
 
     user = relationship("User", back_populates="wishlist_items")
     product = relationship("Product", back_populates="wishlist_items")
+
+
+class ProductSimilarity(Base):
+    __tablename__ = "product_similarities"
+
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    similar_product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    rank = Column(Integer, nullable=False)
+    score = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_product_similarities_product_rank", "product_id", "rank"),
+    )
+
+
+class SimilarityBuild(Base):
+    __tablename__ = "similarity_builds"
+
+    id = Column(Integer, primary_key=True, index=True)
+    terms = Column(Text, nullable=False)
+    idf = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    status = Column(SQLEnum(JobStatus), default=JobStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    run_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_by = Column(String(64), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+    )
+
+
+class JobLease(Base):
+    __tablename__ = "job_leases"
+
+    name = Column(String(100), primary_key=True)
+    holder = Column(String(64), nullable=False)
+    expires_at = Column(DateTime, nullable=False)
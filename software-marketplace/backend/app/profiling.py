@@ -0,0 +1,333 @@
+"""On-demand sampling profiler for individual requests.
+
+An admin can profile one request by sending ``X-Profile: 1`` or the query flag
+``_profile=1``. The response carries an ``X-Profile-Id`` header, and the profile
+can be fetched from ``/admin/profiles/{id}`` as collapsed stacks
+(``frame;frame;frame count``). That format feeds ``flamegraph.pl``, speedscope
+or inferno directly.
+
+Setting ``PROFILE_SAMPLE_EVERY=N`` also profiles one in every N requests per
+route, no admin needed. Finished profiles are written as JSON files to
+``PROFILE_DIR``, and the newest ``PROFILE_STORE_SIZE`` are kept. The worker
+that serves ``/admin/profiles`` is rarely the one that took the profile, so the
+directory must be shared by every worker. On several hosts, point it at a shared
+volume.
+
+One sampler thread serves every active profile. Every ``PROFILE_INTERVAL``
+seconds it records one of two stacks for each profiled request. If the
+request's task is running on the event loop, it takes the loop thread's stack.
+If the task is suspended, it takes the task's await chain, ending in an
+``[awaiting]`` frame. Time spent waiting on the database pool or on
+``to_thread`` work therefore shows up under the line that awaited it. Requests
+that are not profiled pay for one header lookup. With sampling enabled they also
+pay for a route match.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+import tempfile
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Optional
+from starlette.datastructures import Headers, QueryParams
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.auth import decode_token
+from app.database import SessionLocal
+from app.models import User, UserRole
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", "0.001"))
+SAMPLE_EVERY = int(os.environ.get("PROFILE_SAMPLE_EVERY", "0"))
+STORE_SIZE = int(os.environ.get("PROFILE_STORE_SIZE", "100"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_ID_RE = re.compile(r"^[0-9a-f]{16}$")
+MAX_DEPTH = 128
+AWAITING_FRAME = "[awaiting]"
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STDLIB_DIR = sysconfig.get_paths()["stdlib"]
+
+
+@lru_cache(maxsize=None)
+def code_label(code) -> str:
+    filename = code.co_filename
+    index = filename.rfind("site-packages" + os.sep)
+    if index != -1:
+        filename = filename[index + len("site-packages" + os.sep):]
+    elif filename.startswith(BASE_DIR):
+        filename = os.path.relpath(filename, BASE_DIR)
+    elif filename.startswith(STDLIB_DIR):
+        filename = os.path.relpath(filename, STDLIB_DIR)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+def frame_label(frame) -> str:
+    return code_label(frame.f_code)
+
+
+def stack_of(frame) -> List[str]:
+    labels = []
+    while frame is not None and len(labels) < MAX_DEPTH:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def await_chain(coroutine) -> List[str]:
+    """Frames of a suspended coroutine and everything it is awaiting, outermost first."""
+    labels = []
+    while coroutine is not None and len(labels) < MAX_DEPTH:
+        frame = getattr(coroutine, "cr_frame", None) or getattr(coroutine, "gi_frame", None)
+        if frame is None:
+            break
+        labels.append(frame_label(frame))
+        coroutine = getattr(coroutine, "cr_await", None) or getattr(coroutine, "gi_yieldfrom", None)
+    return labels
+
+
+class StoredProfile(NamedTuple):
+    id: str
+    method: str
+    path: str
+    route: Optional[str]
+    trigger: str
+    status_code: Optional[int]
+    started_at: float
+    duration: float
+    samples: int
+    collapsed: str
+
+
+class Profile:
+    def __init__(self, method: str, path: str, trigger: str, loop: asyncio.AbstractEventLoop, task: asyncio.Task):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.trigger = trigger
+        self.status_code: Optional[int] = None
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.stacks: Counter = Counter()
+        self.loop = loop
+        self.task = task
+        self.loop_thread = threading.get_ident()
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def sample(self, frames) -> None:
+        loop, task = self.loop, self.task
+        if task is None:
+            return
+        if asyncio.current_task(loop) is task:
+            frame = frames.get(self.loop_thread)
+            if frame is not None:
+                self.stacks[";".join(stack_of(frame))] += 1
+            return
+        labels = await_chain(task.get_coro())
+        labels.append(AWAITING_FRAME)
+        self.stacks[";".join(labels)] += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def stored(self) -> StoredProfile:
+        return StoredProfile(
+            self.id, self.method, self.path, self.route, self.trigger, self.status_code,
+            self.started_at, self.duration, self.samples, self.collapsed()
+        )
+
+
+class Sampler:
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._active: Dict[str, Profile] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self, profile: Profile) -> None:
+        with self._lock:
+            self._active[profile.id] = profile
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+        self._wake.set()
+
+    def stop(self, profile: Profile) -> None:
+        with self._lock:
+            self._active.pop(profile.id, None)
+
+    def _run(self) -> None:
+        while True:
+            if not self._active:
+                self._wake.clear()
+                self._wake.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                profiles = list(self._active.values())
+            if not profiles:
+                continue
+            frames = sys._current_frames()
+            for profile in profiles:
+                try:
+                    profile.sample(frames)
+                except RuntimeError:
+                    # The task resumed while its await chain was being read.
+                    pass
+                except Exception:
+                    # Anything else would repeat every sample; give up on this profile but keep the thread.
+                    logger.exception("Stopped sampling profile %s", profile.id)
+                    self.stop(profile)
+            del frames
+
+
+class ProfileStore:
+    """Finished profiles as JSON files in a directory shared by every worker."""
+
+    def __init__(self, directory: str, max_entries: int):
+        self.directory = directory
+        self.max_entries = max_entries
+
+    def _paths(self) -> List[str]:
+        """Stored profile files, newest first."""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+        paths = [os.path.join(self.directory, name) for name in names]
+        entries = []
+        for path in paths:
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except FileNotFoundError:
+                continue
+        return [path for _, path in sorted(entries, reverse=True)]
+
+    def _read(self, path: str) -> Optional[StoredProfile]:
+        try:
+            with open(path) as handle:
+                return StoredProfile(**json.load(handle))
+        except (FileNotFoundError, ValueError, TypeError):
+            return None
+
+    def add(self, profile: StoredProfile) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "w") as out:
+            json.dump(profile._asdict(), out)
+        os.replace(temp_path, os.path.join(self.directory, f"{profile.id}.json"))
+        for path in self._paths()[self.max_entries:]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def list(self) -> List[StoredProfile]:
+        return [profile for profile in map(self._read, self._paths()) if profile is not None]
+
+    def get(self, profile_id: str) -> Optional[StoredProfile]:
+        if not PROFILE_ID_RE.match(profile_id):
+            return None
+        return self._read(os.path.join(self.directory, f"{profile_id}.json"))
+
+
+sampler = Sampler(SAMPLE_INTERVAL)
+profiles = ProfileStore(PROFILE_DIR, STORE_SIZE)
+
+
+def is_admin(scope: Scope) -> bool:
+    authorization = Headers(scope=scope).get("authorization", "")
+    if not authorization.lower().startswith("bearer "):
+        return False
+    user_id = decode_token(authorization[7:])
+    if user_id is None:
+        return False
+    db = SessionLocal()
+    try:
+        return db.query(User.id).filter(
+            User.id == user_id, User.role == UserRole.ADMIN, User.is_active.is_(True)
+        ).first() is not None
+    finally:
+        db.close()
+
+
+def profile_requested(scope: Scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"x-profile":
+            return value not in (b"", b"0")
+    if b"_profile=" not in scope["query_string"]:
+        return False
+    return QueryParams(scope["query_string"]).get("_profile") not in (None, "", "0")
+
+
+class ProfilingMiddleware:
+    def __init__(self, app: ASGIApp, routes: Optional[list] = None, sample_every: int = SAMPLE_EVERY):
+        self.app = app
+        self.routes = routes if routes is not None else []
+        self.sample_every = sample_every
+        self._counts: Dict[str, int] = {}
+
+    def match_route(self, scope: Scope) -> Optional[str]:
+        for route in self.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return None
+
+    def should_sample(self, scope: Scope) -> bool:
+        route = self.match_route(scope)
+        if route is None:
+            return False
+        key = f"{scope['method']} {route}"
+        count = self._counts.get(key, 0) + 1
+        self._counts[key] = count
+        return count % self.sample_every == 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trigger = None
+        if profile_requested(scope) and await asyncio.to_thread(is_admin, scope):
+            trigger = "requested"
+        elif self.sample_every > 0 and self.should_sample(scope):
+            trigger = "sampled"
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], trigger, asyncio.get_running_loop(), asyncio.current_task())
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        start = time.perf_counter()
+        sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            sampler.stop(profile)
+            profile.duration = time.perf_counter() - start
+            route = scope.get("route")
+            profile.route = route.path if route is not None else None
+            profile.loop = profile.task = None
+            try:
+                await asyncio.to_thread(profiles.add, profile.stored())
+            except OSError:
+                logger.exception("Could not store profile %s", profile.id)
@@ -0,0 +1,224 @@
+"""Token-bucket rate limiting and load shedding for expensive routes.
+
+Only requests matching a ``RateLimitRule`` are checked, so other traffic does no
+extra work. Each rule has its own bucket per client. The client is the user id
+from the bearer token when there is one, otherwise the peer IP. A rejected
+request gets a 429 with ``Retry-After``. Rules can also cap how many matching
+requests run at once; requests over that cap get a 503 straight away instead of
+queueing behind slow work such as bcrypt.
+
+Buckets live in process memory by default. Set ``RATE_LIMIT_DB`` to a SQLite
+file path to share them between workers on the same host. Individual limits can
+be overridden with ``RATE_LIMITS``, for example ``"login=10/60,search=30/10"``,
+where each value is requests per period in seconds.
+"""
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+from starlette.datastructures import Headers, QueryParams
+from starlette.types import ASGIApp, Receive, Scope, Send
+from app.auth import decode_token
+
+MAX_MEMORY_KEYS = 100_000
+PRUNE_EVERY = 1000
+
+
+class RateLimit:
+    def __init__(self, requests: int, period: float, burst: Optional[int] = None):
+        self.rate = requests / period
+        self.burst = burst or requests
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimit":
+        requests, _, period = value.partition("/")
+        return cls(int(requests), float(period or 1))
+
+
+class RateLimitRule:
+    def __init__(
+        self,
+        name: str,
+        method: str,
+        path: str,
+        limit: RateLimit,
+        per_user: bool = False,
+        max_in_flight: Optional[int] = None,
+        when: Optional[Callable[[Scope], bool]] = None
+    ):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.limit = limit
+        self.per_user = per_user
+        self.max_in_flight = max_in_flight
+        self.when = when
+        self.in_flight = 0
+
+    def matches(self, scope: Scope) -> bool:
+        if scope["method"] != self.method or scope["path"].rstrip("/") != self.path:
+            return False
+        return self.when is None or self.when(scope)
+
+
+def has_search(scope: Scope) -> bool:
+    return bool(QueryParams(scope["query_string"]).get("search"))
+
+
+DEFAULT_RULES = [
+    RateLimitRule("login", "POST", "/auth/login", RateLimit(10, 60), max_in_flight=8),
+    RateLimitRule("register", "POST", "/auth/register", RateLimit(5, 300), max_in_flight=4),
+    RateLimitRule("search", "GET", "/products", RateLimit(30, 10), per_user=True, when=has_search),
+    RateLimitRule("suggest", "GET", "/products/suggest", RateLimit(20, 1, burst=40), per_user=True),
+]
+
+
+def configure_rules(rules: List[RateLimitRule], overrides: Optional[str]) -> List[RateLimitRule]:
+    if overrides:
+        by_name = {rule.name: rule for rule in rules}
+        for item in overrides.split(","):
+            name, _, value = item.strip().partition("=")
+            if name in by_name and value:
+                by_name[name].limit = RateLimit.parse(value)
+    return rules
+
+
+class MemoryBucketStore:
+    """Buckets as ``key -> (tokens, updated_at)`` tuples.
+
+    A bucket idle for ``idle_after`` seconds has refilled completely, which is
+    the same as having no entry, so those are dropped once ``max_keys`` is hit.
+    """
+
+    def __init__(self, idle_after: float, max_keys: int = MAX_MEMORY_KEYS):
+        self.idle_after = idle_after
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: RateLimit, now: float) -> float:
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated_at) * limit.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / limit.rate
+            self._buckets[key] = (tokens - 1, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets = {
+                    key: bucket for key, bucket in self._buckets.items() if now - bucket[1] < self.idle_after
+                }
+            return 0.0
+
+
+class SQLiteBucketStore:
+    """Buckets in a local SQLite file so every worker process on the host shares them."""
+
+    def __init__(self, path: str, idle_after: float):
+        self.path = path
+        self.idle_after = idle_after
+        self._takes = 0
+        self._local = threading.local()
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated_at REAL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            self._local.connection = connection
+        return connection
+
+    def take(self, key: str, limit: RateLimit, now: float) -> float:
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT tokens, updated_at FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens, updated_at = row if row else (limit.burst, now)
+            tokens = min(limit.burst, tokens + (now - updated_at) * limit.rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / limit.rate
+            if not wait:
+                tokens -= 1
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, tokens, now)
+            )
+            self._takes += 1
+            if self._takes % PRUNE_EVERY == 0:
+                connection.execute("DELETE FROM buckets WHERE updated_at < ?", (now - self.idle_after,))
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        return wait
+
+
+def client_key(scope: Scope, per_user: bool) -> str:
+    if per_user:
+        authorization = Headers(scope=scope).get("authorization", "")
+        if authorization.lower().startswith("bearer "):
+            user_id = decode_token(authorization[7:])
+            if user_id is not None:
+                return f"user:{user_id}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+async def send_error(send: Send, status_code: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, rules: Optional[List[RateLimitRule]] = None, store=None):
+        self.app = app
+        self.rules = configure_rules(rules or DEFAULT_RULES, os.environ.get("RATE_LIMITS"))
+        if store is None:
+            idle_after = max(rule.limit.burst / rule.limit.rate for rule in self.rules)
+            path = os.environ.get("RATE_LIMIT_DB")
+            store = SQLiteBucketStore(path, idle_after) if path else MemoryBucketStore(idle_after)
+        self.store = store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        rule = next((rule for rule in self.rules if rule.matches(scope)), None)
+        if rule is None:
+            await self.app(scope, receive, send)
+            return
+
+        if rule.max_in_flight is not None and rule.in_flight >= rule.max_in_flight:
+            await send_error(send, 503, "Server busy, please retry", 1)
+            return
+
+        key = f"{rule.name}:{client_key(scope, rule.per_user)}"
+        if isinstance(self.store, MemoryBucketStore):
+            wait = self.store.take(key, rule.limit, time.time())
+        else:
+            wait = await asyncio.to_thread(self.store.take, key, rule.limit, time.time())
+        if wait:
+            await send_error(send, 429, "Too many requests", wait)
+            return
+
+        rule.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            rule.in_flight -= 1
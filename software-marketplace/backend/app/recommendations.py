@@ -0,0 +1,61 @@
+import heapq
+import threading
+from collections import defaultdict
+from itertools import groupby
+from typing import Dict, Iterable, Tuple
+from sqlalchemy.orm import Session
+from app.models import OrderItem
+
+TOP_K = 20
+
+
+class CoPurchaseIndex:
+    """Sparse product co-occurrence counts with a precomputed top-K neighbor tuple per product.
+
+    Counts are only touched when an order is added; reads return the cached
+    neighbor tuple and never hit the database.
+    """
+
+    def __init__(self, top_k: int = TOP_K):
+        self.top_k = top_k
+        self._counts: Dict[int, Dict[int, int]] = defaultdict(dict)
+        self._neighbors: Dict[int, Tuple[int, ...]] = {}
+        self._lock = threading.Lock()
+
+    def _rank(self, product_id: int) -> Tuple[int, ...]:
+        row = self._counts[product_id]
+        best = heapq.nsmallest(self.top_k, row.items(), key=lambda pair: (-pair[1], pair[0]))
+        return tuple(other_id for other_id, _ in best)
+
+    def _add(self, product_ids: Iterable[int], rank: bool = True) -> None:
+        ids = set(product_ids)
+        if len(ids) < 2:
+            return
+        for product_id in ids:
+            row = self._counts[product_id]
+            for other_id in ids:
+                if other_id != product_id:
+                    row[other_id] = row.get(other_id, 0) + 1
+        if rank:
+            for product_id in ids:
+                self._neighbors[product_id] = self._rank(product_id)
+
+    def add_order(self, product_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._add(product_ids)
+
+    def load(self, db: Session) -> None:
+        rows = db.query(OrderItem.order_id, OrderItem.product_id).order_by(OrderItem.order_id).yield_per(10000)
+        with self._lock:
+            self._counts.clear()
+            self._neighbors.clear()
+            for _, items in groupby(rows, key=lambda row: row[0]):
+                self._add((product_id for _, product_id in items), rank=False)
+            for product_id in self._counts:
+                self._neighbors[product_id] = self._rank(product_id)
+
+    def neighbors(self, product_id: int, limit: int) -> Tuple[int, ...]:
+        return self._neighbors.get(product_id, ())[:limit]
+
+
+also_bought = CoPurchaseIndex()
@@ -0,0 +1,82 @@
+from typing import Any, Optional
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
+import pydantic_core
+from app.cache import CachedResponse, ResponseCache
+from app.compression import MINIMUM_SIZE, negotiate_encoding
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _is_model_payload(content: Any) -> bool:
+    if isinstance(content, BaseModel):
+        return True
+    return isinstance(content, list) and bool(content) and isinstance(content[0], BaseModel)
+
+
+class JSONFragment:
+    """Already-rendered JSON that `render_json` splices in verbatim."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+
+def render_json(content: Any) -> bytes:
+    """Render dicts/lists that may contain `JSONFragment`s without re-encoding the fragments."""
+    if isinstance(content, JSONFragment):
+        return content.data
+    if isinstance(content, dict):
+        return b"{" + b",".join(
+            pydantic_core.to_json(str(key)) + b":" + render_json(value) for key, value in content.items()
+        ) + b"}"
+    if isinstance(content, (list, tuple)):
+        return b"[" + b",".join(render_json(item) for item in content) + b"]"
+    return pydantic_core.to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, or straight from Pydantic's serializer for models.
+
+    Handlers on trusted paths return this directly with an already-validated
+    model, which skips FastAPI's response_model re-validation and the
+    intermediate dict/`json.dumps` pass. Bytes from `render_json` are sent as is.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        if _is_model_payload(content) or orjson is None:
+            return pydantic_core.to_json(content)
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def response_cache_key(request: Request) -> str:
+    return request.url.path + "?" + "&".join(sorted(request.url.query.split("&")))
+
+
+def render_cached(request: Request, entry: CachedResponse) -> Response:
+    headers = {"Vary": "Accept-Encoding"}
+    if len(entry.body) >= MINIMUM_SIZE:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            return Response(entry.variant(encoding), media_type="application/json", headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+def cached_response(request: Request, cache: ResponseCache) -> Optional[Response]:
+    entry = cache.get_entry(response_cache_key(request))
+    if entry is None:
+        return None
+    return render_cached(request, entry)
+
+
+def cache_response(request: Request, cache: ResponseCache, content: Any) -> Response:
+    entry = cache.put(response_cache_key(request), FastJSONResponse(content).body)
+    return render_cached(request, entry)
@@ -0,0 +1,53 @@
+import asyncio
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from typing import List
+from app.models import User, UserRole
+from app.schemas import ProfileSummary
+from app.auth import get_current_user
+from app.profiling import StoredProfile, profiles
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
+
+def profile_summary(profile: StoredProfile) -> ProfileSummary:
+    return ProfileSummary(
+        id=profile.id,
+        method=profile.method,
+        path=profile.path,
+        route=profile.route,
+        trigger=profile.trigger,
+        status_code=profile.status_code,
+        started_at=datetime.utcfromtimestamp(profile.started_at),
+        duration_ms=round(profile.duration * 1000, 3),
+        samples=profile.samples
+    )
+
+
+@router.get("/profiles", response_model=List[ProfileSummary])
+async def list_profiles(current_user: User = Depends(require_admin)):
+    return [profile_summary(profile) for profile in await asyncio.to_thread(profiles.list)]
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, current_user: User = Depends(require_admin)):
+    profile = await asyncio.to_thread(profiles.get, profile_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return PlainTextResponse(
+        profile.collapsed,
+        headers={"Content-Disposition": f'attachment; filename="{profile.id}.collapsed"'}
+    )
@@ -4,6 +4,7 @@ from app.database import get_db
 from app.models import User, UserRole
 from app.schemas import UserCreate, UserLogin, UserResponse, UserUpdate, Token
 from app.auth import get_password_hash, verify_password, create_access_token, get_current_user
+from app.events import bus
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
@@ -73,6 +74,7 @@ async def update_me(
     
     db.commit()
     db.refresh(current_user)
+    bus.publish("seller.changed", {"id": current_user.id})
     return current_user
 
 
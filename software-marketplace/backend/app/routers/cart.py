@@ -1,72 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from typing import List
 from app.database import get_db
-from app.models import Cart, CartItem, Product, ProductStatus, User, Review
-from app.schemas import CartItemCreate, CartItemUpdate, CartItemResponse, CartResponse, ProductResponse, SellerInfo, CategoryResponse
+from app.models import Cart, CartItem, Product, ProductStatus, User
+from app.schemas import CartItemCreate, CartItemUpdate, CartItemResponse, CartResponse, CartPatchRequest
+from app.serializers import get_review_stats, get_product_with_stats, get_product_fragment
+from app.responses import FastJSONResponse, render_json
 from app.auth import get_current_user
 
 router = APIRouter(prefix="/cart", tags=["Shopping Cart"])
 
 
-def get_product_response(product: Product, db: Session) -> ProductResponse:
-    avg_rating = db.query(func.avg(Review.rating)).filter(Review.product_id == product.id).scalar() or 0
-    review_count = db.query(func.count(Review.id)).filter(Review.product_id == product.id).scalar()
-    
-    seller_info = None
-    if product.seller:
-        seller_info = SellerInfo(
-            id=product.seller.id,
-            name=product.seller.name,
-            company_name=product.seller.company_name,
-            avatar_url=product.seller.avatar_url
-        )
-    
-    category_info = None
-    if product.category:
-        category_info = CategoryResponse(
-            id=product.category.id,
-            name=product.category.name,
-            slug=product.category.slug,
-            description=product.category.description,
-            image_url=product.category.image_url,
-            parent_id=product.category.parent_id,
-            created_at=product.category.created_at
-        )
-    
-    return ProductResponse(
-        id=product.id,
-        seller_id=product.seller_id,
-        category_id=product.category_id,
-        name=product.name,
-        slug=product.slug,
-        description=product.description,
-        short_description=product.short_description,
-        price=product.price,
-        original_price=product.original_price,
-        product_type=product.product_type,
-        license_type=product.license_type,
-        status=product.status,
-        image_url=product.image_url,
-        images=product.images,
-        version=product.version,
-        demo_url=product.demo_url,
-        documentation_url=product.documentation_url,
-        features=product.features,
-        requirements=product.requirements,
-        is_featured=product.is_featured,
-        download_count=product.download_count,
-        view_count=product.view_count,
-        created_at=product.created_at,
-        updated_at=product.updated_at,
-        seller=seller_info,
-        category=category_info,
-        average_rating=round(float(avg_rating), 1),
-        review_count=review_count
-    )
-
-
 def get_or_create_cart(user: User, db: Session) -> Cart:
     cart = db.query(Cart).filter(Cart.user_id == user.id).first()
     if not cart:
@@ -77,40 +20,99 @@ def get_or_create_cart(user: User, db: Session) -> Cart:
     return cart
 
 
-@router.get("", response_model=CartResponse)
-async def get_cart(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    cart = get_or_create_cart(current_user, db)
-    
+def build_cart_response(cart: Cart, db: Session) -> bytes:
     items = db.query(CartItem).options(
         joinedload(CartItem.product).joinedload(Product.seller),
         joinedload(CartItem.product).joinedload(Product.category)
     ).filter(CartItem.cart_id == cart.id).all()
     
+    stats = get_review_stats([item.product_id for item in items], db)
+    
     cart_items = []
     subtotal = 0
     for item in items:
         if item.product and item.product.status == ProductStatus.ACTIVE:
-            product_response = get_product_response(item.product, db)
-            cart_items.append(CartItemResponse(
-                id=item.id,
-                product_id=item.product_id,
-                quantity=item.quantity,
-                product=product_response,
-                created_at=item.created_at
-            ))
+            cart_items.append({
+                "id": item.id,
+                "product_id": item.product_id,
+                "quantity": item.quantity,
+                "product": get_product_fragment(item.product, db, stats),
+                "created_at": item.created_at
+            })
             subtotal += item.product.price * item.quantity
     
-    return CartResponse(
-        id=cart.id,
-        user_id=cart.user_id,
-        items=cart_items,
-        subtotal=round(subtotal, 2),
-        item_count=len(cart_items),
-        created_at=cart.created_at
-    )
+    return render_json({
+        "id": cart.id,
+        "user_id": cart.user_id,
+        "items": cart_items,
+        "subtotal": round(subtotal, 2),
+        "item_count": len(cart_items),
+        "created_at": cart.created_at
+    })
+
+
+@router.get("", response_model=CartResponse)
+async def get_cart(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    cart = get_or_create_cart(current_user, db)
+    return FastJSONResponse(build_cart_response(cart, db))
+
+
+@router.patch("", response_model=CartResponse)
+async def patch_cart(
+    patch_data: CartPatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    cart = get_or_create_cart(current_user, db)
+    
+    product_ids = {op.product_id for op in patch_data.operations if op.op != "remove"}
+    if product_ids:
+        products = dict(db.query(Product.id, Product.status).filter(Product.id.in_(product_ids)).all())
+        for product_id in product_ids:
+            if product_id not in products:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Product {product_id} not found"
+                )
+            if products[product_id] != ProductStatus.ACTIVE:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Product {product_id} is not available"
+                )
+    
+    existing_items = {
+        item.product_id: item
+        for item in db.query(CartItem).filter(CartItem.cart_id == cart.id).all()
+    }
+    
+    if patch_data.replace:
+        for item in existing_items.values():
+            db.delete(item)
+        existing_items = {}
+    
+    for op in patch_data.operations:
+        item = existing_items.get(op.product_id)
+        if op.op == "remove":
+            if item:
+                db.delete(item)
+                del existing_items[op.product_id]
+        elif item:
+            item.quantity = item.quantity + op.quantity if op.op == "add" else op.quantity
+        else:
+            item = CartItem(
+                cart_id=cart.id,
+                product_id=op.product_id,
+                quantity=op.quantity
+            )
+            db.add(item)
+            existing_items[op.product_id] = item
+    
+    db.commit()
+    
+    return FastJSONResponse(build_cart_response(cart, db))
 
 
 @router.post("/items", response_model=CartItemResponse)
@@ -158,7 +160,7 @@ async def add_to_cart(
         db.commit()
         db.refresh(cart_item)
     
-    product_response = get_product_response(product, db)
+    product_response = get_product_with_stats(product, db)
     
     return CartItemResponse(
         id=cart_item.id,
@@ -196,7 +198,7 @@ async def update_cart_item(
     db.commit()
     db.refresh(cart_item)
     
-    product_response = get_product_response(cart_item.product, db)
+    product_response = get_product_with_stats(cart_item.product, db)
     
     return CartItemResponse(
         id=cart_item.id,
@@ -1,53 +1,50 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from typing import List
 from app.database import get_db
-from app.models import Category, Product, ProductStatus, User, UserRole
+from app.models import Category, User, UserRole
 from app.schemas import CategoryCreate, CategoryResponse, CategoryWithChildren
 from app.auth import get_current_user
+from app.cache import catalog_cache
+from app import category_tree
+from app.events import bus
+from app.responses import cached_response, cache_response
 
 router = APIRouter(prefix="/categories", tags=["Categories"])
 
 
 @router.get("", response_model=List[CategoryWithChildren])
-async def get_categories(db: Session = Depends(get_db)):
-    categories = db.query(Category).filter(Category.parent_id == None).all()
-    result = []
-    for cat in categories:
-        product_count = db.query(func.count(Product.id)).filter(
-            Product.category_id == cat.id,
-            Product.status == ProductStatus.ACTIVE
-        ).scalar()
-        cat_dict = CategoryWithChildren(
-            id=cat.id,
-            name=cat.name,
-            slug=cat.slug,
-            description=cat.description,
-            image_url=cat.image_url,
-            parent_id=cat.parent_id,
-            created_at=cat.created_at,
+async def get_categories(request: Request, db: Session = Depends(get_db)):
+    cached = cached_response(request, catalog_cache)
+    if cached:
+        return cached
+    
+    categories = db.query(Category).order_by(Category.id).all()
+    counts = category_tree.product_counts(db)
+    
+    def with_children(category: Category) -> CategoryWithChildren:
+        return CategoryWithChildren(
+            id=category.id,
+            name=category.name,
+            slug=category.slug,
+            description=category.description,
+            image_url=category.image_url,
+            parent_id=category.parent_id,
+            created_at=category.created_at,
             children=[],
-            product_count=product_count
+            product_count=counts.get(category.id, 0)
         )
-        for child in cat.children:
-            child_count = db.query(func.count(Product.id)).filter(
-                Product.category_id == child.id,
-                Product.status == ProductStatus.ACTIVE
-            ).scalar()
-            cat_dict.children.append(CategoryWithChildren(
-                id=child.id,
-                name=child.name,
-                slug=child.slug,
-                description=child.description,
-                image_url=child.image_url,
-                parent_id=child.parent_id,
-                created_at=child.created_at,
-                children=[],
-                product_count=child_count
-            ))
-        result.append(cat_dict)
-    return result
+    
+    result = []
+    by_id = {}
+    for cat in categories:
+        if cat.parent_id is None:
+            by_id[cat.id] = with_children(cat)
+            result.append(by_id[cat.id])
+    for child in categories:
+        if child.parent_id in by_id:
+            by_id[child.parent_id].children.append(with_children(child))
+    return cache_response(request, catalog_cache, result)
 
 
 @router.get("/{category_id}", response_model=CategoryResponse)
@@ -101,6 +98,9 @@ async def create_category(
     
     category = Category(**category_data.model_dump())
     db.add(category)
+    db.flush()
+    category_tree.add_category(db, category)
     db.commit()
     db.refresh(category)
+    bus.publish("category.changed", {"id": category.id})
     return category
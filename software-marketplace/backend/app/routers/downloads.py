@@ -0,0 +1,99 @@
+import os
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from sqlalchemy.orm import Session, joinedload
+from app.database import get_db
+from app.models import OrderItem, Product, User, UserRole
+from app.schemas import DownloadLinkResponse, ProductFileResponse
+from app.auth import get_current_user
+from app.licenses import REVOKED_STATUSES
+from app import downloads
+
+router = APIRouter(prefix="/downloads", tags=["Downloads"])
+
+
+@router.put("/products/{product_id}", response_model=ProductFileResponse)
+async def upload_product_file(
+    product_id: int,
+    file: UploadFile = File(...),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    product = db.query(Product).filter(Product.id == product_id).first()
+    if not product:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Product not found"
+        )
+    
+    if product.seller_id != current_user.id and current_user.role != UserRole.ADMIN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You can only upload files for your own products"
+        )
+    
+    stored_name, size = await downloads.store_product_file(product.id, file)
+    if product.download_file:
+        downloads.schedule_removal(db, product.id, product.download_file)
+    product.download_file = stored_name
+    db.commit()
+    
+    return ProductFileResponse(product_id=product.id, filename=downloads.display_name(stored_name), size=size)
+
+
+@router.post("/items/{order_item_id}", response_model=DownloadLinkResponse)
+async def create_download_link(
+    order_item_id: int,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    item = db.query(OrderItem).options(
+        joinedload(OrderItem.order),
+        joinedload(OrderItem.product)
+    ).filter(OrderItem.id == order_item_id).first()
+    
+    if not item or item.order.buyer_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order item not found"
+        )
+    
+    if item.order.status in REVOKED_STATUSES:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="This order is no longer active"
+        )
+    
+    if not item.product or not item.product.download_file:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No file is available for this product"
+        )
+    
+    token, expires_at = downloads.sign_download(current_user.id, item.product_id, item.product.download_file)
+    return DownloadLinkResponse(url=f"/downloads/{token}", expires_at=datetime.utcfromtimestamp(expires_at))
+
+
+@router.get("/{token}")
+async def download_file(token: str):
+    grant = downloads.verify_download(token)
+    if grant is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Download link is invalid or has expired"
+        )
+    
+    path = downloads.product_file_path(grant.product_id, grant.filename)
+    if not os.path.isfile(path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="File not found"
+        )
+    
+    return downloads.SlotFileResponse(
+        path,
+        filename=downloads.display_name(grant.filename),
+        media_type="application/octet-stream",
+        headers={"Cache-Control": "private, no-store"},
+        user_id=grant.user_id
+    )
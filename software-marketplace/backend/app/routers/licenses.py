@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from app.schemas import LicenseVerifyRequest, LicenseVerifyResponse
+from app.responses import FastJSONResponse
+from app.licenses import license_index
+
+router = APIRouter(prefix="/licenses", tags=["Licenses"])
+
+
+@router.post("/verify", response_model=LicenseVerifyResponse)
+async def verify_licenses(request: LicenseVerifyRequest):
+    """Check up to 1000 keys at once, optionally requiring that they belong to ``product_id``."""
+    return FastJSONResponse({"results": license_index.verify_many(request.keys, request.product_id)})
@@ -0,0 +1,67 @@
+import os
+import re
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import FileResponse, RedirectResponse
+from app.models import User
+from app.schemas import MediaUploadResponse
+from app.auth import get_current_user
+from app import media
+
+router = APIRouter(prefix="/media", tags=["Media"])
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+def immutable_file(path: str, digest: str, content_type: str) -> FileResponse:
+    return FileResponse(
+        path,
+        media_type=content_type,
+        headers={"Cache-Control": media.IMMUTABLE_CACHE_CONTROL, "ETag": f'"{digest}"'}
+    )
+
+
+@router.post("", response_model=MediaUploadResponse)
+async def upload_media(
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    # The multipart body is read here rather than through UploadFile, which would
+    # spool the whole request to disk before the size limit could be checked.
+    digest, extension, size = await media.store_upload(media.multipart_file(request))
+    return MediaUploadResponse(
+        hash=digest,
+        content_type=media.CONTENT_TYPES[extension],
+        size=size,
+        urls=media.media_urls(digest, extension)
+    )
+
+
+@router.get("/{digest}/{variant}.webp")
+async def get_media_variant(digest: str, variant: str):
+    if not DIGEST_RE.match(digest) or variant not in media.VARIANTS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+    
+    path = media.variant_path(digest, variant)
+    if not os.path.exists(path):
+        extension = media.find_original(digest)
+        if extension is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+        if not await media.ensure_variants(digest, extension) or not os.path.exists(path):
+            # Never cache the original under the variant URL; a later render must be able to replace it.
+            return RedirectResponse(
+                f"/media/{digest}.{extension}",
+                status_code=status.HTTP_302_FOUND,
+                headers={"Cache-Control": media.FALLBACK_CACHE_CONTROL}
+            )
+    return immutable_file(path, f"{digest}-{variant}", "image/webp")
+
+
+@router.get("/{digest}.{extension}")
+async def get_media(digest: str, extension: str):
+    if not DIGEST_RE.match(digest) or extension not in media.CONTENT_TYPES:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+    
+    path = media.original_path(digest, extension)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+    return immutable_file(path, digest, media.CONTENT_TYPES[extension])
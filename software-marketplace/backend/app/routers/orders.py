@@ -1,72 +1,21 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from typing import List
+from typing import List, Optional
 from datetime import datetime
+from collections import defaultdict
+import logging
 import uuid
 from app.database import get_db
-from app.models import Order, OrderItem, OrderStatus, Cart, CartItem, Product, ProductStatus, User, Review
-from app.schemas import CheckoutRequest, OrderResponse, OrderListResponse, OrderItemResponse, ProductResponse, SellerInfo, CategoryResponse
+from app.models import Order, OrderItem, OrderStatus, Cart, CartItem, Product, ProductStatus, User
+from app.schemas import CheckoutRequest, OrderResponse, OrderListResponse
+from app.responses import FastJSONResponse, render_json
 from app.auth import get_current_user
+from app import jobs, trending
+from app.events import bus
 
 router = APIRouter(prefix="/orders", tags=["Orders"])
 
-
-def get_product_response(product: Product, db: Session) -> ProductResponse:
-    avg_rating = db.query(func.avg(Review.rating)).filter(Review.product_id == product.id).scalar() or 0
-    review_count = db.query(func.count(Review.id)).filter(Review.product_id == product.id).scalar()
-    
-    seller_info = None
-    if product.seller:
-        seller_info = SellerInfo(
-            id=product.seller.id,
-            name=product.seller.name,
-            company_name=product.seller.company_name,
-            avatar_url=product.seller.avatar_url
-        )
-    
-    category_info = None
-    if product.category:
-        category_info = CategoryResponse(
-            id=product.category.id,
-            name=product.category.name,
-            slug=product.category.slug,
-            description=product.category.description,
-            image_url=product.category.image_url,
-            parent_id=product.category.parent_id,
-            created_at=product.category.created_at
-        )
-    
-    return ProductResponse(
-        id=product.id,
-        seller_id=product.seller_id,
-        category_id=product.category_id,
-        name=product.name,
-        slug=product.slug,
-        description=product.description,
-        short_description=product.short_description,
-        price=product.price,
-        original_price=product.original_price,
-        product_type=product.product_type,
-        license_type=product.license_type,
-        status=product.status,
-        image_url=product.image_url,
-        images=product.images,
-        version=product.version,
-        demo_url=product.demo_url,
-        documentation_url=product.documentation_url,
-        features=product.features,
-        requirements=product.requirements,
-        is_featured=product.is_featured,
-        download_count=product.download_count,
-        view_count=product.view_count,
-        created_at=product.created_at,
-        updated_at=product.updated_at,
-        seller=seller_info,
-        category=category_info,
-        average_rating=round(float(avg_rating), 1),
-        review_count=review_count
-    )
+logger = logging.getLogger(__name__)
 
 
 def generate_order_number() -> str:
@@ -79,6 +28,53 @@ def generate_license_key() -> str:
     return f"LIC-{uuid.uuid4().hex[:8].upper()}-{uuid.uuid4().hex[:8].upper()}"
 
 
+def product_snapshot(item: OrderItem) -> Optional[dict]:
+    if item.product_name is None:
+        return None
+    return {
+        "id": item.product_id,
+        "name": item.product_name,
+        "slug": item.product_slug,
+        "image_url": item.product_image_url,
+        "seller_name": item.seller_name,
+        "license_type": item.license_type
+    }
+
+
+def build_order_response(order: Order) -> dict:
+    items = []
+    for item in order.items:
+        items.append({
+            "id": item.id,
+            "product_id": item.product_id,
+            "quantity": item.quantity,
+            "price": item.price,
+            "license_key": item.license_key,
+            "download_url": item.download_url,
+            "product": product_snapshot(item)
+        })
+    
+    return {
+        "id": order.id,
+        "buyer_id": order.buyer_id,
+        "order_number": order.order_number,
+        "status": order.status,
+        "subtotal": order.subtotal,
+        "tax": order.tax,
+        "discount": order.discount,
+        "total": order.total,
+        "payment_method": order.payment_method,
+        "payment_status": order.payment_status,
+        "billing_name": order.billing_name,
+        "billing_email": order.billing_email,
+        "billing_address": order.billing_address,
+        "notes": order.notes,
+        "items": items,
+        "created_at": order.created_at,
+        "updated_at": order.updated_at
+    }
+
+
 @router.get("", response_model=OrderListResponse)
 async def get_orders(
     page: int = Query(1, ge=1),
@@ -95,51 +91,15 @@ async def get_orders(
     total = query.count()
     
     orders = query.options(
-        joinedload(Order.items).joinedload(OrderItem.product).joinedload(Product.seller),
-        joinedload(Order.items).joinedload(OrderItem.product).joinedload(Product.category)
+        joinedload(Order.items)
     ).order_by(Order.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
     
-    order_responses = []
-    for order in orders:
-        items = []
-        for item in order.items:
-            product_response = get_product_response(item.product, db) if item.product else None
-            items.append(OrderItemResponse(
-                id=item.id,
-                product_id=item.product_id,
-                quantity=item.quantity,
-                price=item.price,
-                license_key=item.license_key,
-                download_url=item.download_url,
-                product=product_response
-            ))
-        
-        order_responses.append(OrderResponse(
-            id=order.id,
-            buyer_id=order.buyer_id,
-            order_number=order.order_number,
-            status=order.status,
-            subtotal=order.subtotal,
-            tax=order.tax,
-            discount=order.discount,
-            total=order.total,
-            payment_method=order.payment_method,
-            payment_status=order.payment_status,
-            billing_name=order.billing_name,
-            billing_email=order.billing_email,
-            billing_address=order.billing_address,
-            notes=order.notes,
-            items=items,
-            created_at=order.created_at,
-            updated_at=order.updated_at
-        ))
-    
-    return OrderListResponse(
-        orders=order_responses,
-        total=total,
-        page=page,
-        page_size=page_size
-    )
+    return FastJSONResponse(render_json({
+        "orders": [build_order_response(order) for order in orders],
+        "total": total,
+        "page": page,
+        "page_size": page_size
+    }))
 
 
 @router.get("/{order_id}", response_model=OrderResponse)
@@ -149,8 +109,7 @@ async def get_order(
     db: Session = Depends(get_db)
 ):
     order = db.query(Order).options(
-        joinedload(Order.items).joinedload(OrderItem.product).joinedload(Product.seller),
-        joinedload(Order.items).joinedload(OrderItem.product).joinedload(Product.category)
+        joinedload(Order.items)
     ).filter(Order.id == order_id).first()
     
     if not order:
@@ -165,38 +124,7 @@ async def get_order(
             detail="You can only view your own orders"
         )
     
-    items = []
-    for item in order.items:
-        product_response = get_product_response(item.product, db) if item.product else None
-        items.append(OrderItemResponse(
-            id=item.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=item.price,
-            license_key=item.license_key,
-            download_url=item.download_url,
-            product=product_response
-        ))
-    
-    return OrderResponse(
-        id=order.id,
-        buyer_id=order.buyer_id,
-        order_number=order.order_number,
-        status=order.status,
-        subtotal=order.subtotal,
-        tax=order.tax,
-        discount=order.discount,
-        total=order.total,
-        payment_method=order.payment_method,
-        payment_status=order.payment_status,
-        billing_name=order.billing_name,
-        billing_email=order.billing_email,
-        billing_address=order.billing_address,
-        notes=order.notes,
-        items=items,
-        created_at=order.created_at,
-        updated_at=order.updated_at
-    )
+    return FastJSONResponse(render_json(build_order_response(order)))
 
 
 @router.post("/checkout", response_model=OrderResponse)
@@ -213,8 +141,7 @@ async def checkout(
         )
     
     cart_items = db.query(CartItem).options(
-        joinedload(CartItem.product).joinedload(Product.seller),
-        joinedload(CartItem.product).joinedload(Product.category)
+        joinedload(CartItem.product).joinedload(Product.seller)
     ).filter(CartItem.cart_id == cart.id).all()
     
     if not cart_items:
@@ -259,58 +186,85 @@ async def checkout(
     
     order_items = []
     for cart_item in valid_items:
+        product = cart_item.product
         order_item = OrderItem(
             order_id=order.id,
             product_id=cart_item.product_id,
             quantity=cart_item.quantity,
-            price=cart_item.product.price,
+            price=product.price,
             license_key=generate_license_key(),
-            download_url=cart_item.product.demo_url
+            download_url=product.demo_url,
+            product_name=product.name,
+            product_slug=product.slug,
+            product_image_url=product.image_url,
+            seller_name=(product.seller.company_name or product.seller.name) if product.seller else None,
+            license_type=product.license_type
         )
         db.add(order_item)
         order_items.append(order_item)
-        
-        cart_item.product.download_count += cart_item.quantity
     
+    db.flush()
+    for cart_item, order_item in zip(valid_items, order_items):
+        # Products without an uploaded file keep their external demo_url link.
+        if cart_item.product.download_file:
+            order_item.download_url = f"/downloads/items/{order_item.id}"
+    
+    purchased = {item.product_id: item.quantity for item in valid_items}
+    licenses = [[item.license_key, item.product_id] for item in order_items]
     db.query(CartItem).filter(CartItem.cart_id == cart.id).delete()
     
+    jobs.enqueue(db, "orders.update_stats", {"order_id": order.id})
+    jobs.enqueue(db, "orders.send_receipt", {"order_id": order.id})
+    jobs.enqueue(db, "orders.notify_sellers", {"order_id": order.id})
+    
     db.commit()
-    db.refresh(order)
+    jobs.notify()
+    bus.publish("order.placed", {"items": list(purchased.items()), "licenses": licenses})
     
-    items = []
-    for item in order_items:
-        db.refresh(item)
-        product = db.query(Product).options(
-            joinedload(Product.seller),
-            joinedload(Product.category)
-        ).filter(Product.id == item.product_id).first()
-        product_response = get_product_response(product, db) if product else None
-        items.append(OrderItemResponse(
-            id=item.id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=item.price,
-            license_key=item.license_key,
-            download_url=item.download_url,
-            product=product_response
-        ))
+    order = db.query(Order).options(
+        joinedload(Order.items)
+    ).filter(Order.id == order.id).first()
     
-    return OrderResponse(
-        id=order.id,
-        buyer_id=order.buyer_id,
-        order_number=order.order_number,
-        status=order.status,
-        subtotal=order.subtotal,
-        tax=order.tax,
-        discount=order.discount,
-        total=order.total,
-        payment_method=order.payment_method,
-        payment_status=order.payment_status,
-        billing_name=order.billing_name,
-        billing_email=order.billing_email,
-        billing_address=order.billing_address,
-        notes=order.notes,
-        items=items,
-        created_at=order.created_at,
-        updated_at=order.updated_at
+    return FastJSONResponse(render_json(build_order_response(order)))
+
+
+@jobs.handler("orders.update_stats")
+def update_order_stats(payload: dict, db: Session):
+    items = db.query(OrderItem).filter(OrderItem.order_id == payload["order_id"]).all()
+    for item in items:
+        trending.record_purchase(item.product_id, item.quantity, db)
+
+
+@jobs.handler("orders.send_receipt")
+def send_order_receipt(payload: dict, db: Session):
+    order = db.query(Order).options(
+        joinedload(Order.items)
+    ).filter(Order.id == payload["order_id"]).first()
+    if not order:
+        return
+    lines = [
+        f"{item.product_name or item.product_id} x{item.quantity} ${item.price * item.quantity:.2f}"
+        for item in order.items
+    ]
+    logger.info(
+        "Receipt for order %s to %s: %s; total $%.2f",
+        order.order_number, order.billing_email, "; ".join(lines), order.total
     )
+
+
+@jobs.handler("orders.notify_sellers")
+def notify_order_sellers(payload: dict, db: Session):
+    order = db.query(Order).options(
+        joinedload(Order.items).joinedload(OrderItem.product).joinedload(Product.seller)
+    ).filter(Order.id == payload["order_id"]).first()
+    if not order:
+        return
+    sold = defaultdict(list)
+    for item in order.items:
+        if item.product and item.product.seller:
+            sold[item.product.seller].append(item)
+    for seller, items in sold.items():
+        logger.info(
+            "Notifying %s of order %s: %s",
+            seller.email, order.order_number, ", ".join(f"{item.product_name} x{item.quantity}" for item in items)
+        )
@@ -1,15 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy.orm import Session, joinedload, load_only
+from sqlalchemy import and_, case, func, literal, or_
+from collections import Counter
+from typing import List, Optional, Union
 from app.database import get_db
-from app.models import Product, ProductStatus, ProductType, LicenseType, User, UserRole, Review, Category
-from app.schemas import ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, SellerInfo, CategoryResponse
+from app.models import Product, ProductSimilarity, ProductStatus, ProductType, LicenseType, User, UserRole, Category
+from app.schemas import (
+    ProductCreate, ProductUpdate, ProductResponse, ProductListResponse, ProductSummary,
+    ProductSummaryListResponse, ProductFacets, FacetCount, SuggestionResponse
+)
+from app.serializers import get_product_with_stats, get_product_fragment, get_product_fragments, get_product_summaries, get_product_fields
+from app.responses import FastJSONResponse, cached_response, cache_response, render_json
+from app.cache import catalog_cache
+from app import jobs, trending
+from app.events import bus
+from app.similarity import enqueue_refresh, remove_product_similarities
+from app.recommendations import also_bought
+from app.suggest import suggestions
+from app.category_tree import category_slugs, in_category
 from app.auth import get_current_user, get_current_user_optional
 import re
 
 router = APIRouter(prefix="/products", tags=["Products"])
 
+PRODUCT_FIELDS = set(ProductResponse.model_fields)
+PRODUCT_COLUMNS = set(Product.__table__.columns.keys())
+SUMMARY_COLUMNS = (
+    Product.id, Product.seller_id, Product.name, Product.slug, Product.short_description,
+    Product.price, Product.original_price, Product.product_type, Product.license_type,
+    Product.image_url, Product.is_featured
+)
+SELLER_COLUMNS = (User.id, User.name, User.company_name, User.avatar_url)
+PRICE_BUCKETS = (("0-25", 25), ("25-50", 50), ("50-100", 100), ("100-250", 250), ("250+", None))
+
 
 def generate_slug(name: str) -> str:
     slug = name.lower()
@@ -19,65 +42,115 @@ def generate_slug(name: str) -> str:
     return slug.strip('-')
 
 
-def get_product_with_stats(product: Product, db: Session) -> ProductResponse:
-    avg_rating = db.query(func.avg(Review.rating)).filter(Review.product_id == product.id).scalar() or 0
-    review_count = db.query(func.count(Review.id)).filter(Review.product_id == product.id).scalar()
-    
-    seller_info = None
-    if product.seller:
-        seller_info = SellerInfo(
-            id=product.seller.id,
-            name=product.seller.name,
-            company_name=product.seller.company_name,
-            avatar_url=product.seller.avatar_url
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    requested = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in requested if field not in PRODUCT_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
         )
-    
-    category_info = None
-    if product.category:
-        category_info = CategoryResponse(
-            id=product.category.id,
-            name=product.category.name,
-            slug=product.category.slug,
-            description=product.category.description,
-            image_url=product.category.image_url,
-            parent_id=product.category.parent_id,
-            created_at=product.category.created_at
+    return list(dict.fromkeys(["id"] + requested))
+
+
+def apply_projection(query, view: str, fields: Optional[List[str]]):
+    if fields:
+        columns = [getattr(Product, field) for field in fields if field in PRODUCT_COLUMNS]
+        options = [load_only(*columns)]
+        if "seller" in fields:
+            options.append(joinedload(Product.seller).load_only(*SELLER_COLUMNS))
+        if "category" in fields:
+            options.append(joinedload(Product.category))
+        return query.options(*options)
+    if view == "summary":
+        return query.options(
+            load_only(*SUMMARY_COLUMNS),
+            joinedload(Product.seller).load_only(*SELLER_COLUMNS)
         )
-    
-    return ProductResponse(
-        id=product.id,
-        seller_id=product.seller_id,
-        category_id=product.category_id,
-        name=product.name,
-        slug=product.slug,
-        description=product.description,
-        short_description=product.short_description,
-        price=product.price,
-        original_price=product.original_price,
-        product_type=product.product_type,
-        license_type=product.license_type,
-        status=product.status,
-        image_url=product.image_url,
-        images=product.images,
-        version=product.version,
-        demo_url=product.demo_url,
-        documentation_url=product.documentation_url,
-        features=product.features,
-        requirements=product.requirements,
-        is_featured=product.is_featured,
-        download_count=product.download_count,
-        view_count=product.view_count,
-        created_at=product.created_at,
-        updated_at=product.updated_at,
-        seller=seller_info,
-        category=category_info,
-        average_rating=round(float(avg_rating), 1),
-        review_count=review_count
+    return query.options(
+        joinedload(Product.seller),
+        joinedload(Product.category)
+    )
+
+
+def render_products(products: List[Product], db: Session, view: str, fields: Optional[List[str]]):
+    if fields:
+        return get_product_fields(products, fields, db)
+    if view == "summary":
+        return get_product_summaries(products, db)
+    return get_product_fragments(products, db)
+
+
+def price_bucket_expression():
+    whens = [(Product.price < upper, label) for label, upper in PRICE_BUCKETS if upper is not None]
+    return case(*whens, else_=PRICE_BUCKETS[-1][0])
+
+
+def match_flag(filters: list):
+    return case((and_(*filters), 1), else_=0) if filters else literal(1)
+
+
+def get_facet_counts(
+    db: Session,
+    base_filters: list,
+    category_filters: list,
+    product_type: Optional[ProductType],
+    license_type: Optional[LicenseType],
+    price_filters: list
+) -> ProductFacets:
+    """Disjunctive facet counts for the current filter set in a single grouped query.
+
+    Each facet ignores its own filter but applies all the others, so the
+    sidebar shows how many results selecting any other value would give. Rows
+    are grouped by every facet dimension plus whether the category and price
+    filters match, and the per-facet totals are summed up from those groups.
+    """
+    bucket = price_bucket_expression().label("price_bucket")
+    category_match = match_flag(category_filters).label("in_category")
+    in_price = match_flag(price_filters).label("in_price")
+    rows = db.query(
+        Product.category_id, Product.product_type, Product.license_type, bucket, category_match, in_price,
+        func.count(Product.id)
+    ).filter(*base_filters).group_by(
+        Product.category_id, Product.product_type, Product.license_type, bucket, category_match, in_price
+    ).all()
+    
+    counts = {name: Counter() for name in ("categories", "product_types", "license_types", "price_ranges")}
+    for row_category, row_type, row_license, row_bucket, row_in_category, row_in_price, count in rows:
+        matches = {
+            "categories": bool(row_in_category),
+            "product_types": product_type is None or row_type == product_type,
+            "license_types": license_type is None or row_license == license_type,
+            "price_ranges": bool(row_in_price),
+        }
+        values = {
+            "categories": str(row_category) if row_category is not None else None,
+            "product_types": row_type.value if row_type is not None else None,
+            "license_types": row_license.value if row_license is not None else None,
+            "price_ranges": row_bucket,
+        }
+        for name, value in values.items():
+            if value is not None and all(ok for other, ok in matches.items() if other != name):
+                counts[name][value] += count
+    
+    def as_list(counter: Counter) -> List[FacetCount]:
+        return [FacetCount(value=value, count=count) for value, count in counter.most_common()]
+    
+    return ProductFacets(
+        categories=as_list(counts["categories"]),
+        product_types=as_list(counts["product_types"]),
+        license_types=as_list(counts["license_types"]),
+        price_ranges=[
+            FacetCount(value=label, count=counts["price_ranges"][label]) for label, _ in PRICE_BUCKETS
+        ]
     )
 
 
-@router.get("", response_model=ProductListResponse)
+@router.get("", response_model=Union[ProductListResponse, ProductSummaryListResponse])
 async def get_products(
+    request: Request,
     page: int = Query(1, ge=1),
     page_size: int = Query(12, ge=1, le=50),
     category_id: Optional[int] = None,
@@ -90,36 +163,21 @@ async def get_products(
     sort_by: Optional[str] = Query("created_at", pattern="^(created_at|price|name|rating|downloads)$"),
     sort_order: Optional[str] = Query("desc", pattern="^(asc|desc)$"),
     featured_only: bool = False,
+    view: str = Query("full", pattern="^(full|summary)$"),
+    fields: Optional[str] = None,
+    include_facets: bool = False,
     db: Session = Depends(get_db)
 ):
-    query = db.query(Product).options(
-        joinedload(Product.seller),
-        joinedload(Product.category)
-    ).filter(Product.status == ProductStatus.ACTIVE)
-    
-    if category_id:
-        query = query.filter(Product.category_id == category_id)
-    
-    if category_slug:
-        category = db.query(Category).filter(Category.slug == category_slug).first()
-        if category:
-            query = query.filter(Product.category_id == category.id)
-    
-    if product_type:
-        query = query.filter(Product.product_type == product_type)
-    
-    if license_type:
-        query = query.filter(Product.license_type == license_type)
-    
-    if min_price is not None:
-        query = query.filter(Product.price >= min_price)
+    cached = cached_response(request, catalog_cache)
+    if cached:
+        return cached
     
-    if max_price is not None:
-        query = query.filter(Product.price <= max_price)
+    field_list = parse_fields(fields)
+    base_filters = [Product.status == ProductStatus.ACTIVE]
     
     if search:
         search_term = f"%{search}%"
-        query = query.filter(
+        base_filters.append(
             or_(
                 Product.name.ilike(search_term),
                 Product.description.ilike(search_term),
@@ -128,7 +186,29 @@ async def get_products(
         )
     
     if featured_only:
-        query = query.filter(Product.is_featured == True)
+        base_filters.append(Product.is_featured == True)
+    
+    category_ids = []
+    if category_id:
+        category_ids.append(category_id)
+    
+    if category_slug:
+        slug_category_id = category_slugs.resolve(db, category_slug)
+        if slug_category_id:
+            category_ids.append(slug_category_id)
+    
+    category_filters = [in_category(cid) for cid in category_ids]
+    type_filters = [Product.product_type == product_type] if product_type else []
+    license_filters = [Product.license_type == license_type] if license_type else []
+    price_filters = []
+    if min_price is not None:
+        price_filters.append(Product.price >= min_price)
+    if max_price is not None:
+        price_filters.append(Product.price <= max_price)
+    
+    query = db.query(Product).filter(
+        *base_filters, *category_filters, *type_filters, *license_filters, *price_filters
+    )
     
     if sort_by == "price":
         query = query.order_by(Product.price.desc() if sort_order == "desc" else Product.price.asc())
@@ -142,63 +222,136 @@ async def get_products(
     total = query.count()
     total_pages = (total + page_size - 1) // page_size
     
-    products = query.offset((page - 1) * page_size).limit(page_size).all()
+    products = apply_projection(query, view, field_list).offset((page - 1) * page_size).limit(page_size).all()
+    items = render_products(products, db, view, field_list)
     
-    product_responses = [get_product_with_stats(p, db) for p in products]
+    facets = None
+    if include_facets:
+        facets = get_facet_counts(
+            db, base_filters, category_filters, product_type, license_type, price_filters
+        )
     
-    return ProductListResponse(
-        products=product_responses,
-        total=total,
-        page=page,
-        page_size=page_size,
-        total_pages=total_pages
-    )
+    return cache_response(request, catalog_cache, render_json({
+        "products": items,
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "total_pages": total_pages,
+        "facets": facets
+    }))
 
 
-@router.get("/featured", response_model=List[ProductResponse])
+@router.get("/featured", response_model=Union[List[ProductResponse], List[ProductSummary]])
 async def get_featured_products(
+    request: Request,
     limit: int = Query(8, ge=1, le=20),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    products = db.query(Product).options(
-        joinedload(Product.seller),
-        joinedload(Product.category)
-    ).filter(
+    cached = cached_response(request, catalog_cache)
+    if cached:
+        return cached
+    
+    field_list = parse_fields(fields)
+    products = apply_projection(db.query(Product), view, field_list).filter(
         Product.status == ProductStatus.ACTIVE,
         Product.is_featured == True
     ).order_by(Product.created_at.desc()).limit(limit).all()
     
-    return [get_product_with_stats(p, db) for p in products]
+    return cache_response(request, catalog_cache, render_json(render_products(products, db, view, field_list)))
 
 
-@router.get("/new-arrivals", response_model=List[ProductResponse])
+@router.get("/new-arrivals", response_model=Union[List[ProductResponse], List[ProductSummary]])
 async def get_new_arrivals(
+    request: Request,
     limit: int = Query(8, ge=1, le=20),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    products = db.query(Product).options(
-        joinedload(Product.seller),
-        joinedload(Product.category)
-    ).filter(
+    cached = cached_response(request, catalog_cache)
+    if cached:
+        return cached
+    
+    field_list = parse_fields(fields)
+    products = apply_projection(db.query(Product), view, field_list).filter(
         Product.status == ProductStatus.ACTIVE
     ).order_by(Product.created_at.desc()).limit(limit).all()
     
-    return [get_product_with_stats(p, db) for p in products]
+    return cache_response(request, catalog_cache, render_json(render_products(products, db, view, field_list)))
 
 
-@router.get("/trending", response_model=List[ProductResponse])
+@router.get("/trending", response_model=Union[List[ProductResponse], List[ProductSummary]])
 async def get_trending_products(
+    request: Request,
     limit: int = Query(8, ge=1, le=20),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    products = db.query(Product).options(
-        joinedload(Product.seller),
-        joinedload(Product.category)
+    cached = cached_response(request, catalog_cache)
+    if cached:
+        return cached
+    
+    field_list = parse_fields(fields)
+    products = apply_projection(db.query(Product), view, field_list).filter(
+        Product.status == ProductStatus.ACTIVE
+    ).order_by(Product.trending_score.desc(), Product.download_count.desc()).limit(limit).all()
+    
+    return cache_response(request, catalog_cache, render_json(render_products(products, db, view, field_list)))
+
+
+@router.get("/suggest", response_model=List[SuggestionResponse])
+async def suggest_products(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=20)
+):
+    return FastJSONResponse([
+        SuggestionResponse.model_validate(entry) for entry in suggestions.suggest(q, limit)
+    ])
+
+
+@router.get("/{product_id}/also-bought", response_model=Union[List[ProductResponse], List[ProductSummary]])
+async def get_also_bought(
+    product_id: int,
+    limit: int = Query(8, ge=1, le=20),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    field_list = parse_fields(fields)
+    neighbor_ids = also_bought.neighbors(product_id, limit)
+    if not neighbor_ids:
+        return FastJSONResponse([])
+    
+    products = apply_projection(db.query(Product), view, field_list).filter(
+        Product.id.in_(neighbor_ids),
+        Product.status == ProductStatus.ACTIVE
+    ).all()
+    rank = {pid: index for index, pid in enumerate(neighbor_ids)}
+    products.sort(key=lambda p: rank[p.id])
+    
+    return FastJSONResponse(render_json(render_products(products, db, view, field_list)))
+
+
+@router.get("/{product_id}/similar", response_model=Union[List[ProductResponse], List[ProductSummary]])
+async def get_similar_products(
+    product_id: int,
+    limit: int = Query(8, ge=1, le=20),
+    view: str = Query("full", pattern="^(full|summary)$"),
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    field_list = parse_fields(fields)
+    products = apply_projection(db.query(Product), view, field_list).join(
+        ProductSimilarity, ProductSimilarity.similar_product_id == Product.id
     ).filter(
+        ProductSimilarity.product_id == product_id,
         Product.status == ProductStatus.ACTIVE
-    ).order_by(Product.download_count.desc()).limit(limit).all()
+    ).order_by(ProductSimilarity.rank).limit(limit).all()
     
-    return [get_product_with_stats(p, db) for p in products]
+    return FastJSONResponse(render_json(render_products(products, db, view, field_list)))
 
 
 @router.get("/{product_id}", response_model=ProductResponse)
@@ -225,10 +378,10 @@ async def get_product(
                 detail="Product not found"
             )
     
-    product.view_count += 1
+    trending.record_view(product.id, db)
     db.commit()
     
-    return get_product_with_stats(product, db)
+    return FastJSONResponse(render_json(get_product_fragment(product, db)))
 
 
 @router.get("/slug/{slug}", response_model=ProductResponse)
@@ -255,10 +408,10 @@ async def get_product_by_slug(
                 detail="Product not found"
             )
     
-    product.view_count += 1
+    trending.record_view(product.id, db)
     db.commit()
     
-    return get_product_with_stats(product, db)
+    return FastJSONResponse(render_json(get_product_fragment(product, db)))
 
 
 @router.post("", response_model=ProductResponse)
@@ -307,8 +460,12 @@ async def create_product(
         requirements=product_data.requirements
     )
     db.add(product)
+    db.flush()
+    enqueue_refresh(db, product.id)
     db.commit()
     db.refresh(product)
+    bus.publish("product.changed", {"ids": [product.id]})
+    jobs.notify()
     
     return get_product_with_stats(product, db)
 
@@ -337,8 +494,11 @@ async def update_product(
     for field, value in update_data.items():
         setattr(product, field, value)
     
+    enqueue_refresh(db, product.id)
     db.commit()
     db.refresh(product)
+    bus.publish("product.changed", {"ids": [product.id]})
+    jobs.notify()
     
     return get_product_with_stats(product, db)
 
@@ -362,7 +522,11 @@ async def delete_product(
             detail="You can only delete your own products"
         )
     
+    remove_product_similarities(db, product.id)
+    enqueue_refresh(db, product.id)
     db.delete(product)
     db.commit()
+    bus.publish("product.deleted", {"ids": [product_id]})
+    jobs.notify()
     
     return {"message": "Product deleted successfully"}
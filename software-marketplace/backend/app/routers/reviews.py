@@ -3,9 +3,11 @@ from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from typing import List
 from app.database import get_db
-from app.models import Review, Product, ProductStatus, User, UserRole, Order, OrderItem
+from app.models import Review, ReviewHelpfulVote, Product, ProductStatus, User, UserRole, Order, OrderItem
 from app.schemas import ReviewCreate, ReviewUpdate, ReviewResponse, ReviewerInfo
 from app.auth import get_current_user
+from app.events import bus
+from app.helpful_votes import count_votes, helpful_counts, insert_vote
 
 router = APIRouter(prefix="/reviews", tags=["Reviews"])
 
@@ -112,6 +114,7 @@ async def create_review(
     db.add(review)
     db.commit()
     db.refresh(review)
+    bus.publish("review.changed", {"product_id": review.product_id})
     
     user_info = ReviewerInfo(
         id=current_user.id,
@@ -166,6 +169,7 @@ async def update_review(
     
     db.commit()
     db.refresh(review)
+    bus.publish("review.changed", {"product_id": review.product_id})
     
     user_info = ReviewerInfo(
         id=current_user.id,
@@ -208,8 +212,12 @@ async def delete_review(
             detail="You can only delete your own reviews"
         )
     
+    db.query(ReviewHelpfulVote).filter(ReviewHelpfulVote.review_id == review.id).delete(synchronize_session=False)
+    product_id = review.product_id
     db.delete(review)
     db.commit()
+    helpful_counts.discard(review_id)
+    bus.publish("review.changed", {"product_id": product_id})
     
     return {"message": "Review deleted successfully"}
 
@@ -228,10 +236,15 @@ async def mark_review_helpful(
             detail="Review not found"
         )
     
-    review.helpful_count += 1
+    if not insert_vote(db, review_id, current_user.id):
+        return {
+            "message": "Already marked as helpful",
+            "helpful_count": count_votes(db, review_id)
+        }
     db.commit()
+    helpful_counts.add(review_id)
     
-    return {"message": "Marked as helpful", "helpful_count": review.helpful_count}
+    return {"message": "Marked as helpful", "helpful_count": count_votes(db, review_id)}
 
 
 @router.post("/{review_id}/respond")
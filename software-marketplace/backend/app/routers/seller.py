@@ -1,70 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from typing import List
-from app.database import get_db
+import asyncio
+import time
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from sqlalchemy.orm import Session, aliased, joinedload
+from sqlalchemy import Select, func, select
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple, Union
+from app.database import SessionLocal, get_db
 from app.models import Product, ProductStatus, User, UserRole, Order, OrderItem, Review
-from app.schemas import ProductResponse, SellerAnalytics, SellerOrderResponse, SellerInfo, CategoryResponse
+from app.schemas import (
+    ProductCreate, ProductResponse, ProductImportResult, SellerAnalytics, SellerDashboard, SellerOrderResponse
+)
+from app.serializers import get_product_fragments
+from app.responses import FastJSONResponse, JSONFragment, render_json
+from app.exports import YIELD_PER, stream_export
+from app.imports import import_products
 from app.auth import get_current_user
+from app import jobs
 
 router = APIRouter(prefix="/seller", tags=["Seller Dashboard"])
 
-
-def get_product_with_stats(product: Product, db: Session) -> ProductResponse:
-    avg_rating = db.query(func.avg(Review.rating)).filter(Review.product_id == product.id).scalar() or 0
-    review_count = db.query(func.count(Review.id)).filter(Review.product_id == product.id).scalar()
-    
-    seller_info = None
-    if product.seller:
-        seller_info = SellerInfo(
-            id=product.seller.id,
-            name=product.seller.name,
-            company_name=product.seller.company_name,
-            avatar_url=product.seller.avatar_url
-        )
-    
-    category_info = None
-    if product.category:
-        category_info = CategoryResponse(
-            id=product.category.id,
-            name=product.category.name,
-            slug=product.category.slug,
-            description=product.category.description,
-            image_url=product.category.image_url,
-            parent_id=product.category.parent_id,
-            created_at=product.category.created_at
-        )
-    
-    return ProductResponse(
-        id=product.id,
-        seller_id=product.seller_id,
-        category_id=product.category_id,
-        name=product.name,
-        slug=product.slug,
-        description=product.description,
-        short_description=product.short_description,
-        price=product.price,
-        original_price=product.original_price,
-        product_type=product.product_type,
-        license_type=product.license_type,
-        status=product.status,
-        image_url=product.image_url,
-        images=product.images,
-        version=product.version,
-        demo_url=product.demo_url,
-        documentation_url=product.documentation_url,
-        features=product.features,
-        requirements=product.requirements,
-        is_featured=product.is_featured,
-        download_count=product.download_count,
-        view_count=product.view_count,
-        created_at=product.created_at,
-        updated_at=product.updated_at,
-        seller=seller_info,
-        category=category_info,
-        average_rating=round(float(avg_rating), 1),
-        review_count=review_count
-    )
+PRODUCT_EXPORT_COLUMNS = ["id"] + list(ProductCreate.model_fields)
+ORDER_EXPORT_COLUMNS = list(SellerOrderResponse.model_fields)
+REVIEW_EXPORT_COLUMNS = [
+    "id", "product_id", "product_name", "user_name", "rating", "title", "comment", "seller_response", "created_at"
+]
 
 
 def require_seller(current_user: User = Depends(get_current_user)) -> User:
@@ -76,84 +35,50 @@ def require_seller(current_user: User = Depends(get_current_user)) -> User:
     return current_user
 
 
-@router.get("/analytics", response_model=SellerAnalytics)
-async def get_seller_analytics(
-    current_user: User = Depends(require_seller),
-    db: Session = Depends(get_db)
-):
-    total_products = db.query(func.count(Product.id)).filter(
-        Product.seller_id == current_user.id
-    ).scalar()
-    
-    active_products = db.query(func.count(Product.id)).filter(
-        Product.seller_id == current_user.id,
-        Product.status == ProductStatus.ACTIVE
-    ).scalar()
-    
-    seller_product_ids = db.query(Product.id).filter(
-        Product.seller_id == current_user.id
-    ).subquery()
-    
-    order_items = db.query(OrderItem).filter(
-        OrderItem.product_id.in_(seller_product_ids)
-    ).all()
-    
-    total_orders = len(set(item.order_id for item in order_items))
-    total_revenue = sum(item.price * item.quantity for item in order_items)
-    
-    avg_rating = db.query(func.avg(Review.rating)).filter(
-        Review.product_id.in_(seller_product_ids)
-    ).scalar() or 0
+def get_seller_product_ids(db: Session, seller_id: int) -> List[Tuple[int, ProductStatus]]:
+    return db.query(Product.id, Product.status).filter(Product.seller_id == seller_id).all()
+
+
+def build_seller_analytics(db: Session, products: List[Tuple[int, ProductStatus]]) -> SellerAnalytics:
+    product_ids = [product_id for product_id, _ in products]
+    total_orders, total_revenue = db.query(
+        func.count(func.distinct(OrderItem.order_id)),
+        func.sum(OrderItem.price * OrderItem.quantity)
+    ).filter(OrderItem.product_id.in_(product_ids)).one()
     
-    total_reviews = db.query(func.count(Review.id)).filter(
-        Review.product_id.in_(seller_product_ids)
-    ).scalar()
+    avg_rating, total_reviews = db.query(
+        func.avg(Review.rating),
+        func.count(Review.id)
+    ).filter(Review.product_id.in_(product_ids)).one()
     
     return SellerAnalytics(
-        total_products=total_products,
-        active_products=active_products,
+        total_products=len(products),
+        active_products=sum(1 for _, product_status in products if product_status == ProductStatus.ACTIVE),
         total_orders=total_orders,
-        total_revenue=round(total_revenue, 2),
-        average_rating=round(float(avg_rating), 1),
+        total_revenue=round(total_revenue or 0, 2),
+        average_rating=round(float(avg_rating or 0), 1),
         total_reviews=total_reviews
     )
 
 
-@router.get("/products", response_model=List[ProductResponse])
-async def get_seller_products(
-    status_filter: ProductStatus = None,
-    current_user: User = Depends(require_seller),
-    db: Session = Depends(get_db)
-):
+def build_seller_products(db: Session, seller_id: int, status_filter: Optional[ProductStatus] = None) -> List[JSONFragment]:
     query = db.query(Product).options(
         joinedload(Product.seller),
         joinedload(Product.category)
-    ).filter(Product.seller_id == current_user.id)
+    ).filter(Product.seller_id == seller_id)
     
     if status_filter:
         query = query.filter(Product.status == status_filter)
     
     products = query.order_by(Product.created_at.desc()).all()
-    
-    return [get_product_with_stats(p, db) for p in products]
+    return get_product_fragments(products, db)
 
 
-@router.get("/orders", response_model=List[SellerOrderResponse])
-async def get_seller_orders(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(require_seller),
-    db: Session = Depends(get_db)
-):
-    seller_product_ids = db.query(Product.id).filter(
-        Product.seller_id == current_user.id
-    ).subquery()
-    
+def build_seller_orders(db: Session, product_ids: Union[List[int], Select], page: int, page_size: int) -> List[SellerOrderResponse]:
     order_items = db.query(OrderItem).options(
-        joinedload(OrderItem.order).joinedload(Order.buyer),
-        joinedload(OrderItem.product)
+        joinedload(OrderItem.order).joinedload(Order.buyer)
     ).filter(
-        OrderItem.product_id.in_(seller_product_ids)
+        OrderItem.product_id.in_(product_ids)
     ).order_by(OrderItem.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
     
     result = []
@@ -163,7 +88,7 @@ async def get_seller_orders(
             order_number=item.order.order_number,
             buyer_name=item.order.buyer.name if item.order.buyer else "Unknown",
             buyer_email=item.order.buyer.email if item.order.buyer else "Unknown",
-            product_name=item.product.name if item.product else "Unknown",
+            product_name=item.product_name or "Unknown",
             quantity=item.quantity,
             price=item.price,
             status=item.order.status,
@@ -173,22 +98,12 @@ async def get_seller_orders(
     return result
 
 
-@router.get("/reviews", response_model=List)
-async def get_seller_reviews(
-    page: int = Query(1, ge=1),
-    page_size: int = Query(20, ge=1, le=100),
-    current_user: User = Depends(require_seller),
-    db: Session = Depends(get_db)
-):
-    seller_product_ids = db.query(Product.id).filter(
-        Product.seller_id == current_user.id
-    ).subquery()
-    
+def build_seller_reviews(db: Session, product_ids: Union[List[int], Select], page: int, page_size: int) -> List[dict]:
     reviews = db.query(Review).options(
         joinedload(Review.user),
         joinedload(Review.product)
     ).filter(
-        Review.product_id.in_(seller_product_ids)
+        Review.product_id.in_(product_ids)
     ).order_by(Review.created_at.desc()).offset((page - 1) * page_size).limit(page_size).all()
     
     result = []
@@ -206,3 +121,175 @@ async def get_seller_reviews(
         })
     
     return result
+
+
+def run_section(build: Callable[..., Any], *args) -> Tuple[Any, float]:
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        return build(db, *args), round((time.perf_counter() - started) * 1000, 2)
+    finally:
+        db.close()
+
+
+@router.get("/dashboard", response_model=SellerDashboard)
+async def get_seller_dashboard(
+    orders_page_size: int = Query(20, ge=1, le=100),
+    reviews_page_size: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(require_seller),
+    db: Session = Depends(get_db)
+):
+    seller_id = current_user.id
+    products = get_seller_product_ids(db, seller_id)
+    product_ids = [product_id for product_id, _ in products]
+    
+    sections = {
+        "analytics": (build_seller_analytics, products),
+        "products": (build_seller_products, seller_id),
+        "recent_orders": (build_seller_orders, product_ids, 1, orders_page_size),
+        "recent_reviews": (build_seller_reviews, product_ids, 1, reviews_page_size),
+    }
+    results = await asyncio.gather(*(
+        asyncio.to_thread(run_section, *section) for section in sections.values()
+    ))
+    payload = {name: result for name, (result, _) in zip(sections, results)}
+    timings = {name: elapsed for name, (_, elapsed) in zip(sections, results)}
+    
+    return FastJSONResponse(render_json({**payload, "timings_ms": timings}))
+
+
+@router.get("/analytics", response_model=SellerAnalytics)
+async def get_seller_analytics(
+    current_user: User = Depends(require_seller),
+    db: Session = Depends(get_db)
+):
+    return build_seller_analytics(db, get_seller_product_ids(db, current_user.id))
+
+
+@router.get("/products", response_model=List[ProductResponse])
+async def get_seller_products(
+    status_filter: ProductStatus = None,
+    current_user: User = Depends(require_seller),
+    db: Session = Depends(get_db)
+):
+    return FastJSONResponse(render_json(build_seller_products(db, current_user.id, status_filter)))
+
+
+@router.post("/products/import", response_model=ProductImportResult)
+async def import_seller_products(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    current_user: User = Depends(require_seller),
+    db: Session = Depends(get_db)
+):
+    result = await asyncio.to_thread(import_products, db, current_user, file, format)
+    if result.created:
+        # The import runs off the event loop; wake the job workers from here,
+        # since asyncio.Event is not thread-safe.
+        jobs.notify()
+    return result
+
+
+@router.get("/products/export")
+async def export_seller_products(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    current_user: User = Depends(require_seller)
+):
+    seller_id = current_user.id
+    columns = [getattr(Product, name) for name in PRODUCT_EXPORT_COLUMNS]
+    
+    def rows(db: Session):
+        query = db.query(*columns).filter(Product.seller_id == seller_id).order_by(Product.id)
+        for row in query.yield_per(YIELD_PER):
+            yield row._asdict()
+    
+    return stream_export(rows, PRODUCT_EXPORT_COLUMNS, format, "products")
+
+
+@router.get("/orders", response_model=List[SellerOrderResponse])
+async def get_seller_orders(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(require_seller),
+    db: Session = Depends(get_db)
+):
+    seller_product_ids = select(Product.id).where(Product.seller_id == current_user.id)
+    return build_seller_orders(db, seller_product_ids, page, page_size)
+
+
+@router.get("/orders/export")
+async def export_seller_orders(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(require_seller)
+):
+    seller_id = current_user.id
+    buyer = aliased(User)
+    
+    def rows(db: Session):
+        query = db.query(
+            OrderItem.id,
+            Order.order_number,
+            func.coalesce(buyer.name, "Unknown").label("buyer_name"),
+            func.coalesce(buyer.email, "Unknown").label("buyer_email"),
+            func.coalesce(OrderItem.product_name, "Unknown").label("product_name"),
+            OrderItem.quantity,
+            OrderItem.price,
+            Order.status,
+            OrderItem.created_at
+        ).join(Order, OrderItem.order_id == Order.id).join(
+            Product, OrderItem.product_id == Product.id
+        ).outerjoin(buyer, Order.buyer_id == buyer.id).filter(Product.seller_id == seller_id)
+        if start_date:
+            query = query.filter(OrderItem.created_at >= start_date)
+        if end_date:
+            query = query.filter(OrderItem.created_at < end_date)
+        for row in query.order_by(OrderItem.id).yield_per(YIELD_PER):
+            yield row._asdict()
+    
+    return stream_export(rows, ORDER_EXPORT_COLUMNS, format, "orders")
+
+
+@router.get("/reviews", response_model=List)
+async def get_seller_reviews(
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(require_seller),
+    db: Session = Depends(get_db)
+):
+    seller_product_ids = select(Product.id).where(Product.seller_id == current_user.id)
+    return build_seller_reviews(db, seller_product_ids, page, page_size)
+
+
+@router.get("/reviews/export")
+async def export_seller_reviews(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    current_user: User = Depends(require_seller)
+):
+    seller_id = current_user.id
+    
+    def rows(db: Session):
+        query = db.query(
+            Review.id,
+            Review.product_id,
+            Product.name.label("product_name"),
+            func.coalesce(User.name, "Unknown").label("user_name"),
+            Review.rating,
+            Review.title,
+            Review.comment,
+            Review.seller_response,
+            Review.created_at
+        ).join(Product, Review.product_id == Product.id).outerjoin(
+            User, Review.user_id == User.id
+        ).filter(Product.seller_id == seller_id)
+        if start_date:
+            query = query.filter(Review.created_at >= start_date)
+        if end_date:
+            query = query.filter(Review.created_at < end_date)
+        for row in query.order_by(Review.id).yield_per(YIELD_PER):
+            yield row._asdict()
+    
+    return stream_export(rows, REVIEW_EXPORT_COLUMNS, format, "reviews")
@@ -1,69 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
 from typing import List
 from app.database import get_db
-from app.models import WishlistItem, Product, ProductStatus, User, Review
-from app.schemas import WishlistItemCreate, WishlistItemResponse, ProductResponse, SellerInfo, CategoryResponse
+from app.models import WishlistItem, Product, ProductStatus, User
+from app.schemas import WishlistItemCreate, WishlistItemResponse, WishlistCheckRequest, WishlistCheckResponse
+from app.serializers import get_review_stats, get_product_with_stats, get_product_fragment
+from app.responses import FastJSONResponse, render_json
 from app.auth import get_current_user
+from app.cache import wishlist_membership
+from app.events import bus
 
 router = APIRouter(prefix="/wishlist", tags=["Wishlist"])
 
 
-def get_product_response(product: Product, db: Session) -> ProductResponse:
-    avg_rating = db.query(func.avg(Review.rating)).filter(Review.product_id == product.id).scalar() or 0
-    review_count = db.query(func.count(Review.id)).filter(Review.product_id == product.id).scalar()
-    
-    seller_info = None
-    if product.seller:
-        seller_info = SellerInfo(
-            id=product.seller.id,
-            name=product.seller.name,
-            company_name=product.seller.company_name,
-            avatar_url=product.seller.avatar_url
-        )
-    
-    category_info = None
-    if product.category:
-        category_info = CategoryResponse(
-            id=product.category.id,
-            name=product.category.name,
-            slug=product.category.slug,
-            description=product.category.description,
-            image_url=product.category.image_url,
-            parent_id=product.category.parent_id,
-            created_at=product.category.created_at
-        )
-    
-    return ProductResponse(
-        id=product.id,
-        seller_id=product.seller_id,
-        category_id=product.category_id,
-        name=product.name,
-        slug=product.slug,
-        description=product.description,
-        short_description=product.short_description,
-        price=product.price,
-        original_price=product.original_price,
-        product_type=product.product_type,
-        license_type=product.license_type,
-        status=product.status,
-        image_url=product.image_url,
-        images=product.images,
-        version=product.version,
-        demo_url=product.demo_url,
-        documentation_url=product.documentation_url,
-        features=product.features,
-        requirements=product.requirements,
-        is_featured=product.is_featured,
-        download_count=product.download_count,
-        view_count=product.view_count,
-        created_at=product.created_at,
-        updated_at=product.updated_at,
-        seller=seller_info,
-        category=category_info,
-        average_rating=round(float(avg_rating), 1),
-        review_count=review_count
+def get_wishlist_product_ids(user: User, db: Session):
+    return wishlist_membership.members(
+        user.id,
+        lambda: [row[0] for row in db.query(WishlistItem.product_id).filter(WishlistItem.user_id == user.id)]
     )
 
 
@@ -77,18 +30,19 @@ async def get_wishlist(
         joinedload(WishlistItem.product).joinedload(Product.category)
     ).filter(WishlistItem.user_id == current_user.id).order_by(WishlistItem.created_at.desc()).all()
     
+    stats = get_review_stats([item.product_id for item in items], db)
+    
     result = []
     for item in items:
         if item.product and item.product.status == ProductStatus.ACTIVE:
-            product_response = get_product_response(item.product, db)
-            result.append(WishlistItemResponse(
-                id=item.id,
-                product_id=item.product_id,
-                product=product_response,
-                created_at=item.created_at
-            ))
-    
-    return result
+            result.append({
+                "id": item.id,
+                "product_id": item.product_id,
+                "product": get_product_fragment(item.product, db, stats),
+                "created_at": item.created_at
+            })
+    
+    return FastJSONResponse(render_json(result))
 
 
 @router.post("", response_model=WishlistItemResponse)
@@ -132,8 +86,10 @@ async def add_to_wishlist(
     db.add(wishlist_item)
     db.commit()
     db.refresh(wishlist_item)
+    wishlist_membership.add(current_user.id, item_data.product_id)
+    bus.publish("wishlist.changed", {"user_id": current_user.id}, local=False)
     
-    product_response = get_product_response(product, db)
+    product_response = get_product_with_stats(product, db)
     
     return WishlistItemResponse(
         id=wishlist_item.id,
@@ -162,6 +118,8 @@ async def remove_from_wishlist(
     
     db.delete(wishlist_item)
     db.commit()
+    wishlist_membership.discard(current_user.id, product_id)
+    bus.publish("wishlist.changed", {"user_id": current_user.id}, local=False)
     
     return {"message": "Item removed from wishlist"}
 
@@ -172,9 +130,19 @@ async def check_wishlist(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    exists = db.query(WishlistItem).filter(
-        WishlistItem.user_id == current_user.id,
-        WishlistItem.product_id == product_id
-    ).first() is not None
+    exists = product_id in get_wishlist_product_ids(current_user, db)
     
     return {"in_wishlist": exists}
+
+
+@router.post("/check", response_model=WishlistCheckResponse)
+async def check_wishlist_bulk(
+    check_data: WishlistCheckRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    wishlisted = get_wishlist_product_ids(current_user, db)
+    
+    return WishlistCheckResponse(
+        product_ids=[product_id for product_id in dict.fromkeys(check_data.product_ids) if product_id in wishlisted]
+    )
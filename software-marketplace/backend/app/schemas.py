@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Optional, List, Literal, Dict
 from datetime import datetime
 from app.models import UserRole, ProductStatus, ProductType, LicenseType, OrderStatus
 
@@ -174,12 +174,63 @@ class ProductResponse(BaseModel):
         from_attributes = True
 
 
+class ProductSummary(BaseModel):
+    id: int
+    name: str
+    slug: str
+    short_description: Optional[str] = None
+    price: float
+    original_price: Optional[float] = None
+    product_type: ProductType
+    license_type: LicenseType
+    image_url: Optional[str] = None
+    is_featured: bool
+    seller: Optional[SellerInfo] = None
+    average_rating: float = 0
+    review_count: int = 0
+
+    class Config:
+        from_attributes = True
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class ProductFacets(BaseModel):
+    categories: List[FacetCount]
+    product_types: List[FacetCount]
+    license_types: List[FacetCount]
+    price_ranges: List[FacetCount]
+
+
 class ProductListResponse(BaseModel):
     products: List[ProductResponse]
     total: int
     page: int
     page_size: int
     total_pages: int
+    facets: Optional[ProductFacets] = None
+
+
+class ProductSummaryListResponse(BaseModel):
+    products: List[ProductSummary]
+    total: int
+    page: int
+    page_size: int
+    total_pages: int
+    facets: Optional[ProductFacets] = None
+
+
+class SuggestionResponse(BaseModel):
+    kind: Literal["product", "seller", "category"]
+    id: int
+    text: str
+    slug: Optional[str] = None
+
+    class Config:
+        from_attributes = True
 
 
 class ReviewBase(BaseModel):
@@ -237,6 +288,17 @@ class CartItemUpdate(BaseModel):
     quantity: int = Field(..., ge=1)
 
 
+class CartOperation(BaseModel):
+    op: Literal["add", "set", "remove"]
+    product_id: int
+    quantity: int = Field(1, ge=1)
+
+
+class CartPatchRequest(BaseModel):
+    operations: List[CartOperation] = Field(..., min_length=1)
+    replace: bool = False
+
+
 class CartItemResponse(BaseModel):
     id: int
     product_id: int
@@ -264,6 +326,14 @@ class WishlistItemCreate(BaseModel):
     product_id: int
 
 
+class WishlistCheckRequest(BaseModel):
+    product_ids: List[int] = Field(..., max_length=200)
+
+
+class WishlistCheckResponse(BaseModel):
+    product_ids: List[int]
+
+
 class WishlistItemResponse(BaseModel):
     id: int
     product_id: int
@@ -274,6 +344,15 @@ class WishlistItemResponse(BaseModel):
         from_attributes = True
 
 
+class OrderProductSnapshot(BaseModel):
+    id: int
+    name: str
+    slug: Optional[str] = None
+    image_url: Optional[str] = None
+    seller_name: Optional[str] = None
+    license_type: Optional[LicenseType] = None
+
+
 class OrderItemResponse(BaseModel):
     id: int
     product_id: int
@@ -281,7 +360,7 @@ class OrderItemResponse(BaseModel):
     price: float
     license_key: Optional[str] = None
     download_url: Optional[str] = None
-    product: Optional[ProductResponse] = None
+    product: Optional[OrderProductSnapshot] = None
 
     class Config:
         from_attributes = True
@@ -334,6 +413,18 @@ class SellerAnalytics(BaseModel):
     total_reviews: int
 
 
+class ProductImportError(BaseModel):
+    row: int
+    message: str
+
+
+class ProductImportResult(BaseModel):
+    created: int
+    failed: int
+    errors: List[ProductImportError]
+    errors_truncated: bool = False
+
+
 class SellerOrderResponse(BaseModel):
     id: int
     order_number: str
@@ -347,3 +438,56 @@ class SellerOrderResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class SellerDashboard(BaseModel):
+    analytics: SellerAnalytics
+    products: List[ProductResponse]
+    recent_orders: List[SellerOrderResponse]
+    recent_reviews: List[dict]
+    timings_ms: dict
+
+
+class MediaUploadResponse(BaseModel):
+    hash: str
+    content_type: str
+    size: int
+    urls: Dict[str, str]
+
+
+class ProfileSummary(BaseModel):
+    id: str
+    method: str
+    path: str
+    route: Optional[str] = None
+    trigger: str
+    status_code: Optional[int] = None
+    started_at: datetime
+    duration_ms: float
+    samples: int
+
+
+class LicenseVerifyRequest(BaseModel):
+    keys: List[str] = Field(..., min_length=1, max_length=1000)
+    product_id: Optional[int] = None
+
+
+class LicenseVerifyResult(BaseModel):
+    key: str
+    valid: bool
+    product_id: Optional[int] = None
+
+
+class LicenseVerifyResponse(BaseModel):
+    results: List[LicenseVerifyResult]
+
+
+class ProductFileResponse(BaseModel):
+    product_id: int
+    filename: str
+    size: int
+
+
+class DownloadLinkResponse(BaseModel):
+    url: str
+    expires_at: datetime
@@ -0,0 +1,161 @@
+from sqlalchemy.orm import Session
+from sqlalchemy import func
+from typing import Any, Dict, List, Optional, Tuple
+import pydantic_core
+from app.models import Product, Review
+from app.schemas import ProductResponse, ProductSummary, SellerInfo, CategoryResponse
+from app.cache import product_fragments
+from app.responses import JSONFragment
+
+
+ReviewStats = Dict[int, Tuple[float, int]]
+
+
+def get_review_stats(product_ids: List[int], db: Session) -> ReviewStats:
+    if not product_ids:
+        return {}
+    rows = db.query(
+        Review.product_id,
+        func.avg(Review.rating),
+        func.count(Review.id)
+    ).filter(Review.product_id.in_(set(product_ids))).group_by(Review.product_id).all()
+    return {product_id: (avg_rating or 0, review_count) for product_id, avg_rating, review_count in rows}
+
+
+def get_seller_info(product: Product) -> SellerInfo:
+    return SellerInfo(
+        id=product.seller.id,
+        name=product.seller.name,
+        company_name=product.seller.company_name,
+        avatar_url=product.seller.avatar_url
+    )
+
+
+def get_category_info(product: Product) -> CategoryResponse:
+    return CategoryResponse(
+        id=product.category.id,
+        name=product.category.name,
+        slug=product.category.slug,
+        description=product.category.description,
+        image_url=product.category.image_url,
+        parent_id=product.category.parent_id,
+        created_at=product.category.created_at
+    )
+
+
+def get_product_with_stats(
+    product: Product,
+    db: Session,
+    stats: Optional[ReviewStats] = None
+) -> ProductResponse:
+    if stats is None:
+        stats = get_review_stats([product.id], db)
+    avg_rating, review_count = stats.get(product.id, (0, 0))
+
+    seller_info = None
+    if product.seller:
+        seller_info = get_seller_info(product)
+
+    category_info = None
+    if product.category:
+        category_info = get_category_info(product)
+
+    return ProductResponse(
+        id=product.id,
+        seller_id=product.seller_id,
+        category_id=product.category_id,
+        name=product.name,
+        slug=product.slug,
+        description=product.description,
+        short_description=product.short_description,
+        price=product.price,
+        original_price=product.original_price,
+        product_type=product.product_type,
+        license_type=product.license_type,
+        status=product.status,
+        image_url=product.image_url,
+        images=product.images,
+        version=product.version,
+        demo_url=product.demo_url,
+        documentation_url=product.documentation_url,
+        features=product.features,
+        requirements=product.requirements,
+        is_featured=product.is_featured,
+        download_count=product.download_count,
+        view_count=product.view_count,
+        created_at=product.created_at,
+        updated_at=product.updated_at,
+        seller=seller_info,
+        category=category_info,
+        average_rating=round(float(avg_rating), 1),
+        review_count=review_count
+    )
+
+
+def get_product_fragment(product: Product, db: Session, stats: Optional[ReviewStats] = None) -> JSONFragment:
+    """ProductResponse JSON for a product, reused from the fragment cache while its version holds.
+
+    Every detail view bumps ``view_count``, so it is left out of the cached
+    fragment and its version and spliced in live; otherwise each view would
+    invalidate the fragment it is about to read.
+    """
+    if stats is None:
+        stats = get_review_stats([product.id], db)
+    avg_rating, review_count = stats.get(product.id, (0, 0))
+    version = (product.updated_at, product.download_count, round(float(avg_rating), 1), review_count)
+    data = product_fragments.get(product.id, version)
+    if data is None:
+        data = pydantic_core.to_json(get_product_with_stats(product, db, stats), exclude={"view_count"})
+        product_fragments.put(product.id, version, product.seller_id, data)
+    return JSONFragment(data[:-1] + b',"view_count":' + str(product.view_count or 0).encode() + b"}")
+
+
+def get_product_fragments(products: List[Product], db: Session) -> List[JSONFragment]:
+    stats = get_review_stats([p.id for p in products], db)
+    return [get_product_fragment(p, db, stats) for p in products]
+
+
+def get_product_summaries(products: List[Product], db: Session) -> List[ProductSummary]:
+    stats = get_review_stats([p.id for p in products], db)
+    summaries = []
+    for product in products:
+        avg_rating, review_count = stats.get(product.id, (0, 0))
+        summaries.append(ProductSummary(
+            id=product.id,
+            name=product.name,
+            slug=product.slug,
+            short_description=product.short_description,
+            price=product.price,
+            original_price=product.original_price,
+            product_type=product.product_type,
+            license_type=product.license_type,
+            image_url=product.image_url,
+            is_featured=product.is_featured,
+            seller=get_seller_info(product) if product.seller else None,
+            average_rating=round(float(avg_rating), 1),
+            review_count=review_count
+        ))
+    return summaries
+
+
+def get_product_fields(products: List[Product], fields: List[str], db: Session) -> List[Dict[str, Any]]:
+    stats = {}
+    if "average_rating" in fields or "review_count" in fields:
+        stats = get_review_stats([p.id for p in products], db)
+    result = []
+    for product in products:
+        avg_rating, review_count = stats.get(product.id, (0, 0))
+        item = {}
+        for field in fields:
+            if field == "seller":
+                item[field] = get_seller_info(product).model_dump() if product.seller else None
+            elif field == "category":
+                item[field] = get_category_info(product).model_dump() if product.category else None
+            elif field == "average_rating":
+                item[field] = round(float(avg_rating), 1)
+            elif field == "review_count":
+                item[field] = review_count
+            else:
+                item[field] = getattr(product, field)
+        result.append(item)
+    return result
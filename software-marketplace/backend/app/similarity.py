@@ -0,0 +1,324 @@
+"""Content-based "similar products" from TF-IDF vectors of product text.
+
+The full index is built offline (``python -m app.similarity``) or by the
+``similarity.rebuild`` job. Neighbors are scored with chunked matrix products,
+so peak memory stays at ``CHUNK_SIZE x n`` scores. Product writes enqueue
+``similarity.refresh_product``. That job re-vectorizes one product against the
+current vocabulary and only recomputes the rows whose top-K it can enter or
+leave. Neighbor lists are persisted in ``product_similarities`` and served from
+there.
+
+Every worker keeps its own in-memory copy of the index, and any worker may pick
+up a job. Before writing anything, a job therefore brings the local copy in line
+with the database:
+
+- The vocabulary and IDF weights of the latest build are stored in
+  ``similarity_builds``. A worker that has not seen that build loads it,
+  re-vectorizes every product and reads the persisted neighbor lists.
+- Products whose ``updated_at`` differs from the one this worker last
+  vectorized, and products that were deleted or deactivated, are re-applied
+  without persisting. Their rows were already written by the worker that
+  handled them.
+
+Jobs running at the same moment in two workers can still interleave their
+writes. The rows affected are corrected by the next refresh that touches them.
+
+The matrix has spare rows and doubles its capacity when full, so adding a
+product does not copy the whole matrix.
+"""
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, load_only
+from app import jobs
+from app.models import Product, ProductSimilarity, ProductStatus, SimilarityBuild
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+if np is None:
+    logger.warning("numpy is not installed; similar-product lists will not be built or refreshed")
+
+TOP_K = 10
+CHUNK_SIZE = 512
+MIN_CAPACITY = 64
+MAX_FEATURES = int(os.environ.get("SIMILARITY_MAX_FEATURES", "4096"))
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.-]*[a-z0-9+#]|[a-z0-9]")
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the to with your you our "
+    "all can into more than this will".split()
+)
+TEXT_COLUMNS = (
+    Product.id, Product.name, Product.short_description, Product.description,
+    Product.features, Product.requirements, Product.updated_at
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def product_tokens(product: Product) -> List[str]:
+    parts = [product.name, product.short_description, product.description, product.features, product.requirements]
+    return tokenize(" ".join(part for part in parts if part))
+
+
+class SimilarityIndex:
+    def __init__(self, top_k: int = TOP_K, max_features: int = MAX_FEATURES):
+        self.top_k = top_k
+        self.max_features = max_features
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = None
+        self.build_id: Optional[int] = None
+        self.capacity_matrix = None
+        self.product_ids: List[int] = []
+        self.positions: Dict[int, int] = {}
+        self.versions: Dict[int, Optional[datetime]] = {}
+        self.neighbors: Dict[int, List[Tuple[int, float]]] = {}
+        self.lock = threading.Lock()
+
+    @property
+    def built(self) -> bool:
+        return self.capacity_matrix is not None
+
+    @property
+    def matrix(self):
+        """The rows in use; a view into the preallocated matrix."""
+        return self.capacity_matrix[:len(self.product_ids)]
+
+    def vectorize(self, tokens: List[str]):
+        vector = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for token, count in Counter(tokens).items():
+            column = self.vocabulary.get(token)
+            if column is not None:
+                vector[column] = 1 + math.log(count)
+        vector *= self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _top_k(self, scores, own_row: int) -> List[Tuple[int, float]]:
+        scores = scores.copy()
+        scores[own_row] = -1
+        k = min(self.top_k, len(scores) - 1)
+        if k <= 0:
+            return []
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.product_ids[i], float(scores[i])) for i in candidates if scores[i] > 0]
+
+    def _use_vocabulary(self, build_id: int, terms: List[str], idf: List[float]) -> None:
+        self.build_id = build_id
+        self.vocabulary = {term: column for column, term in enumerate(terms)}
+        self.idf = np.array(idf, dtype=np.float32)
+
+    def _load_vectors(self, products: List[Product]) -> None:
+        self.product_ids = [p.id for p in products]
+        self.positions = {product_id: row for row, product_id in enumerate(self.product_ids)}
+        self.versions = {p.id: p.updated_at for p in products}
+        self.capacity_matrix = np.zeros((max(len(products), MIN_CAPACITY), len(self.vocabulary)), dtype=np.float32)
+        for row, product in enumerate(products):
+            self.capacity_matrix[row] = self.vectorize(product_tokens(product))
+
+    def _active_products(self, db: Session) -> List[Product]:
+        return db.query(Product).options(load_only(*TEXT_COLUMNS)).filter(
+            Product.status == ProductStatus.ACTIVE
+        ).order_by(Product.id).all()
+
+    def build(self, db: Session) -> None:
+        products = self._active_products(db)
+        documents = [product_tokens(p) for p in products]
+
+        document_frequency = Counter(token for tokens in documents for token in set(tokens))
+        terms = [term for term, _ in document_frequency.most_common(self.max_features)]
+        n = len(documents)
+        idf = [math.log((1 + n) / (1 + document_frequency[term])) + 1 for term in terms]
+        db.query(SimilarityBuild).delete(synchronize_session=False)
+        build = SimilarityBuild(terms=json.dumps(terms), idf=json.dumps(idf))
+        db.add(build)
+        db.flush()
+        self._use_vocabulary(build.id, terms, idf)
+        self._load_vectors(products)
+
+        matrix = self.matrix
+        self.neighbors = {}
+        for start in range(0, n, CHUNK_SIZE):
+            scores = matrix[start:start + CHUNK_SIZE] @ matrix.T
+            for offset, row_scores in enumerate(scores):
+                row = start + offset
+                self.neighbors[self.product_ids[row]] = self._top_k(row_scores, row)
+
+        db.query(ProductSimilarity).delete(synchronize_session=False)
+        self._persist(db, self.neighbors.keys())
+        logger.info("Built similarity index for %s products (%s terms)", n, len(terms))
+
+    def _load_build(self, db: Session, build: SimilarityBuild) -> None:
+        """Adopt a build made by another worker: its vocabulary, fresh vectors and the persisted neighbors."""
+        self._use_vocabulary(build.id, json.loads(build.terms), json.loads(build.idf))
+        self._load_vectors(self._active_products(db))
+        self.neighbors = defaultdict(list)
+        rows = db.query(
+            ProductSimilarity.product_id, ProductSimilarity.similar_product_id, ProductSimilarity.score
+        ).order_by(ProductSimilarity.product_id, ProductSimilarity.rank)
+        for product_id, other_id, score in rows:
+            self.neighbors[product_id].append((other_id, score))
+        self.neighbors = dict(self.neighbors)
+
+    def sync(self, db: Session) -> Set[int]:
+        """Catch up with builds and product changes made elsewhere; returns the product ids whose neighbors moved."""
+        build = db.query(SimilarityBuild).order_by(SimilarityBuild.id.desc()).first()
+        if build is None:
+            self.build(db)
+            return set()
+        if build.id != self.build_id:
+            self._load_build(db, build)
+            return set()
+
+        current = dict(db.query(Product.id, Product.updated_at).filter(Product.status == ProductStatus.ACTIVE))
+        changed = [product_id for product_id, updated_at in current.items() if self.versions.get(product_id) != updated_at]
+        gone = [product_id for product_id in self.versions if product_id not in current]
+        affected: Set[int] = set()
+        if changed:
+            products = db.query(Product).options(load_only(*TEXT_COLUMNS, Product.status)).filter(
+                Product.id.in_(changed)
+            ).all()
+            for product in products:
+                affected |= self._apply(product.id, product)
+        for product_id in gone:
+            affected |= self._apply(product_id, None)
+        return affected
+
+    def _append_row(self, product_id: int) -> int:
+        row = len(self.product_ids)
+        if row == len(self.capacity_matrix):
+            grown = np.zeros((max(2 * row, MIN_CAPACITY), self.capacity_matrix.shape[1]), dtype=np.float32)
+            grown[:row] = self.capacity_matrix
+            self.capacity_matrix = grown
+        self.product_ids.append(product_id)
+        self.positions[product_id] = row
+        return row
+
+    def _recompute(self, product_id: int) -> None:
+        row = self.positions[product_id]
+        matrix = self.matrix
+        self.neighbors[product_id] = self._top_k(matrix @ matrix[row], row)
+
+    def _apply(self, product_id: int, product: Optional[Product]) -> Set[int]:
+        """Update one product's vector and the neighbor lists it changes; returns those product ids."""
+        active = product is not None and product.status == ProductStatus.ACTIVE
+
+        if product_id in self.positions:
+            row = self.positions[product_id]
+        elif active:
+            row = self._append_row(product_id)
+        else:
+            # Never vectorized here, but lists loaded from the database may still name it.
+            stale = {
+                other_id for other_id, current in self.neighbors.items()
+                if other_id in self.positions and any(neighbor_id == product_id for neighbor_id, _ in current)
+            }
+            for other_id in stale:
+                self._recompute(other_id)
+            return stale
+
+        self.capacity_matrix[row] = self.vectorize(product_tokens(product)) if active else 0
+        if active:
+            self.versions[product_id] = product.updated_at
+        else:
+            self.versions.pop(product_id, None)
+
+        affected: Set[int] = {product_id}
+        scores = self.matrix @ self.capacity_matrix[row]
+        for other_row, other_id in enumerate(self.product_ids):
+            if other_id == product_id:
+                continue
+            current = self.neighbors.get(other_id, [])
+            contains = any(neighbor_id == product_id for neighbor_id, _ in current)
+            beats_tail = len(current) < self.top_k or scores[other_row] > current[-1][1]
+            if contains or (active and scores[other_row] > 0 and beats_tail):
+                affected.add(other_id)
+
+        for other_id in affected:
+            self._recompute(other_id)
+        if not active:
+            self.neighbors[product_id] = []
+        return affected
+
+    def refresh_product(self, db: Session, product_id: int) -> None:
+        affected = self.sync(db)
+        if product_id not in affected:
+            product = db.query(Product).options(load_only(*TEXT_COLUMNS, Product.status)).filter(
+                Product.id == product_id
+            ).first()
+            affected |= self._apply(product_id, product)
+
+        db.query(ProductSimilarity).filter(
+            ProductSimilarity.product_id.in_(affected)
+        ).delete(synchronize_session=False)
+        self._persist(db, affected)
+
+    def _persist(self, db: Session, product_ids) -> None:
+        db.bulk_insert_mappings(ProductSimilarity, [
+            {"product_id": product_id, "similar_product_id": other_id, "rank": rank, "score": score}
+            for product_id in product_ids
+            for rank, (other_id, score) in enumerate(self.neighbors.get(product_id, []))
+        ])
+
+
+similarity_index = SimilarityIndex()
+
+
+def remove_product_similarities(db: Session, product_id: int) -> None:
+    db.query(ProductSimilarity).filter(or_(
+        ProductSimilarity.product_id == product_id,
+        ProductSimilarity.similar_product_id == product_id
+    )).delete(synchronize_session=False)
+
+
+@jobs.handler("similarity.rebuild")
+def rebuild_similarity(payload: dict, db: Session):
+    if np is None:
+        logger.warning("numpy is not installed; skipping similarity index build")
+        return
+    with similarity_index.lock:
+        similarity_index.build(db)
+
+
+@jobs.handler("similarity.refresh_product")
+def refresh_product_similarity(payload: dict, db: Session):
+    if np is None:
+        return
+    with similarity_index.lock:
+        similarity_index.refresh_product(db, payload["product_id"])
+
+
+def enqueue_refresh(db: Session, product_id: int) -> None:
+    jobs.enqueue(db, "similarity.refresh_product", {"product_id": product_id})
+
+
+def schedule_initial_build(db: Session) -> None:
+    if db.query(ProductSimilarity).first() is None:
+        jobs.enqueue(db, "similarity.rebuild", {})
+        db.commit()
+
+
+if __name__ == "__main__":
+    from app.database import Base, SessionLocal, engine
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        rebuild_similarity({}, session)
+        session.commit()
+    finally:
+        session.close()
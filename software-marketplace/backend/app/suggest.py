@@ -0,0 +1,329 @@
+"""In-memory typeahead over product, seller and category names.
+
+Every word start of a normalized name becomes a key in one sorted array
+(``"pro code guard"`` is reachable from ``pro``, ``code`` and ``guard``), so a
+prefix lookup starts with a ``bisect``. A prefix matching at most
+``SCAN_LIMIT`` terms is answered by scanning its range. Every broader prefix
+keeps a cached list of its ``TOP_CAPACITY`` best keys, built at load. Weight
+changes, inserts and removals update those lists in place. A lookup therefore
+never scans more than ``SCAN_LIMIT`` rows. The exception is a list that
+removals and weight drops have shrunk below ``MAX_LIMIT``, which is rebuilt from
+its range on the next lookup.
+
+Popularity weights reuse the trending weights over lifetime counts. Sellers and
+categories weigh the sum of their active products. Purchases bump weights as
+they happen; view counts are only picked up when a product is written or the
+index is reloaded at startup.
+"""
+import bisect
+import heapq
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session, load_only
+from app.models import Category, Product, ProductStatus, User
+from app.trending import PURCHASE_WEIGHT, VIEW_WEIGHT
+
+MAX_LIMIT = 20
+TOP_CAPACITY = 2 * MAX_LIMIT
+SCAN_LIMIT = 256
+RANGE_END = "\x7f"
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+Key = Tuple[str, int]
+
+
+def normalize(text: str) -> str:
+    return " ".join(WORD_RE.findall(text.lower()))
+
+
+def word_starts(text: str) -> List[str]:
+    normalized = normalize(text)
+    return [normalized[match.start():] for match in WORD_RE.finditer(normalized)]
+
+
+def product_weight(product: Product) -> float:
+    return PURCHASE_WEIGHT * (product.download_count or 0) + VIEW_WEIGHT * (product.view_count or 0)
+
+
+class Suggestion:
+    __slots__ = ("kind", "id", "text", "slug", "weight")
+
+    def __init__(self, kind: str, id: int, text: str, slug: Optional[str] = None, weight: float = 0.0):
+        self.kind = kind
+        self.id = id
+        self.text = text
+        self.slug = slug
+        self.weight = weight
+
+    @property
+    def key(self) -> Key:
+        return (self.kind, self.id)
+
+
+class TopKeys:
+    """Highest-ranked keys under one prefix, best first.
+
+    Every key under the prefix that is not in ``keys`` ranks at or below the
+    last one. ``complete`` means ``keys`` holds every key under the prefix.
+    """
+    __slots__ = ("keys", "complete")
+
+    def __init__(self, keys: List[Key], complete: bool):
+        self.keys = keys
+        self.complete = complete
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._terms: List[Tuple[str, str, int]] = []
+        self._entries: Dict[Key, Suggestion] = {}
+        self._top: Dict[str, TopKeys] = {}
+        self._top_depth = 0
+        self._products: Dict[int, Tuple[Optional[int], Optional[int], float]] = {}
+        self._seller_products: Dict[int, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def _rank(self, key: Key) -> Tuple[float, int]:
+        entry = self._entries[key]
+        return (entry.weight, -entry.id)
+
+    def _range(self, prefix: str, start: int = 0, end: Optional[int] = None) -> Tuple[int, int]:
+        terms = self._terms
+        end = len(terms) if end is None else end
+        first = bisect.bisect_left(terms, (prefix,), start, end)
+        return first, bisect.bisect_left(terms, (prefix + RANGE_END,), first, end)
+
+    def _best(self, start: int, end: int, limit: int) -> Tuple[List[Key], bool]:
+        """Top ``limit`` keys in ``_terms[start:end]`` and whether that was all of them."""
+        keys = {(kind, id) for _, kind, id in self._terms[start:end]}
+        return heapq.nlargest(limit, keys, key=self._rank), len(keys) <= limit
+
+    def _cache_top(self, prefix: str, start: int, end: int) -> TopKeys:
+        top = self._top[prefix] = TopKeys(*self._best(start, end, TOP_CAPACITY))
+        self._top_depth = max(self._top_depth, len(prefix))
+        return top
+
+    def _build_top(self) -> None:
+        """Cache the top keys of every prefix that matches more than ``SCAN_LIMIT`` terms."""
+        self._top.clear()
+        self._top_depth = 0
+        self._collect_top("", 0, len(self._terms))
+
+    def _collect_top(self, prefix: str, start: int, end: int) -> Tuple[Set[Key], bool]:
+        """Candidates for the top keys under ``prefix``, caching lists for its broad children.
+
+        A child's cached list holds the best keys of its whole range, so the
+        union of the children's lists holds the best keys of the parent.
+        """
+        candidates: Set[Key] = set()
+        complete = True
+        position = start
+        while position < end:
+            term, kind, id = self._terms[position]
+            if len(term) <= len(prefix):
+                candidates.add((kind, id))
+                position += 1
+                continue
+            child = term[:len(prefix) + 1]
+            _, child_end = self._range(child, position, end)
+            if child_end - position > SCAN_LIMIT:
+                keys, child_complete = self._collect_top(child, position, child_end)
+                best = heapq.nlargest(TOP_CAPACITY, keys, key=self._rank)
+                self._top[child] = TopKeys(best, child_complete and len(keys) <= TOP_CAPACITY)
+                self._top_depth = max(self._top_depth, len(child))
+                candidates.update(best)
+                complete = complete and self._top[child].complete
+            else:
+                candidates.update((kind, id) for _, kind, id in self._terms[position:child_end])
+            position = child_end
+        return candidates, complete
+
+    def _cached_prefixes(self, entry: Suggestion) -> List[Tuple[str, TopKeys]]:
+        prefixes = {
+            term[:length]
+            for term in word_starts(entry.text)
+            for length in range(1, min(len(term), self._top_depth) + 1)
+        }
+        return [(prefix, self._top[prefix]) for prefix in prefixes if prefix in self._top]
+
+    def _offer(self, prefix: str, top: TopKeys, key: Key, floor: Optional[Tuple[float, int]]) -> None:
+        """Place ``key`` in a cached list it is not in; ``floor`` is the lowest rank the list vouches for."""
+        if top.complete or (floor is not None and self._rank(key) >= floor):
+            top.keys.append(key)
+            top.keys.sort(key=self._rank, reverse=True)
+            if len(top.keys) > TOP_CAPACITY:
+                del top.keys[TOP_CAPACITY:]
+                top.complete = False
+        if not top.complete and len(top.keys) < MAX_LIMIT:
+            # Too few keys left to answer every limit; rebuilt on the next lookup.
+            del self._top[prefix]
+
+    def _reposition(self, entry: Suggestion, previous: Tuple[float, int]) -> None:
+        key = entry.key
+        for prefix, top in self._cached_prefixes(entry):
+            keys = top.keys
+            if key in keys:
+                floor = previous if keys[-1] == key else self._rank(keys[-1])
+                keys.remove(key)
+            else:
+                floor = self._rank(keys[-1]) if keys else None
+            self._offer(prefix, top, key, floor)
+
+    def _insert(self, entry: Suggestion) -> None:
+        self._entries[entry.key] = entry
+        for term in word_starts(entry.text):
+            bisect.insort(self._terms, (term, entry.kind, entry.id))
+        for prefix, top in self._cached_prefixes(entry):
+            self._offer(prefix, top, entry.key, self._rank(top.keys[-1]) if top.keys else None)
+
+    def _remove(self, key: Key) -> Optional[Suggestion]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        for prefix, top in self._cached_prefixes(entry):
+            if key in top.keys:
+                top.keys.remove(key)
+                if not top.complete and len(top.keys) < MAX_LIMIT:
+                    del self._top[prefix]
+        del self._entries[key]
+        for term in word_starts(entry.text):
+            row = (term, entry.kind, entry.id)
+            position = bisect.bisect_left(self._terms, row)
+            if position < len(self._terms) and self._terms[position] == row:
+                del self._terms[position]
+        return entry
+
+    def _put(self, kind: str, id: int, text: Optional[str], slug: Optional[str] = None) -> None:
+        existing = self._entries.get((kind, id))
+        weight = existing.weight if existing else 0.0
+        if existing and existing.text == text and existing.slug == slug:
+            return
+        self._remove((kind, id))
+        if text:
+            self._insert(Suggestion(kind, id, text, slug, weight))
+
+    def _add_weight(self, key: Key, delta: float) -> None:
+        entry = self._entries.get(key)
+        if entry is not None and delta:
+            previous = self._rank(key)
+            entry.weight += delta
+            self._reposition(entry, previous)
+
+    def _set_product(self, product_id: int, seller_id: Optional[int], category_id: Optional[int], weight: float) -> None:
+        previous = self._products.get(product_id)
+        if previous is None:
+            self._seller_products[seller_id] += 1
+            delta = weight
+        else:
+            delta = weight - previous[2]
+        self._products[product_id] = (seller_id, category_id, weight)
+        entry = self._entries[("product", product_id)]
+        self._add_weight(entry.key, weight - entry.weight)
+        self._add_weight(("seller", seller_id), delta)
+        self._add_weight(("category", category_id), delta)
+
+    def _drop_product(self, product_id: int) -> None:
+        previous = self._products.pop(product_id, None)
+        if previous is None:
+            return
+        seller_id, category_id, weight = previous
+        self._add_weight(("seller", seller_id), -weight)
+        self._add_weight(("category", category_id), -weight)
+        self._seller_products[seller_id] -= 1
+        if self._seller_products[seller_id] <= 0:
+            del self._seller_products[seller_id]
+            self._remove(("seller", seller_id))
+
+    def load(self, db: Session) -> None:
+        products = db.query(Product).options(load_only(
+            Product.id, Product.name, Product.slug, Product.seller_id, Product.category_id,
+            Product.download_count, Product.view_count
+        )).filter(Product.status == ProductStatus.ACTIVE).yield_per(10000)
+        with self._lock:
+            self._terms.clear()
+            self._entries.clear()
+            self._products.clear()
+            self._seller_products.clear()
+            for category in db.query(Category).options(load_only(Category.id, Category.name, Category.slug)):
+                self._entries[("category", category.id)] = Suggestion("category", category.id, category.name, category.slug)
+            for product in products:
+                weight = product_weight(product)
+                self._entries[("product", product.id)] = Suggestion("product", product.id, product.name, product.slug)
+                self._products[product.id] = (product.seller_id, product.category_id, weight)
+                self._seller_products[product.seller_id] += 1
+            for seller in db.query(User).options(load_only(User.id, User.name, User.company_name)).filter(
+                User.id.in_(list(self._seller_products))
+            ):
+                self._entries[("seller", seller.id)] = Suggestion("seller", seller.id, seller.company_name or seller.name)
+            for product_id, (seller_id, category_id, weight) in self._products.items():
+                self._entries[("product", product_id)].weight = weight
+                for key in (("seller", seller_id), ("category", category_id)):
+                    if key in self._entries:
+                        self._entries[key].weight += weight
+            self._terms = sorted(
+                (term, entry.kind, entry.id)
+                for entry in self._entries.values()
+                for term in word_starts(entry.text)
+            )
+            self._build_top()
+
+    def update_product(self, product: Product) -> None:
+        seller = product.seller
+        with self._lock:
+            previous = self._products.get(product.id)
+            if product.status != ProductStatus.ACTIVE:
+                self._drop_product(product.id)
+                self._remove(("product", product.id))
+                return
+            if previous is not None and previous[:2] != (product.seller_id, product.category_id):
+                self._drop_product(product.id)
+            if product.seller_id not in self._seller_products:
+                self._put("seller", seller.id, seller.company_name or seller.name)
+            self._put("product", product.id, product.name, product.slug)
+            self._set_product(product.id, product.seller_id, product.category_id, product_weight(product))
+
+    def remove_product(self, product_id: int) -> None:
+        with self._lock:
+            self._drop_product(product_id)
+            self._remove(("product", product_id))
+
+    def update_category(self, category: Category) -> None:
+        with self._lock:
+            self._put("category", category.id, category.name, category.slug)
+
+    def update_seller(self, user: User) -> None:
+        with self._lock:
+            if user.id in self._seller_products:
+                self._put("seller", user.id, user.company_name or user.name)
+
+    def record_purchase(self, product_id: int, quantity: int) -> None:
+        with self._lock:
+            previous = self._products.get(product_id)
+            if previous is None:
+                return
+            seller_id, category_id, weight = previous
+            delta = PURCHASE_WEIGHT * quantity
+            self._products[product_id] = (seller_id, category_id, weight + delta)
+            for key in (("product", product_id), ("seller", seller_id), ("category", category_id)):
+                self._add_weight(key, delta)
+
+    def _matches(self, prefix: str, limit: int) -> List[Key]:
+        top = self._top.get(prefix)
+        if top is None:
+            start, end = self._range(prefix)
+            if end - start <= SCAN_LIMIT:
+                return self._best(start, end, limit)[0]
+            top = self._cache_top(prefix, start, end)
+        return top.keys[:limit]
+
+    def suggest(self, query: str, limit: int = 10) -> List[Suggestion]:
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        with self._lock:
+            return [self._entries[key] for key in self._matches(prefix, min(limit, MAX_LIMIT))]
+
+
+suggestions = SuggestIndex()
@@ -0,0 +1,87 @@
+"""Exponentially decayed popularity scores for /products/trending.
+
+Scores use forward decay. An event at time ``t`` with weight ``w`` counts as
+``w * 2 ** ((t - EPOCH) / half_life)``, and ``Product.trending_score`` holds the
+base-2 log of that sum. Older events are never rewritten. Ordering by the stored
+column still matches ordering by the decayed score at any moment, so reads are
+an index scan of ``limit`` rows.
+
+The linear sum doubles every half-life and would overflow a float within months
+at short half-lives. Its log grows by one per half-life, so it stays small for
+any realistic lifetime of the database. Adding an event is a log-sum-exp of the
+stored value and the event's log weight. This is done as a compare-and-set
+update, so concurrent events from other workers are retried rather than lost.
+A stored 0 stands for one unit of weight at ``EPOCH``, which has decayed to
+nothing long before any real event.
+"""
+import math
+import os
+from datetime import datetime
+from typing import Optional
+from sqlalchemy.orm import Session
+from app.models import Product
+
+
+def _half_life_hours(value: str) -> float:
+    try:
+        hours = float(value)
+    except ValueError:
+        hours = math.nan
+    if not math.isfinite(hours) or hours <= 0:
+        raise ValueError(f"TRENDING_HALF_LIFE_HOURS must be a positive number of hours, got {value!r}")
+    return hours
+
+
+HALF_LIFE_HOURS = _half_life_hours(os.environ.get("TRENDING_HALF_LIFE_HOURS", "72"))
+EPOCH = datetime(2025, 1, 1)
+VIEW_WEIGHT = 1.0
+PURCHASE_WEIGHT = 10.0
+MAX_ATTEMPTS = 5
+
+
+def log_decay_factor(at: Optional[datetime] = None) -> float:
+    hours = ((at or datetime.utcnow()) - EPOCH).total_seconds() / 3600
+    return hours / HALF_LIFE_HOURS
+
+
+def log_add(a: float, b: float) -> float:
+    """log2(2 ** a + 2 ** b) without leaving float range."""
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def add_score(stored_score: float, weight: float, at: Optional[datetime] = None) -> float:
+    return log_add(stored_score or 0.0, math.log2(weight) + log_decay_factor(at))
+
+
+def current_score(stored_score: float, at: Optional[datetime] = None) -> float:
+    """The decayed score at ``at``, in event-weight units."""
+    return 2 ** ((stored_score or 0.0) - log_decay_factor(at))
+
+
+def _record(product_id: int, weight: float, db: Session, counters: dict) -> None:
+    for _ in range(MAX_ATTEMPTS):
+        stored = db.query(Product.trending_score).filter(Product.id == product_id).scalar()
+        if stored is None:
+            return
+        updated = db.query(Product).filter(
+            Product.id == product_id, Product.trending_score == stored
+        ).update({
+            **counters,
+            Product.trending_score: add_score(stored, weight),
+            Product.updated_at: Product.updated_at
+        }, synchronize_session="evaluate")
+        if updated:
+            return
+    # Lost every race; keep the counters, which are exact, and drop this event's trending weight.
+    db.query(Product).filter(Product.id == product_id).update(
+        {**counters, Product.updated_at: Product.updated_at}, synchronize_session="evaluate"
+    )
+
+
+def record_view(product_id: int, db: Session) -> None:
+    _record(product_id, VIEW_WEIGHT, db, {Product.view_count: Product.view_count + 1})
+
+
+def record_purchase(product_id: int, quantity: int, db: Session) -> None:
+    _record(product_id, PURCHASE_WEIGHT * quantity, db, {Product.download_count: Product.download_count + quantity})
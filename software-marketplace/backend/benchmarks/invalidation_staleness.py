@@ -0,0 +1,85 @@
+"""Staleness of caches in other workers after an invalidation event.
+
+Starts ``WORKERS`` subscriber processes on a shared SQLite bus, publishes
+``EVENTS`` events from this process and reports how long each took to reach
+every worker. With the SQLite transport, the worst case should stay close to
+``EVENT_POLL_INTERVAL`` plus scheduling noise.
+
+Run from the backend directory: ``python benchmarks/invalidation_staleness.py``
+Pass a ``redis://`` URL as the first argument to measure that transport instead.
+"""
+import asyncio
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.events import InvalidationBus, create_transport, POLL_INTERVAL
+
+WORKERS = 4
+EVENTS = 50
+EVENT_GAP = 0.05
+
+
+def subscriber(url: str, ready, results) -> None:
+    async def run():
+        bus = InvalidationBus(create_transport(url))
+        lags = []
+        done = asyncio.Event()
+
+        @bus.subscribe("bench.ping")
+        def on_ping(payload):
+            lags.append(time.time() - payload["sent_at"])
+            if payload["last"]:
+                done.set()
+
+        await bus.start()
+        ready.release()
+        await asyncio.wait_for(done.wait(), timeout=EVENTS * EVENT_GAP + 30)
+        await bus.stop()
+        results.put(lags)
+
+    asyncio.run(run())
+
+
+def main() -> None:
+    directory = tempfile.mkdtemp()
+    url = sys.argv[1] if len(sys.argv) > 1 else f"sqlite:///{os.path.join(directory, 'events.db')}"
+    publisher = InvalidationBus(create_transport(url))
+
+    ready = multiprocessing.Semaphore(0)
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=subscriber, args=(url, ready, results)) for _ in range(WORKERS)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        ready.acquire()
+
+    for i in range(EVENTS):
+        publisher.publish("bench.ping", {"sent_at": time.time(), "last": i == EVENTS - 1}, local=False)
+        time.sleep(EVENT_GAP)
+
+    lags = []
+    for _ in processes:
+        worker_lags = results.get(timeout=60)
+        assert len(worker_lags) == EVENTS, f"worker saw {len(worker_lags)} of {EVENTS} events"
+        lags.extend(worker_lags)
+    for process in processes:
+        process.join()
+
+    lags.sort()
+    print(f"transport: {url.split(':')[0]}, poll interval: {POLL_INTERVAL * 1000:.0f} ms")
+    print(f"{WORKERS} workers x {EVENTS} events, all delivered")
+    print(f"  median lag: {statistics.median(lags) * 1000:7.1f} ms")
+    print(f"  p99 lag:    {lags[int(len(lags) * 0.99) - 1] * 1000:7.1f} ms")
+    print(f"  max lag:    {lags[-1] * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
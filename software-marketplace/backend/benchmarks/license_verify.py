@@ -0,0 +1,70 @@
+"""Throughput of license key verification on one core.
+
+Fills the index with ``KEYS`` issued keys, then times ``verify_many`` plus JSON
+rendering for batches of mixed valid and invalid keys, which is the work
+``POST /licenses/verify`` does after request parsing. Also times a single-key
+``lookup``, and whole requests through the ASGI app and its middleware.
+
+Run from the backend directory: ``python benchmarks/license_verify.py``
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+import timeit
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.licenses import license_index
+from app.main import app
+from app.responses import FastJSONResponse
+from app.routers.orders import generate_license_key
+
+KEYS = 500_000
+PRODUCTS = 200
+BATCH_SIZES = (1, 100, 1000)
+ROUNDS = 20
+
+
+def main() -> None:
+    issued = [(generate_license_key(), random.randrange(1, PRODUCTS + 1)) for _ in range(KEYS)]
+    license_index.add(issued)
+    unknown = [generate_license_key() for _ in range(1000)]
+    malformed = ["not-a-key"] * 100
+
+    for size in BATCH_SIZES:
+        batch = [key for key, _ in random.sample(issued, size // 2 or 1)] + unknown[:size // 2] + malformed[:size // 10]
+        batch = batch[:size]
+
+        def run():
+            FastJSONResponse({"results": license_index.verify_many(batch)}).body
+
+        seconds = timeit.timeit(run, number=ROUNDS * (1000 // size)) / (ROUNDS * (1000 // size))
+        print(f"batch of {size:4}: {seconds * 1e6:8.1f} us per request, {size / seconds:10,.0f} keys/s")
+
+    keys = [key for key, _ in issued[:10000]] + unknown
+    seconds = timeit.timeit(lambda: [license_index.lookup(key) for key in keys], number=ROUNDS) / (ROUNDS * len(keys))
+    print(f"lookup:          {seconds * 1e9:8.0f} ns per key,     {1 / seconds:10,.0f} keys/s")
+
+    asyncio.run(measure_http(issued, unknown))
+
+
+async def measure_http(issued, unknown) -> None:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for size in BATCH_SIZES:
+            body = {"keys": [key for key, _ in issued[:size // 2 or 1]] + unknown[:size // 2]}
+            requests = max(20, 2000 // size)
+            start = time.perf_counter()
+            for _ in range(requests):
+                response = await client.post("/licenses/verify", json=body)
+            seconds = (time.perf_counter() - start) / requests
+            assert response.status_code == 200
+            print(f"HTTP batch {size:4}: {seconds * 1e6:8.1f} us per request, {size / seconds:10,.0f} keys/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Serialization cost of one 50-product listing page.
+
+Compares the previous path (build the models, let FastAPI re-validate them
+through ``response_model`` and render with ``json.dumps``) with the fast path
+(build once, render straight to bytes with ``FastJSONResponse``).
+
+Run from the backend directory: ``python benchmarks/serialization.py``
+"""
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+from app.models import Product, User, Category, ProductStatus, ProductType, LicenseType, UserRole
+from app.schemas import ProductListResponse
+from app.serializers import get_product_with_stats
+from app.responses import FastJSONResponse
+
+PAGE_SIZE = 50
+ROUNDS = 200
+
+
+def make_products():
+    now = datetime.utcnow()
+    seller = User(id=1, email="seller@example.com", name="Seller", role=UserRole.SELLER, company_name="Acme Software")
+    category = Category(id=1, name="Development Tools", slug="development-tools", description="IDEs and utilities", created_at=now)
+    products = []
+    for i in range(PAGE_SIZE):
+        products.append(Product(
+            id=i + 1,
+            seller_id=seller.id,
+            category_id=category.id,
+            name=f"Product {i}",
+            slug=f"product-{i}",
+            description="A long product description. " * 20,
+            short_description="Short description",
+            price=49.99,
+            original_price=79.99,
+            product_type=ProductType.SOFTWARE,
+            license_type=LicenseType.PERPETUAL,
+            status=ProductStatus.ACTIVE,
+            image_url="https://example.com/image.png",
+            images="https://example.com/1.png,https://example.com/2.png",
+            version="1.0.0",
+            features="Feature one\nFeature two\nFeature three",
+            requirements="Windows 10+, macOS 12+",
+            is_featured=False,
+            download_count=100,
+            view_count=1000,
+            created_at=now,
+            updated_at=now,
+            seller=seller,
+            category=category
+        ))
+    stats = {p.id: (4.5, 12) for p in products}
+    return products, stats
+
+
+def build_page(products, stats):
+    return ProductListResponse(
+        products=[get_product_with_stats(p, None, stats) for p in products],
+        total=PAGE_SIZE,
+        page=1,
+        page_size=PAGE_SIZE,
+        total_pages=1
+    )
+
+
+def main():
+    products, stats = make_products()
+    adapter = TypeAdapter(ProductListResponse)
+
+    def before():
+        page = build_page(products, stats)
+        value = adapter.validate_python(page, from_attributes=True)
+        return JSONResponse(adapter.dump_python(value, mode="json")).body
+
+    def after():
+        return FastJSONResponse(build_page(products, stats)).body
+
+    assert len(before()) == len(after())
+    for name, fn in (("before", before), ("after", after)):
+        seconds = min(timeit.repeat(fn, number=ROUNDS, repeat=5)) / ROUNDS
+        print(f"{name:>6}: {seconds * 1e6:8.1f} us per {PAGE_SIZE}-product page")
+
+
+if __name__ == "__main__":
+    main()
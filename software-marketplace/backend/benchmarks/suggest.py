@@ -0,0 +1,78 @@
+"""Typeahead latency on a synthetic 100k-product index.
+
+Names are three words drawn from a small software vocabulary, so one- and
+two-letter prefixes match tens of thousands of terms, as they do in a real
+catalog. Each prefix is timed right after a purchase has changed weights under
+it, which used to throw away the memoized result and force a scan of the whole
+matching range. The last column is that range scan, for comparison.
+
+Run from the backend directory: ``python benchmarks/suggest.py``
+"""
+import heapq
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.suggest import SuggestIndex, Suggestion, word_starts
+
+PRODUCTS = 100_000
+ROUNDS = 200
+VOCABULARY = (
+    "pro code guard studio cloud data sync secure backup deploy monitor analytics design "
+    "editor server api build test vault stream pixel audio video forge craft pilot scan "
+    "shield bridge flow grid stack logic nexus matrix swift quantum core edge"
+).split()
+PREFIXES = ["p", "s", "c", "pr", "st", "co", "pro", "sec", "code g", "quantum"]
+
+
+def build_index() -> SuggestIndex:
+    random.seed(7)
+    index = SuggestIndex()
+    for product_id in range(PRODUCTS):
+        name = " ".join(random.sample(VOCABULARY, 3)) + f" {product_id}"
+        index._entries[("product", product_id)] = Suggestion("product", product_id, name, weight=random.random() * 100)
+        index._products[product_id] = (None, None, index._entries[("product", product_id)].weight)
+    index._terms = sorted(
+        (term, entry.kind, entry.id) for entry in index._entries.values() for term in word_starts(entry.text)
+    )
+    started = time.perf_counter()
+    index._build_top()
+    print(f"{len(index._terms)} terms, {len(index._top)} cached prefixes built in {time.perf_counter() - started:.2f} s")
+    return index
+
+
+def range_scan(index: SuggestIndex, prefix: str, limit: int = 10):
+    start, end = index._range(prefix)
+    return heapq.nlargest(limit, {(kind, id) for _, kind, id in index._terms[start:end]}, key=index._rank)
+
+
+def main():
+    index = build_index()
+    print(f"{'prefix':>8} {'terms':>7} {'lookup after purchase':>22} {'purchase':>9} {'range scan':>11}")
+    for prefix in PREFIXES:
+        start, end = index._range(prefix)
+        matching = [id for _, _, id in index._terms[start:end]]
+        lookups = purchases = 0.0
+        for _ in range(ROUNDS):
+            product_id = random.choice(matching)
+            started = time.perf_counter()
+            index.record_purchase(product_id, 1)
+            purchases += time.perf_counter() - started
+            started = time.perf_counter()
+            index.suggest(prefix)
+            lookups += time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(5):
+            range_scan(index, prefix)
+        scan = (time.perf_counter() - started) / 5
+        print(
+            f"{prefix:>8} {end - start:>7} {lookups / ROUNDS * 1e3:>19.3f} ms "
+            f"{purchases / ROUNDS * 1e3:>6.3f} ms {scan * 1e3:>8.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+# The app keeps its SQLite file, uploads and profiles relative to the working
+# directory, so run the whole session in a scratch directory before importing it.
+os.chdir(tempfile.mkdtemp(prefix="softmarket-tests-"))
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.main import app
+
+
+@pytest.fixture
+def db():
+    """A session on an empty in-memory database with the full schema."""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def client():
+    """The app with its lifespan running against the seeded scratch database."""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def login(client, email: str, password: str) -> dict:
+    response = client.post("/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return login(client, "admin@softmarket.com", "admin123")
+
+
+@pytest.fixture(scope="session")
+def seller_headers(client):
+    return login(client, "seller1@techcorp.com", "seller123")
+
+
+@pytest.fixture(scope="session")
+def buyer_headers(client):
+    return login(client, "buyer@example.com", "buyer123")
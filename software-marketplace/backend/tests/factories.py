@@ -0,0 +1,47 @@
+from itertools import count
+from sqlalchemy.orm import Session
+
+from app.models import Category, Order, OrderItem, OrderStatus, Product, ProductStatus, User, UserRole
+
+_ids = count(1)
+
+
+def make_user(db: Session, role: UserRole = UserRole.BUYER, **fields) -> User:
+    n = next(_ids)
+    user = User(email=f"user{n}@example.com", password_hash="x", name=f"User {n}", role=role, **fields)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def make_category(db: Session, name: str = None, parent: Category = None) -> Category:
+    n = next(_ids)
+    name = name or f"Category {n}"
+    category = Category(name=name, slug=f"{name.lower().replace(' ', '-')}-{n}", parent_id=parent.id if parent else None)
+    db.add(category)
+    db.commit()
+    return category
+
+
+def make_product(db: Session, seller: User, **fields) -> Product:
+    n = next(_ids)
+    fields.setdefault("name", f"Product {n}")
+    fields.setdefault("slug", f"product-{n}")
+    fields.setdefault("price", 10.0)
+    fields.setdefault("status", ProductStatus.ACTIVE)
+    product = Product(seller_id=seller.id, **fields)
+    db.add(product)
+    db.commit()
+    return product
+
+
+def make_order(db: Session, buyer: User, products: list, status: OrderStatus = OrderStatus.COMPLETED) -> Order:
+    n = next(_ids)
+    total = sum(product.price for product in products)
+    order = Order(buyer_id=buyer.id, order_number=f"ORD-TEST-{n}", status=status, subtotal=total, total=total)
+    db.add(order)
+    db.flush()
+    for product in products:
+        db.add(OrderItem(order_id=order.id, product_id=product.id, price=product.price))
+    db.commit()
+    return order
@@ -0,0 +1,54 @@
+import pytest
+
+
+@pytest.fixture
+def cart(client, buyer_headers):
+    def patch(**body):
+        return client.patch("/cart", json=body, headers=buyer_headers)
+
+    client.delete("/cart", headers=buyer_headers)
+    yield patch
+    client.delete("/cart", headers=buyer_headers)
+
+
+@pytest.fixture(scope="module")
+def product_ids(client):
+    return [product["id"] for product in client.get("/products").json()["products"][:3]]
+
+
+def quantities(response):
+    assert response.status_code == 200, response.text
+    return {item["product_id"]: item["quantity"] for item in response.json()["items"]}
+
+
+def test_operations_apply_in_order(cart, product_ids):
+    first, second, _ = product_ids
+    added = cart(operations=[
+        {"op": "add", "product_id": first, "quantity": 2},
+        {"op": "add", "product_id": second},
+        {"op": "add", "product_id": first},
+    ])
+    assert quantities(added) == {first: 3, second: 1}
+    changed = cart(operations=[
+        {"op": "remove", "product_id": second},
+        {"op": "set", "product_id": first, "quantity": 5},
+    ])
+    assert quantities(changed) == {first: 5}
+
+
+def test_replace_discards_the_existing_cart(cart, product_ids):
+    first, _, third = product_ids
+    cart(operations=[{"op": "add", "product_id": first}])
+    assert quantities(cart(replace=True, operations=[{"op": "set", "product_id": third, "quantity": 1}])) == {third: 1}
+
+
+def test_an_empty_batch_is_rejected(cart):
+    assert cart(replace=True, operations=[]).status_code == 422
+
+
+def test_an_invalid_operation_changes_nothing(cart, product_ids, client, buyer_headers):
+    first = product_ids[0]
+    cart(operations=[{"op": "add", "product_id": first}])
+    response = cart(operations=[{"op": "set", "product_id": first, "quantity": 4}, {"op": "add", "product_id": 999999}])
+    assert response.status_code == 404
+    assert quantities(client.get("/cart", headers=buyer_headers)) == {first: 1}
@@ -0,0 +1,52 @@
+from app import category_tree
+from app.models import Product, ProductStatus, UserRole
+from tests.factories import make_category, make_product, make_user
+
+
+def test_products_in_subcategories_count_toward_every_ancestor(db):
+    seller = make_user(db, UserRole.SELLER)
+    root = make_category(db)
+    child = make_category(db, parent=root)
+    grandchild = make_category(db, parent=child)
+    sibling = make_category(db)
+    make_product(db, seller, category_id=root.id)
+    make_product(db, seller, category_id=grandchild.id)
+    make_product(db, seller, category_id=grandchild.id, status=ProductStatus.DRAFT)
+    category_tree.rebuild(db)
+
+    assert category_tree.product_counts(db) == {root.id: 2, child.id: 1, grandchild.id: 1}
+    in_child = db.query(Product.id).filter(category_tree.in_category(child.id)).all()
+    assert len(in_child) == 2
+    assert db.query(Product.id).filter(category_tree.in_category(sibling.id)).all() == []
+
+
+def test_new_categories_join_the_closure_incrementally(db):
+    root = make_category(db)
+    child = make_category(db, parent=root)
+    category_tree.rebuild(db)
+    leaf = make_category(db, parent=child)
+    category_tree.add_category(db, leaf)
+    db.commit()
+    seller = make_user(db, UserRole.SELLER)
+    make_product(db, seller, category_id=leaf.id)
+    assert category_tree.product_counts(db) == {root.id: 1, child.id: 1, leaf.id: 1}
+
+
+def test_category_listing_counts_products_in_subcategories(client, admin_headers, seller_headers):
+    root = client.get("/categories").json()[0]
+    child = client.post(
+        "/categories", json={"name": "Nested 037", "slug": "nested-037", "parent_id": root["id"]}, headers=admin_headers
+    )
+    assert child.status_code == 200, child.text
+    product = client.post(
+        "/products",
+        json={"name": "Nested Tool", "slug": "nested-tool-037", "price": 5, "category_id": child.json()["id"],
+              "status": "active"},
+        headers=seller_headers
+    )
+    assert product.status_code == 200, product.text
+
+    listed = next(category for category in client.get("/categories").json() if category["id"] == root["id"])
+    nested = next(category for category in listed["children"] if category["id"] == child.json()["id"])
+    assert nested["product_count"] == 1
+    assert listed["product_count"] == root["product_count"] + 1
@@ -0,0 +1,61 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app import compression
+from app.compression import CompressionMiddleware, negotiate_encoding
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("identity", None),
+    ("gzip", "gzip"),
+    ("gzip;q=0.5, deflate", "gzip"),
+    ("gzip;q=0, *;q=0", None),
+    ("*", "br" if compression.brotli else "gzip"),
+])
+def test_negotiation(header, expected):
+    assert negotiate_encoding(header) == expected
+
+
+@pytest.fixture(scope="module")
+def small_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.get("/tiny")
+    def tiny():
+        return PlainTextResponse("ok")
+
+    @app.get("/stream")
+    def stream():
+        def rows():
+            for i in range(5):
+                yield (b'{"row":%d}\n' % i) * 100
+        return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+    return TestClient(app)
+
+
+def test_small_bodies_pass_through(small_app):
+    response = small_app.get("/tiny", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.text == "ok"
+
+
+def test_streams_are_compressed_chunk_by_chunk(small_app):
+    response = small_app.get("/stream", headers={"Accept-Encoding": "gzip, br;q=0"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text.count('"row"') == 500
+
+
+def test_cached_catalog_is_served_precompressed(client):
+    first = client.get("/products", headers={"Accept-Encoding": "gzip"})
+    again = client.get("/products", headers={"Accept-Encoding": "gzip"})
+    plain = client.get("/products", headers={"Accept-Encoding": "identity"})
+    assert first.headers["content-encoding"] == again.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in again.headers["vary"]
+    assert "content-encoding" not in plain.headers
+    assert again.json() == plain.json()
@@ -0,0 +1,89 @@
+import os
+from datetime import datetime, timedelta
+
+from app import downloads
+from app.database import SessionLocal
+from app.models import Job, Product
+
+DATA = bytes(range(256)) * 40
+
+
+def upload(client, headers, name, data=DATA, product_id=1):
+    response = client.put(f"/downloads/products/{product_id}", files={"file": (name, data)}, headers=headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def buyer_link(client, buyer_headers, product_id=1):
+    client.post("/cart/items", json={"product_id": product_id, "quantity": 1}, headers=buyer_headers)
+    order = client.post(
+        "/orders/checkout", json={"billing_name": "Buyer", "billing_email": "buyer@example.com"}, headers=buyer_headers
+    )
+    assert order.status_code == 200, order.text
+    item = next(item for item in order.json()["items"] if item["product_id"] == product_id)
+    response = client.post(item["download_url"], headers=buyer_headers)
+    assert response.status_code == 200, response.text
+    return response.json()["url"]
+
+
+def test_signed_links_serve_ranges_and_reject_tampering(client, seller_headers, buyer_headers):
+    assert upload(client, seller_headers, "../evil/setup.bin")["filename"] == "setup.bin"
+    url = buyer_link(client, buyer_headers)
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.content == DATA
+    assert 'filename="setup.bin"' in full.headers["content-disposition"]
+
+    partial = client.get(url, headers={"Range": "bytes=100-199"})
+    assert partial.status_code == 206
+    assert partial.headers["content-range"] == f"bytes 100-199/{len(DATA)}"
+    assert partial.content == DATA[100:200]
+
+    assert client.get(url[:-3] + "abc").status_code == 403
+
+
+def test_expired_links_are_rejected():
+    token, _ = downloads.sign_download(1, 1, "setup.bin", ttl=-1)
+    assert downloads.verify_download(token) is None
+    token, _ = downloads.sign_download(1, 1, "../setup.bin")
+    assert downloads.verify_download(token) is None
+
+
+def test_concurrent_download_cap_is_enforced_when_the_response_starts(client, seller_headers, buyer_headers):
+    upload(client, seller_headers, "capped.bin")
+    url = buyer_link(client, buyer_headers)
+    user_id = downloads.verify_download(url.rsplit("/", 1)[1]).user_id
+    for _ in range(downloads.download_slots.limit):
+        assert downloads.download_slots.acquire(user_id)
+    try:
+        busy = client.get(url)
+        assert busy.status_code == 429
+        assert busy.headers["retry-after"] == "5"
+    finally:
+        for _ in range(downloads.download_slots.limit):
+            downloads.download_slots.release(user_id)
+    assert client.get(url).status_code == 200
+    assert user_id not in downloads.download_slots._active
+
+
+def test_replacing_a_file_keeps_outstanding_links_working(client, seller_headers, buyer_headers):
+    upload(client, seller_headers, "v1.bin", b"first")
+    old_url = buyer_link(client, buyer_headers)
+    upload(client, seller_headers, "v2.bin", b"second")
+    assert client.get(old_url).content == b"first"
+    assert client.get(buyer_link(client, buyer_headers)).content == b"second"
+
+    db = SessionLocal()
+    try:
+        job = db.query(Job).filter(Job.name == "downloads.remove_file").order_by(Job.id.desc()).first()
+        assert job.run_at >= datetime.utcnow() + timedelta(seconds=downloads.LINK_TTL - 60)
+        old_file = downloads.verify_download(old_url.rsplit("/", 1)[1]).filename
+        downloads.remove_file({"product_id": 1, "file": old_file}, db)
+        assert not os.path.exists(downloads.product_file_path(1, old_file))
+        current = db.query(Product.download_file).filter(Product.id == 1).scalar()
+        downloads.remove_file({"product_id": 1, "file": current}, db)
+        assert os.path.exists(downloads.product_file_path(1, current))
+    finally:
+        db.close()
+    assert client.get(old_url).status_code == 404
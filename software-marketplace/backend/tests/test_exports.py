@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from app import exports
+from app.models import OrderStatus
+
+
+def test_chunks_reassemble_into_the_full_export(monkeypatch):
+    monkeypatch.setattr(exports, "CHUNK_ROWS", 2)
+    rows = [
+        {"id": n, "name": f'Tool, "v{n}"\nline two', "status": OrderStatus.COMPLETED, "at": datetime(2026, 1, n)}
+        for n in range(1, 6)
+    ]
+    chunks = list(exports.csv_chunks(["id", "name", "status"], iter(rows)))
+    assert len(chunks) == 3
+    parsed = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [row["name"] for row in parsed] == [row["name"] for row in rows]
+    assert {row["status"] for row in parsed} == {"completed"}
+
+    lines = b"".join(exports.ndjson_chunks(iter(rows))).decode().splitlines()
+    assert [json.loads(line)["at"] for line in lines] == [f"2026-01-0{n}T00:00:00" for n in range(1, 6)]
+
+
+def test_order_exports_match_the_paged_listing(client, seller_headers, buyer_headers):
+    mine = client.get("/seller/products", headers=seller_headers).json()[0]["id"]
+    client.delete("/cart", headers=buyer_headers)
+    client.post("/cart/items", json={"product_id": mine}, headers=buyer_headers)
+    assert client.post(
+        "/orders/checkout", json={"billing_name": "Buyer", "billing_email": "buyer@example.com"}, headers=buyer_headers
+    ).status_code == 200
+
+    listed = sorted(client.get("/seller/orders?page_size=100", headers=seller_headers).json(), key=lambda row: row["id"])
+    exported = client.get("/seller/orders/export", headers=seller_headers)
+    assert exported.headers["content-disposition"] == 'attachment; filename="orders.csv"'
+    assert [row["order_number"] for row in csv.DictReader(io.StringIO(exported.text))] == [
+        row["order_number"] for row in listed
+    ]
+
+    ndjson = client.get("/seller/orders/export?format=ndjson", headers=seller_headers)
+    assert [json.loads(line) for line in ndjson.text.splitlines()] == listed
+
+    old = client.get("/seller/orders/export?format=ndjson&start_date=2001-01-01&end_date=2002-01-01", headers=seller_headers)
+    assert old.text == ""
+
+
+def test_exports_require_a_seller(client, buyer_headers):
+    assert client.get("/seller/reviews/export", headers=buyer_headers).status_code == 403
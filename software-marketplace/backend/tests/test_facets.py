@@ -0,0 +1,37 @@
+from sqlalchemy import update
+
+from app.models import LicenseType, Product, ProductType, UserRole
+from app.routers.products import get_facet_counts
+from tests.factories import make_category, make_product, make_user
+
+
+def facet_dict(facets):
+    return {facet.value: facet.count for facet in facets}
+
+
+def test_each_facet_ignores_its_own_filter(db):
+    seller = make_user(db, UserRole.SELLER)
+    category = make_category(db)
+    make_product(db, seller, category_id=category.id, product_type=ProductType.SOFTWARE)
+    make_product(db, seller, category_id=category.id, product_type=ProductType.TOOL)
+    make_product(db, seller, product_type=ProductType.SOFTWARE)
+
+    facets = get_facet_counts(
+        db, [Product.status == "active"], [Product.category_id == category.id], ProductType.SOFTWARE, None, []
+    )
+    assert facet_dict(facets.product_types) == {"software": 1, "tool": 1}
+    assert facet_dict(facets.categories) == {str(category.id): 1}
+
+
+def test_products_without_a_type_or_license_are_skipped_in_those_facets(db):
+    seller = make_user(db, UserRole.SELLER)
+    category = make_category(db)
+    untyped = make_product(db, seller, category_id=category.id)
+    make_product(db, seller, category_id=category.id, license_type=LicenseType.SUBSCRIPTION)
+    db.execute(update(Product).where(Product.id == untyped.id).values(product_type=None, license_type=None))
+    db.commit()
+
+    facets = get_facet_counts(db, [Product.status == "active"], [], None, None, [])
+    assert facet_dict(facets.product_types) == {"software": 1}
+    assert facet_dict(facets.license_types) == {"subscription": 1}
+    assert facet_dict(facets.categories) == {str(category.id): 2}
@@ -0,0 +1,56 @@
+from app.cache import ProductFragmentCache
+
+
+def test_fragments_are_only_served_for_the_same_version():
+    cache = ProductFragmentCache(max_bytes=1024)
+    cache.put(1, ("v1",), 10, b'{"id":1}')
+    assert cache.get(1, ("v1",)) == b'{"id":1}'
+    assert cache.get(1, ("v2",)) is None
+    cache.put(1, ("v2",), 10, b'{"id":1,"x":2}')
+    assert len(cache) == 1
+    assert cache.size == len(b'{"id":1,"x":2}')
+
+
+def test_least_recently_used_fragments_are_evicted_by_size():
+    cache = ProductFragmentCache(max_bytes=20)
+    cache.put(1, 1, 10, b"a" * 8)
+    cache.put(2, 1, 10, b"b" * 8)
+    assert cache.get(1, 1) is not None
+    cache.put(3, 1, 10, b"c" * 8)
+    assert cache.get(2, 1) is None
+    assert cache.get(1, 1) is not None
+    assert cache.size == 16
+
+
+def test_invalidate_seller_drops_only_their_products():
+    cache = ProductFragmentCache(max_bytes=1024)
+    cache.put(1, 1, 10, b"one")
+    cache.put(2, 1, 11, b"two")
+    cache.put(3, 1, 10, b"three")
+    cache.invalidate_seller(10)
+    assert len(cache) == 1
+    assert cache.get(2, 1) == b"two"
+    assert cache.size == 3
+
+
+def test_product_responses_follow_product_and_seller_edits(client, seller_headers):
+    me = client.get("/auth/me", headers=seller_headers).json()
+    product = next(
+        p for p in client.get("/products?page_size=50").json()["products"] if p["seller_id"] == me["id"]
+    )
+
+    first = client.get(f"/products/{product['id']}").json()
+    second = client.get(f"/products/{product['id']}").json()
+    assert second["view_count"] == first["view_count"] + 1
+
+    assert client.put(
+        f"/products/{product['id']}", json={"name": "Fragment Renamed"}, headers=seller_headers
+    ).status_code == 200
+    assert client.get(f"/products/{product['id']}").json()["name"] == "Fragment Renamed"
+
+    company = me["company_name"]
+    try:
+        client.put("/auth/me", json={"company_name": "Fragment Co"}, headers=seller_headers)
+        assert client.get(f"/products/{product['id']}").json()["seller"]["company_name"] == "Fragment Co"
+    finally:
+        client.put("/auth/me", json={"company_name": company}, headers=seller_headers)
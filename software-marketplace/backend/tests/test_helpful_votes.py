@@ -0,0 +1,69 @@
+from app.helpful_votes import HelpfulCountBuffer, count_votes, insert_vote, recount_all
+from app.models import Review, UserRole
+from tests.factories import make_product, make_user
+
+
+def make_review(db, product, author):
+    review = Review(product_id=product.id, user_id=author.id, rating=5, title="Great", comment="Works")
+    db.add(review)
+    db.commit()
+    return review
+
+
+def vote(db, buffer, review, user):
+    accepted = insert_vote(db, review.id, user.id)
+    db.commit()
+    if accepted:
+        buffer.add(review.id)
+    return accepted
+
+
+def test_a_user_counts_once_per_review(db):
+    seller = make_user(db, UserRole.SELLER)
+    review = make_review(db, make_product(db, seller), make_user(db))
+    voter = make_user(db)
+    buffer = HelpfulCountBuffer()
+    assert vote(db, buffer, review, voter)
+    assert not vote(db, buffer, review, voter)
+    buffer.flush(db)
+    db.refresh(review)
+    assert review.helpful_count == 1
+
+
+def test_workers_flushing_the_same_review_do_not_double_count(db):
+    seller = make_user(db, UserRole.SELLER)
+    review = make_review(db, make_product(db, seller), make_user(db))
+    first, second = HelpfulCountBuffer(), HelpfulCountBuffer()
+    vote(db, first, review, make_user(db))
+    vote(db, second, review, make_user(db))
+    vote(db, second, review, make_user(db))
+    assert first.flush(db) == 1
+    assert second.flush(db) == 1
+    db.refresh(review)
+    assert review.helpful_count == 3
+
+
+def test_votes_from_a_lost_buffer_are_recounted(db):
+    seller = make_user(db, UserRole.SELLER)
+    review = make_review(db, make_product(db, seller), make_user(db))
+    untouched = make_review(db, make_product(db, seller), make_user(db))
+    crashed = HelpfulCountBuffer()
+    for _ in range(2):
+        vote(db, crashed, review, make_user(db))
+    assert recount_all(db) == 1
+    db.refresh(review)
+    db.refresh(untouched)
+    assert review.helpful_count == count_votes(db, review.id) == 2
+    assert untouched.helpful_count == 0
+
+
+def test_helpful_endpoint_counts_a_repeat_vote_once(client, admin_headers, buyer_headers):
+    review = client.post(
+        "/reviews/product/1", json={"rating": 4, "title": "Solid", "comment": "Does the job"}, headers=admin_headers
+    )
+    assert review.status_code == 200, review.text
+    review_id = review.json()["id"]
+    first = client.post(f"/reviews/{review_id}/helpful", headers=buyer_headers).json()
+    again = client.post(f"/reviews/{review_id}/helpful", headers=buyer_headers).json()
+    assert again["message"] == "Already marked as helpful"
+    assert first["helpful_count"] == again["helpful_count"] == 1
@@ -0,0 +1,38 @@
+import asyncio
+import json
+
+from app import jobs
+
+
+def test_import_reports_bad_rows_and_wakes_workers_on_the_loop(client, seller_headers, monkeypatch):
+    woken = []
+    monkeypatch.setattr(jobs, "notify", lambda: woken.append(asyncio.get_running_loop()))
+    csv = (
+        "name,slug,price\n"
+        "Imported Tool,imported-tool-038,12.5\n"
+        "Free Tool,free-tool-038,0\n"
+        "Imported Kit,imported-kit-038,3\n"
+    )
+    response = client.post(
+        "/seller/products/import",
+        files={"file": ("products.csv", csv, "text/csv")},
+        headers=seller_headers
+    )
+    assert response.status_code == 200, response.text
+    result = response.json()
+    assert result["created"] == 2
+    assert result["failed"] == 1
+    assert [error["row"] for error in result["errors"]] == [3]
+    assert len(woken) == 1
+
+
+def test_ndjson_rows_with_bad_json_are_reported(client, seller_headers):
+    lines = [json.dumps({"name": "Line Tool", "slug": "line-tool-038", "price": 4}), "{not json"]
+    response = client.post(
+        "/seller/products/import?format=ndjson",
+        files={"file": ("products.txt", "\n".join(lines), "text/plain")},
+        headers=seller_headers
+    )
+    assert response.status_code == 200, response.text
+    assert response.json()["created"] == 1
+    assert response.json()["errors"][0]["row"] == 2
@@ -0,0 +1,101 @@
+import asyncio
+import multiprocessing
+import time
+
+import pytest
+
+from app.cache import LRUCache
+from app.events import InvalidationBus, LocalTransport, POLL_INTERVAL, configured_workers, create_transport
+
+WORKERS = 4
+STALENESS_BOUND = POLL_INTERVAL + 0.5
+
+
+def worker(url: str, ready, results) -> None:
+    async def run():
+        cache = LRUCache()
+        for product_id in (1, 2, 3):
+            cache.set(product_id, f"product {product_id}")
+        bus = InvalidationBus(create_transport(url))
+        evicted = asyncio.Event()
+        lags = []
+
+        @bus.subscribe("product.changed")
+        def on_products_changed(payload):
+            for product_id in payload["ids"]:
+                cache.invalidate(product_id)
+            lags.append(time.time() - payload["sent_at"])
+            evicted.set()
+
+        await bus.start()
+        ready.release()
+        try:
+            await asyncio.wait_for(evicted.wait(), timeout=10)
+        finally:
+            await bus.stop()
+        results.put((lags[0], sorted(cache._data)))
+
+    asyncio.run(run())
+
+
+def test_sqlite_bus_evicts_in_every_worker(tmp_path):
+    url = f"sqlite:///{tmp_path / 'events.db'}"
+    context = multiprocessing.get_context("spawn")
+    ready = context.Semaphore(0)
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(url, ready, results)) for _ in range(WORKERS)]
+    for process in processes:
+        process.start()
+    try:
+        for _ in processes:
+            assert ready.acquire(timeout=30), "worker did not start"
+
+        publisher = InvalidationBus(create_transport(url))
+        publisher.publish("product.changed", {"ids": [2], "sent_at": time.time()}, local=False)
+
+        outcomes = [results.get(timeout=15) for _ in processes]
+    finally:
+        for process in processes:
+            process.join(timeout=15)
+            if process.is_alive():
+                process.kill()
+
+    assert len(outcomes) == WORKERS
+    for lag, remaining in outcomes:
+        assert remaining == [1, 3]
+        assert lag <= STALENESS_BOUND
+
+
+def test_publisher_skips_its_own_events(tmp_path):
+    bus = InvalidationBus(create_transport(f"sqlite:///{tmp_path / 'events.db'}"))
+    seen = []
+    bus.subscribe("product.changed")(seen.append)
+
+    async def run():
+        await bus.start()
+        bus.publish("product.changed", {"ids": [1]})
+        await asyncio.sleep(POLL_INTERVAL * 3)
+        await bus.stop()
+
+    asyncio.run(run())
+    assert seen == [{"ids": [1]}]
+
+
+@pytest.mark.parametrize("argv, environ, expected", [
+    (["uvicorn", "app.main:app"], {}, 1),
+    (["uvicorn", "app.main:app", "--workers", "4"], {}, 4),
+    (["fastapi", "run", "--workers=2"], {}, 2),
+    (["gunicorn", "-w", "3", "app.main:app"], {}, 3),
+    (["uvicorn", "app.main:app"], {"WEB_CONCURRENCY": "8"}, 8),
+])
+def test_configured_workers(monkeypatch, argv, environ, expected):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    for name, value in environ.items():
+        monkeypatch.setenv(name, value)
+    assert configured_workers(argv) == expected
+
+
+def test_local_bus_refuses_several_workers(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    with pytest.raises(RuntimeError, match="INVALIDATION_BUS"):
+        asyncio.run(InvalidationBus(LocalTransport()).start())
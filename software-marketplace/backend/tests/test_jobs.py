@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+from app import jobs
+from app.models import Job, JobLease, JobStatus
+
+
+def claim_and_run(db, worker_id="worker-1"):
+    job = jobs.claim_next(db, worker_id)
+    if job is not None:
+        jobs.run_job(db, job)
+    return job
+
+
+def test_jobs_exist_only_when_the_transaction_commits(db):
+    jobs.enqueue(db, "test.noop", {})
+    db.rollback()
+    assert db.query(Job).count() == 0
+
+
+def test_a_successful_job_completes(db, monkeypatch):
+    seen = []
+    monkeypatch.setitem(jobs._handlers, "test.record", lambda payload, db: seen.append(payload))
+    jobs.enqueue(db, "test.record", {"order_id": 7})
+    db.commit()
+    job = claim_and_run(db)
+    assert seen == [{"order_id": 7}]
+    assert (job.status, job.attempts, job.locked_by) == (JobStatus.COMPLETED, 1, None)
+    assert jobs.claim_next(db, "worker-1") is None
+
+
+def test_failures_back_off_then_go_to_the_dead_letter_state(db, monkeypatch):
+    def fail(payload, db):
+        raise RuntimeError("boom")
+
+    monkeypatch.setitem(jobs._handlers, "test.fail", fail)
+    jobs.enqueue(db, "test.fail", {}, max_attempts=2)
+    db.commit()
+
+    job = claim_and_run(db)
+    assert job.status == JobStatus.PENDING
+    assert job.run_at > datetime.utcnow() + jobs.backoff_delay(1) - timedelta(seconds=5)
+    assert jobs.claim_next(db, "worker-1") is None
+
+    job.run_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    job = claim_and_run(db)
+    assert job.status == JobStatus.DEAD
+    assert job.attempts == 2
+    assert "boom" in job.last_error
+
+
+def test_unknown_job_names_fail_instead_of_vanishing(db):
+    jobs.enqueue(db, "test.unregistered", {}, max_attempts=1)
+    db.commit()
+    job = claim_and_run(db)
+    assert job.status == JobStatus.DEAD
+    assert "No handler registered" in job.last_error
+
+
+def test_backoff_doubles_up_to_the_cap():
+    assert jobs.backoff_delay(1) == timedelta(seconds=jobs.BACKOFF_BASE_SECONDS)
+    assert jobs.backoff_delay(3) == timedelta(seconds=jobs.BACKOFF_BASE_SECONDS * 4)
+    assert jobs.backoff_delay(50) == timedelta(seconds=jobs.BACKOFF_MAX_SECONDS)
+
+
+def test_one_process_holds_the_sqlite_lease_until_it_expires(db, monkeypatch):
+    assert jobs.acquire_lease(db)
+    assert jobs.acquire_lease(db)
+    owner = jobs._process_id
+    monkeypatch.setattr(jobs, "_process_id", "other-process")
+    assert not jobs.acquire_lease(db)
+    lease = db.get(JobLease, jobs.LEASE_NAME)
+    lease.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.commit()
+    assert jobs.acquire_lease(db)
+    assert db.get(JobLease, jobs.LEASE_NAME).holder != owner
+
+
+def test_jobs_stuck_running_are_requeued(db):
+    job = jobs.enqueue(db, "test.noop", {})
+    job.status = JobStatus.RUNNING
+    job.locked_by = "crashed-worker"
+    job.locked_at = datetime.utcnow() - jobs.LOCK_TIMEOUT - timedelta(seconds=1)
+    db.commit()
+    assert jobs.requeue_stale(db) == 1
+    db.refresh(job)
+    assert (job.status, job.locked_by) == (JobStatus.PENDING, None)
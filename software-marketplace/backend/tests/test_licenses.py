@@ -0,0 +1,40 @@
+from app.licenses import LicenseIndex
+from app.models import OrderItem, OrderStatus, UserRole
+from tests.factories import make_order, make_product, make_user
+
+
+def test_index_skips_keys_from_revoked_orders(db):
+    seller = make_user(db, UserRole.SELLER)
+    product = make_product(db, seller)
+    buyer = make_user(db)
+    for status, key in [
+        (OrderStatus.COMPLETED, "LIC-AAAAAAAA-00000001"),
+        (OrderStatus.REFUNDED, "LIC-AAAAAAAA-00000002"),
+        (OrderStatus.CANCELLED, "LIC-AAAAAAAA-00000003"),
+    ]:
+        order = make_order(db, buyer, [product], status=status)
+        db.query(OrderItem).filter(OrderItem.order_id == order.id).update({OrderItem.license_key: key})
+    db.commit()
+
+    index = LicenseIndex()
+    index.load(db)
+    assert len(index) == 1
+    assert index.lookup(" lic-aaaaaaaa-00000001 ") == product.id
+    assert index.lookup("LIC-AAAAAAAA-00000002") is None
+    assert index.lookup("junk") is None
+
+
+def test_verify_checks_keys_issued_at_checkout(client, buyer_headers):
+    client.delete("/cart", headers=buyer_headers)
+    client.post("/cart/items", json={"product_id": 2}, headers=buyer_headers)
+    order = client.post(
+        "/orders/checkout", json={"billing_name": "Buyer", "billing_email": "buyer@example.com"}, headers=buyer_headers
+    ).json()
+    key = order["items"][0]["license_key"]
+
+    results = client.post(
+        "/licenses/verify", json={"keys": [key, key.lower(), "LIC-00000000-00000000", "junk"]}
+    ).json()["results"]
+    assert [(r["valid"], r["product_id"]) for r in results] == [(True, 2), (True, 2), (False, None), (False, None)]
+    assert client.post("/licenses/verify", json={"keys": [key], "product_id": 3}).json()["results"][0]["valid"] is False
+    assert client.post("/licenses/verify", json={"keys": []}).status_code == 422
@@ -0,0 +1,68 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from app import media
+
+PNG_HEADER = b"\x89PNG\r\n\x1a\n"
+
+
+def real_png(size=(800, 500)):
+    image_module = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    image_module.new("RGB", size, (40, 120, 200)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def upload(client, headers, data, name="image.png", content_type="image/png"):
+    return client.post("/media", files={"file": (name, data, content_type)}, headers=headers)
+
+
+def test_uploads_are_content_addressed_and_deduplicated(client, buyer_headers):
+    data = PNG_HEADER + os.urandom(5000)
+    first = upload(client, buyer_headers, data)
+    assert first.status_code == 200, first.text
+    assert first.json()["hash"] == hashlib.sha256(data).hexdigest()
+    assert upload(client, buyer_headers, data, name="renamed.png").json()["hash"] == first.json()["hash"]
+
+    original = client.get(first.json()["urls"]["original"])
+    assert original.content == data
+    assert original.headers["content-type"] == "image/png"
+    assert original.headers["cache-control"] == media.IMMUTABLE_CACHE_CONTROL
+
+
+def test_variants_are_rendered_as_bounded_webp(client, buyer_headers):
+    image_module = pytest.importorskip("PIL.Image")
+    urls = upload(client, buyer_headers, real_png()).json()["urls"]
+    thumbnail = client.get(urls["thumbnail"])
+    assert thumbnail.headers["content-type"] == "image/webp"
+    assert thumbnail.headers["cache-control"] == media.IMMUTABLE_CACHE_CONTROL
+    width, height = image_module.open(io.BytesIO(thumbnail.content)).size
+    assert width <= 200 and height <= 200
+
+
+def test_unrenderable_variants_redirect_without_the_immutable_header(client, buyer_headers):
+    urls = upload(client, buyer_headers, PNG_HEADER + os.urandom(3000)).json()["urls"]
+    card = client.get(urls["card"], follow_redirects=False)
+    assert card.status_code == 302
+    assert card.headers["location"] == urls["original"]
+    assert card.headers["cache-control"] == media.FALLBACK_CACHE_CONTROL
+
+
+def test_invalid_uploads_are_refused(client, buyer_headers, monkeypatch):
+    assert upload(client, buyer_headers, b"hello", name="a.txt", content_type="text/plain").status_code == 415
+    assert client.post("/media", files={"other": ("a.png", PNG_HEADER, "image/png")}, headers=buyer_headers).status_code == 400
+    assert upload(client, buyer_headers, PNG_HEADER + b"x").status_code == 200
+    assert client.post("/media", files={"file": ("a.png", PNG_HEADER, "image/png")}).status_code in (401, 403)
+    monkeypatch.setattr(media, "MAX_UPLOAD_BYTES", 1000)
+    assert upload(client, buyer_headers, PNG_HEADER + os.urandom(5000)).status_code == 413
+    leftovers = [name for _, _, names in os.walk(media.MEDIA_ROOT) for name in names if name.endswith(".upload")]
+    assert leftovers == []
+
+
+def test_unknown_media_is_not_found(client):
+    assert client.get("/media/" + "0" * 64 + ".png").status_code == 404
+    assert client.get("/media/" + "0" * 64 + "/card.webp").status_code == 404
+    assert client.get("/media/not-a-digest.png").status_code == 404
@@ -0,0 +1,28 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app import metrics
+
+
+def test_routes_are_reported_by_template(client):
+    client.get("/products/1")
+    client.get("/products/2")
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/products/{product_id}"}' in body
+    assert 'route="/products/1"' not in body
+
+
+def test_failed_queries_do_not_leave_a_start_time_behind(monkeypatch):
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+    durations = []
+    monkeypatch.setattr(metrics.registry, "observe_query", durations.append)
+    with engine.connect() as connection:
+        with pytest.raises(OperationalError):
+            connection.execute(text("SELECT * FROM missing_table"))
+        assert connection.info["query_start"] == []
+        connection.execute(text("SELECT 1"))
+        assert connection.info["query_start"] == []
+    assert len(durations) == 2
+    assert durations[1] < 1
@@ -0,0 +1,36 @@
+from app.migrations import backfill_order_snapshots
+from app.models import OrderItem, UserRole
+from tests.factories import make_order, make_product, make_user
+
+
+def test_backfill_snapshots_existing_items(db):
+    seller = make_user(db, UserRole.SELLER, company_name="Snap Co")
+    product = make_product(db, seller, name="Snap Tool", image_url="/snap.png")
+    order = make_order(db, make_user(db), [product])
+
+    backfill_order_snapshots(db)
+
+    item = db.query(OrderItem).filter(OrderItem.order_id == order.id).one()
+    assert (item.product_name, item.product_slug, item.product_image_url, item.seller_name) == (
+        "Snap Tool", product.slug, "/snap.png", "Snap Co"
+    )
+
+
+def test_orders_keep_the_product_as_purchased(client, seller_headers, buyer_headers):
+    product = client.post("/products", json={
+        "name": "Snapshot Tool", "slug": "snapshot-tool", "price": 12.0, "status": "active"
+    }, headers=seller_headers).json()
+    client.delete("/cart", headers=buyer_headers)
+    client.post("/cart/items", json={"product_id": product["id"]}, headers=buyer_headers)
+    order = client.post(
+        "/orders/checkout", json={"billing_name": "Buyer", "billing_email": "buyer@example.com"}, headers=buyer_headers
+    ).json()
+
+    client.put(
+        f"/products/{product['id']}", json={"name": "Snapshot Tool 2", "image_url": "/new.png"}, headers=seller_headers
+    )
+    snapshot = client.get(f"/orders/{order['id']}", headers=buyer_headers).json()["items"][0]["product"]
+    assert (snapshot["name"], snapshot["slug"], snapshot["image_url"]) == ("Snapshot Tool", "snapshot-tool", None)
+    listed = client.get("/orders", headers=buyer_headers).json()["orders"]
+    assert next(o for o in listed if o["id"] == order["id"])["items"][0]["product"]["name"] == "Snapshot Tool"
+
@@ -0,0 +1,39 @@
+import re
+from app.profiling import ProfileStore, ProfilingMiddleware, StoredProfile
+
+
+def stored(profile_id: str) -> StoredProfile:
+    return StoredProfile(profile_id, "GET", "/products", "/products", "requested", 200, 0.0, 0.01, 1, "a;b 1\n")
+
+
+def test_store_keeps_the_newest_profiles(tmp_path):
+    store = ProfileStore(str(tmp_path), max_entries=2)
+    for index in range(3):
+        store.add(stored(f"{index:016x}"))
+    assert len(store.list()) == 2
+    assert store.get("../../etc/passwd") is None
+
+
+def test_sampling_counts_requests_per_route(client):
+    middleware = ProfilingMiddleware(None, routes=client.app.router.routes, sample_every=3)
+    scopes = [
+        {"type": "http", "method": "GET", "path": f"/products/{i}", "root_path": "", "query_string": b"", "headers": []}
+        for i in range(6)
+    ]
+    assert [middleware.should_sample(scope) for scope in scopes] == [False, False, True, False, False, True]
+
+
+def test_admins_can_profile_a_request(client, admin_headers, buyer_headers):
+    assert "x-profile-id" not in client.get("/products", headers={**buyer_headers, "X-Profile": "1"}).headers
+
+    response = client.get("/products?_profile=1", headers=admin_headers)
+    profile_id = response.headers["x-profile-id"]
+
+    assert client.get("/admin/profiles", headers=buyer_headers).status_code == 403
+    summaries = client.get("/admin/profiles", headers=admin_headers).json()
+    summary = next(s for s in summaries if s["id"] == profile_id)
+    assert summary["route"] == "/products"
+    assert summary["status_code"] == 200
+
+    collapsed = client.get(f"/admin/profiles/{profile_id}", headers=admin_headers).text
+    assert all(re.fullmatch(r".+ \d+", line) for line in collapsed.splitlines())
@@ -0,0 +1,77 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token
+from app.ratelimit import (
+    MemoryBucketStore, RateLimit, RateLimitMiddleware, RateLimitRule, SQLiteBucketStore, configure_rules, has_search
+)
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda tmp_path: MemoryBucketStore(idle_after=60),
+    lambda tmp_path: SQLiteBucketStore(str(tmp_path / "buckets.db"), idle_after=60),
+])
+def test_bucket_allows_the_burst_then_refills(tmp_path, make_store):
+    store, limit = make_store(tmp_path), RateLimit(2, 10)
+    assert [store.take("k", limit, 100.0) for _ in range(2)] == [0.0, 0.0]
+    assert store.take("k", limit, 100.0) == pytest.approx(5.0)
+    assert store.take("k", limit, 105.0) == 0.0
+    assert store.take("other", limit, 105.0) == 0.0
+
+
+def test_sqlite_buckets_are_shared_between_workers(tmp_path):
+    path, limit = str(tmp_path / "buckets.db"), RateLimit(1, 60)
+    first, second = SQLiteBucketStore(path, 60), SQLiteBucketStore(path, 60)
+    assert first.take("login:ip:1", limit, 0.0) == 0.0
+    assert second.take("login:ip:1", limit, 1.0) > 0
+
+
+def test_overrides_replace_named_limits():
+    rules = configure_rules([RateLimitRule("login", "POST", "/login", RateLimit(10, 60))], "login=3/30,unknown=1/1")
+    assert (rules[0].limit.burst, rules[0].limit.rate) == (3, 0.1)
+
+
+@pytest.fixture
+def limited():
+    app = FastAPI()
+
+    @app.post("/login")
+    def login():
+        return {"ok": True}
+
+    @app.get("/search")
+    def search(search: str = ""):
+        return {"ok": True}
+
+    rules = [
+        RateLimitRule("login", "POST", "/login", RateLimit(2, 60)),
+        RateLimitRule("search", "GET", "/search", RateLimit(1, 60), per_user=True, when=has_search),
+    ]
+    app.add_middleware(RateLimitMiddleware, rules=rules, store=MemoryBucketStore(idle_after=60))
+    return TestClient(app), rules
+
+
+def test_rejected_requests_get_429_with_retry_after(limited):
+    client, _ = limited
+    assert [client.post("/login").status_code for _ in range(3)] == [200, 200, 429]
+    rejected = client.post("/login")
+    assert int(rejected.headers["retry-after"]) >= 1
+    assert rejected.json() == {"detail": "Too many requests"}
+
+
+def test_search_is_limited_per_user_and_only_with_a_query(limited):
+    client, _ = limited
+    alice = {"Authorization": f"Bearer {create_access_token({'sub': '101'})}"}
+    bob = {"Authorization": f"Bearer {create_access_token({'sub': '102'})}"}
+    assert client.get("/search?search=code", headers=alice).status_code == 200
+    assert client.get("/search?search=code", headers=alice).status_code == 429
+    assert client.get("/search?search=code", headers=bob).status_code == 200
+    assert client.get("/search", headers=alice).status_code == 200
+
+
+def test_requests_over_the_in_flight_cap_are_shed(limited):
+    client, rules = limited
+    rules[0].max_in_flight = 1
+    rules[0].in_flight = 1
+    assert client.post("/login").status_code == 503
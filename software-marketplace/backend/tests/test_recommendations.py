@@ -0,0 +1,50 @@
+from app.models import UserRole
+from app.recommendations import CoPurchaseIndex
+from tests.factories import make_order, make_product, make_user
+
+
+def test_neighbors_rank_by_co_purchase_count_then_id():
+    index = CoPurchaseIndex(top_k=2)
+    index.add_order([1, 2, 3])
+    index.add_order([1, 3])
+    index.add_order([1, 4])
+    index.add_order([5])
+    assert index.neighbors(1, 10) == (3, 2)
+    assert index.neighbors(3, 1) == (1,)
+    assert index.neighbors(5, 10) == ()
+
+
+def test_orders_listing_a_product_twice_count_once():
+    index = CoPurchaseIndex()
+    index.add_order([1, 1, 2])
+    index.add_order([2, 3])
+    index.add_order([2, 3])
+    assert index.neighbors(2, 10) == (3, 1)
+
+
+def test_load_rebuilds_the_index_from_order_history(db):
+    seller, buyer = make_user(db, UserRole.SELLER), make_user(db)
+    first, second, third = (make_product(db, seller) for _ in range(3))
+    make_order(db, buyer, [first, second])
+    make_order(db, buyer, [first, second, third])
+    index = CoPurchaseIndex()
+    index.add_order([first.id, 999])
+    index.load(db)
+    assert index.neighbors(first.id, 10) == (second.id, third.id)
+    assert index.neighbors(999, 10) == ()
+
+
+def test_checkout_updates_also_bought(client, buyer_headers):
+    first, second = [product["id"] for product in client.get("/products?page_size=2").json()["products"]]
+    client.delete("/cart", headers=buyer_headers)
+    client.patch(
+        "/cart", json={"operations": [{"op": "add", "product_id": first}, {"op": "add", "product_id": second}]},
+        headers=buyer_headers
+    )
+    order = client.post(
+        "/orders/checkout", json={"billing_name": "Buyer", "billing_email": "buyer@example.com"}, headers=buyer_headers
+    )
+    assert order.status_code == 200, order.text
+    related = client.get(f"/products/{first}/also-bought?view=summary").json()
+    assert second in [product["id"] for product in related]
+    assert "description" not in related[0]
@@ -0,0 +1,36 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from app import responses
+from app.responses import FastJSONResponse, JSONFragment, render_json
+from app.schemas import FacetCount
+
+
+def test_fragments_are_spliced_in_verbatim():
+    body = render_json({"total": 2, "items": [JSONFragment(b'{"id":1}'), {"id": 2}], "at": datetime(2026, 1, 2)})
+    assert json.loads(body) == {"total": 2, "items": [{"id": 1}, {"id": 2}], "at": "2026-01-02T00:00:00"}
+    assert b'{"id":1}' in body
+
+
+@pytest.mark.parametrize("with_orjson", [True, False])
+def test_fast_response_matches_the_standard_encoding(monkeypatch, with_orjson):
+    if with_orjson:
+        pytest.importorskip("orjson")
+    else:
+        monkeypatch.setattr(responses, "orjson", None)
+    content = {"name": "Tool", "price": 9.5, 3: [1, 2], "created": datetime(2026, 1, 2, 3, 4, 5)}
+    assert json.loads(FastJSONResponse(content).body) == {
+        "name": "Tool", "price": 9.5, "3": [1, 2], "created": "2026-01-02T03:04:05"
+    }
+    models = [FacetCount(value="software", count=2)]
+    assert json.loads(FastJSONResponse(models).body) == [{"value": "software", "count": 2}]
+
+
+def test_listing_and_cart_endpoints_render_fast_json(client, buyer_headers):
+    listing = client.get("/products?page_size=3")
+    assert listing.status_code == 200
+    assert listing.headers["content-type"] == "application/json"
+    assert len(listing.json()["products"]) == 3
+    assert client.get("/cart", headers=buyer_headers).json()["item_count"] >= 0
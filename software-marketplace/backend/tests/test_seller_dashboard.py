@@ -0,0 +1,25 @@
+def test_dashboard_matches_the_individual_endpoints(client, seller_headers):
+    dashboard = client.get("/seller/dashboard?orders_page_size=5", headers=seller_headers)
+    assert dashboard.status_code == 200, dashboard.text
+    dashboard = dashboard.json()
+    products = client.get("/seller/products", headers=seller_headers).json()
+    orders = client.get("/seller/orders?page_size=5", headers=seller_headers).json()
+    reviews = client.get("/seller/reviews", headers=seller_headers).json()
+    analytics = client.get("/seller/analytics", headers=seller_headers).json()
+
+    assert [product["id"] for product in dashboard["products"]] == [product["id"] for product in products]
+    assert dashboard["recent_orders"] == orders
+    assert len(dashboard["recent_orders"]) <= 5
+    assert dashboard["recent_reviews"] == reviews
+    assert dashboard["analytics"]["total_products"] == analytics["total_products"] == len(products)
+    assert set(dashboard["timings_ms"]) == {"analytics", "products", "recent_orders", "recent_reviews"}
+
+
+def test_sellers_without_products_get_an_empty_dashboard(client, admin_headers):
+    dashboard = client.get("/seller/dashboard", headers=admin_headers).json()
+    assert dashboard["products"] == dashboard["recent_orders"] == dashboard["recent_reviews"] == []
+    assert dashboard["analytics"]["total_orders"] == 0
+
+
+def test_buyers_cannot_see_a_dashboard(client, buyer_headers):
+    assert client.get("/seller/dashboard", headers=buyer_headers).status_code == 403
@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from app.models import ProductSimilarity, UserRole
+from app.similarity import MIN_CAPACITY, SimilarityIndex
+from tests.factories import make_product, make_user
+
+TEXTS = [
+    "code editor with debugger and linting",
+    "python code linting and static analysis",
+    "cloud backup for databases",
+    "database backup and restore scheduler",
+    "video editor with color grading",
+    "audio editor and mixer",
+]
+
+
+def persisted(db):
+    rows = db.query(ProductSimilarity).order_by(ProductSimilarity.product_id, ProductSimilarity.rank)
+    lists = {}
+    for row in rows:
+        lists.setdefault(row.product_id, []).append(row.similar_product_id)
+    return lists
+
+
+def fresh_build(db):
+    SimilarityIndex().build(db)
+    db.flush()
+    return persisted(db)
+
+
+def test_refresh_on_a_stale_worker_writes_current_neighbors(db):
+    seller = make_user(db, UserRole.SELLER)
+    products = [make_product(db, seller, name=text.split()[0].title(), description=text) for text in TEXTS]
+    first, second = SimilarityIndex(), SimilarityIndex()
+    first.build(db)
+    second.refresh_product(db, products[0].id)
+    db.commit()
+
+    # A write handled by the first worker; the second has not seen it.
+    products[4].description = "python code review and static analysis"
+    db.commit()
+    first.refresh_product(db, products[4].id)
+    db.commit()
+
+    # The second worker now handles an unrelated product and persists its own view.
+    products[2].description = "cloud backup and database snapshots"
+    db.commit()
+    second.refresh_product(db, products[2].id)
+    db.commit()
+
+    assert persisted(db) == fresh_build(db)
+
+
+def test_deleted_product_leaves_every_list(db):
+    seller = make_user(db, UserRole.SELLER)
+    products = [make_product(db, seller, description=text) for text in TEXTS]
+    index = SimilarityIndex()
+    index.build(db)
+    db.commit()
+    gone = products[1]
+    db.delete(gone)
+    db.commit()
+
+    SimilarityIndex().refresh_product(db, gone.id)
+    db.commit()
+    assert all(gone.id not in neighbors for neighbors in persisted(db).values())
+
+
+def test_matrix_grows_geometrically(db):
+    seller = make_user(db, UserRole.SELLER)
+    make_product(db, seller, description=TEXTS[0])
+    index = SimilarityIndex()
+    index.build(db)
+    capacities = set()
+    for i in range(MIN_CAPACITY + 5):
+        product = make_product(db, seller, description=TEXTS[i % len(TEXTS)])
+        index.refresh_product(db, product.id)
+        capacities.add(len(index.capacity_matrix))
+    assert capacities == {MIN_CAPACITY, 2 * MIN_CAPACITY}
+    assert index.matrix.shape[0] == MIN_CAPACITY + 6
@@ -0,0 +1,26 @@
+def test_summary_view_drops_the_heavy_columns(client):
+    full = client.get("/products?page_size=5").json()["products"][0]
+    summary = client.get("/products?page_size=5&view=summary").json()["products"][0]
+    assert summary["id"] == full["id"]
+    assert "description" in full
+    assert "description" not in summary
+    assert summary["short_description"] == full["short_description"]
+
+
+def test_fields_select_exactly_the_requested_keys(client):
+    products = client.get("/products?fields=name,price,seller").json()["products"]
+    assert products
+    for product in products:
+        assert set(product) == {"id", "name", "price", "seller"}
+        assert set(product["seller"]) >= {"id", "name"}
+
+
+def test_unknown_fields_are_rejected(client):
+    response = client.get("/products?fields=name,bogus")
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Unknown fields: bogus"}
+
+
+def test_fields_apply_to_the_curated_lists(client):
+    for product in client.get("/products/trending?fields=slug,category").json():
+        assert set(product) == {"id", "slug", "category"}
@@ -0,0 +1,63 @@
+import heapq
+import random
+
+from app.models import Product, ProductStatus, UserRole
+from app.suggest import SCAN_LIMIT, SuggestIndex, normalize, word_starts
+from tests.factories import make_category, make_product, make_user
+
+
+def test_every_word_start_is_searchable():
+    assert word_starts("Pro-Code  Guard!") == ["pro code guard", "code guard", "guard"]
+    assert normalize("  Code--Guard ") == "code guard"
+
+
+def test_suggestions_cover_products_sellers_and_categories(db):
+    seller = make_user(db, UserRole.SELLER, company_name="Codeworks")
+    category = make_category(db, name="Code Quality")
+    make_product(db, seller, name="Code Guard", category_id=category.id, download_count=5)
+    make_product(db, seller, name="Guard Rail", download_count=1)
+    make_product(db, seller, name="Codec Draft", status=ProductStatus.DRAFT)
+    index = SuggestIndex()
+    index.load(db)
+    assert {(entry.kind, entry.text) for entry in index.suggest("cod")} == {
+        ("product", "Code Guard"), ("seller", "Codeworks"), ("category", "Code Quality")
+    }
+    assert [entry.text for entry in index.suggest("guard")] == ["Code Guard", "Guard Rail"]
+
+
+def test_cached_prefix_lists_match_a_full_scan_after_purchases(db):
+    random.seed(36)
+    seller = make_user(db, UserRole.SELLER)
+    db.add_all(
+        Product(seller_id=seller.id, name=f"alpha {word} {n}", slug=f"alpha-{n}", price=1, status=ProductStatus.ACTIVE,
+                download_count=random.randint(0, 50))
+        for n, word in enumerate(random.choices(["apex", "atlas", "axis", "beam"], k=SCAN_LIMIT + 100))
+    )
+    db.commit()
+    index = SuggestIndex()
+    index.load(db)
+    products = db.query(Product.id).filter(Product.seller_id == seller.id).all()
+    assert "a" in index._top
+
+    def brute_force(prefix):
+        start, end = index._range(prefix)
+        keys = {(kind, id) for _, kind, id in index._terms[start:end]}
+        return heapq.nlargest(10, keys, key=index._rank)
+
+    for _ in range(200):
+        (product_id,) = random.choice(products)
+        index.record_purchase(product_id, random.randint(1, 3))
+        for prefix in ("a", "al", "alpha", "alpha a"):
+            assert [(entry.kind, entry.id) for entry in index.suggest(prefix)] == brute_force(prefix)
+
+
+def test_suggest_endpoint_follows_product_writes(client, seller_headers):
+    created = client.post(
+        "/products", json={"name": "Quixotic Turbo", "slug": "quixotic-turbo", "price": 10, "status": "active"},
+        headers=seller_headers
+    ).json()
+    assert "Quixotic Turbo" in [entry["text"] for entry in client.get("/products/suggest?q=quixo").json()]
+    client.put(f"/products/{created['id']}", json={"name": "Zanzibar Turbo"}, headers=seller_headers)
+    assert client.get("/products/suggest?q=quixo").json() == []
+    client.delete(f"/products/{created['id']}", headers=seller_headers)
+    assert client.get("/products/suggest?q=zanzi").json() == []
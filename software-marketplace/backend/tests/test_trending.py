@@ -0,0 +1,56 @@
+import math
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import trending
+from app.models import Product, UserRole
+from tests.factories import make_product, make_user
+
+
+def test_scores_stay_finite_far_from_the_epoch(monkeypatch):
+    monkeypatch.setattr(trending, "HALF_LIFE_HOURS", 1.0)
+    at = trending.EPOCH + timedelta(days=3650)
+    score = trending.add_score(0.0, trending.PURCHASE_WEIGHT, at)
+    assert math.isfinite(score)
+    assert trending.current_score(score, at) == pytest.approx(trending.PURCHASE_WEIGHT, rel=1e-9)
+
+
+def test_older_events_decay_by_half_each_half_life():
+    now = datetime(2026, 6, 1)
+    old = trending.add_score(0.0, 8.0, now - timedelta(hours=trending.HALF_LIFE_HOURS))
+    fresh = trending.add_score(0.0, 4.0, now)
+    assert old == pytest.approx(fresh)
+    combined = trending.add_score(old, 4.0, now)
+    assert trending.current_score(combined, now) == pytest.approx(8.0, rel=1e-6)
+
+
+@pytest.mark.parametrize("value", ["0", "-5", "abc", "inf", "nan"])
+def test_invalid_half_life_is_rejected(value):
+    with pytest.raises(ValueError, match="TRENDING_HALF_LIFE_HOURS"):
+        trending._half_life_hours(value)
+
+
+def test_recorded_events_rank_products(db):
+    seller = make_user(db, UserRole.SELLER)
+    viewed = make_product(db, seller)
+    bought = make_product(db, seller)
+    for _ in range(3):
+        trending.record_view(viewed.id, db)
+    trending.record_purchase(bought.id, 1, db)
+    db.commit()
+
+    ranked = db.query(Product).order_by(Product.trending_score.desc()).all()
+    assert [product.id for product in ranked] == [bought.id, viewed.id]
+    assert viewed.view_count == 3 and bought.download_count == 1
+
+
+def test_linear_scores_are_converted_once(db):
+    from app import migrations
+
+    seller = make_user(db, UserRole.SELLER)
+    product = make_product(db, seller, trending_score=2.0 ** 200)
+    migrations.run_data_migrations(db)
+    migrations.run_data_migrations(db)
+    db.refresh(product)
+    assert product.trending_score == pytest.approx(200.0)
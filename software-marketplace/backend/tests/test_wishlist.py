@@ -0,0 +1,37 @@
+from app.cache import WishlistMembershipCache
+
+
+def test_a_load_racing_a_change_is_not_cached():
+    cache = WishlistMembershipCache()
+
+    def stale_load():
+        cache.add(1, 7)
+        return [3]
+
+    assert cache.members(1, stale_load) == {3}
+    assert cache.members(1, lambda: [3, 7]) == {3, 7}
+    cache.discard(1, 3)
+    assert cache.members(1, lambda: []) == {7}
+
+
+def test_invalidation_during_a_load_wins():
+    cache = WishlistMembershipCache()
+
+    def stale_load():
+        cache.invalidate(1)
+        return [3]
+
+    cache.members(1, stale_load)
+    assert cache.members(1, lambda: [4]) == {4}
+
+
+def test_check_endpoints_follow_adds_and_removes(client, buyer_headers):
+    assert client.post("/wishlist/check", json={"product_ids": [3, 4]}, headers=buyer_headers).json() == {
+        "product_ids": []
+    }
+    assert client.post("/wishlist", json={"product_id": 4}, headers=buyer_headers).status_code == 200
+    assert client.post("/wishlist/check", json={"product_ids": [3, 4, 4]}, headers=buyer_headers).json() == {
+        "product_ids": [4]
+    }
+    assert client.delete("/wishlist/4", headers=buyer_headers).status_code == 200
+    assert client.get("/wishlist/check/4", headers=buyer_headers).json() == {"in_wishlist": False}
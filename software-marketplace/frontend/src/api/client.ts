@@ -10,8 +10,10 @@ import type {
   WishlistItem,
   Order,
   OrderListResponse,
+  DownloadLink,
   Review,
   SellerAnalytics,
+  SellerDashboard,
   SellerOrder,
 } from '../types';
 
@@ -215,6 +217,11 @@ class ApiClient {
     return this.request<Order>(`/orders/${id}`);
   }
 
+  async getDownloadUrl(order_item_id: number): Promise<string> {
+    const link = await this.request<DownloadLink>(`/downloads/items/${order_item_id}`, { method: 'POST' });
+    return `${API_URL}${link.url}`;
+  }
+
   async checkout(data: {
     payment_method?: string;
     billing_name: string;
@@ -256,6 +263,10 @@ class ApiClient {
     });
   }
 
+  async getSellerDashboard(): Promise<SellerDashboard> {
+    return this.request<SellerDashboard>('/seller/dashboard');
+  }
+
   async getSellerAnalytics(): Promise<SellerAnalytics> {
     return this.request<SellerAnalytics>('/seller/analytics');
   }
@@ -41,6 +41,14 @@ export function OrderDetail() {
     fetchOrder();
   }, [id, isAuthenticated]);
 
+  const handleDownload = async (orderItemId: number) => {
+    try {
+      window.location.href = await api.getDownloadUrl(orderItemId);
+    } catch (error) {
+      console.error('Failed to start download:', error);
+    }
+  };
+
   if (!isAuthenticated) {
     return (
       <div className="container mx-auto px-4 py-16 text-center">
@@ -165,7 +173,17 @@ export function OrderDetail() {
                           <p className="font-mono text-sm">{item.license_key}</p>
                         </div>
                       )}
-                      {item.download_url && (
+                      {item.download_url?.startsWith('/downloads/') ? (
+                        <Button
+                          variant="outline"
+                          size="sm"
+                          className="mt-2"
+                          onClick={() => handleDownload(item.id)}
+                        >
+                          <Download className="mr-1 h-4 w-4" />
+                          Download
+                        </Button>
+                      ) : item.download_url && (
                         <a
                           href={item.download_url}
                           target="_blank"
@@ -52,16 +52,11 @@ export function SellerDashboard() {
     const fetchData = async () => {
       setIsLoading(true);
       try {
-        const [analyticsData, productsData, ordersData, reviewsData] = await Promise.all([
-          api.getSellerAnalytics(),
-          api.getSellerProducts(),
-          api.getSellerOrders(),
-          api.getSellerReviews(),
-        ]);
-        setAnalytics(analyticsData);
-        setProducts(productsData);
-        setOrders(ordersData);
-        setReviews(reviewsData);
+        const dashboard = await api.getSellerDashboard();
+        setAnalytics(dashboard.analytics);
+        setProducts(dashboard.products);
+        setOrders(dashboard.recent_orders);
+        setReviews(dashboard.recent_reviews);
       } catch (error) {
         console.error('Failed to fetch seller data:', error);
       } finally {
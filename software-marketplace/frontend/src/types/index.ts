@@ -118,6 +118,15 @@ export interface WishlistItem {
   created_at: string;
 }
 
+export interface OrderProductSnapshot {
+  id: number;
+  name: string;
+  slug?: string;
+  image_url?: string;
+  seller_name?: string;
+  license_type?: LicenseType;
+}
+
 export interface OrderItem {
   id: number;
   product_id: number;
@@ -125,7 +134,7 @@ export interface OrderItem {
   price: number;
   license_key?: string;
   download_url?: string;
-  product?: Product;
+  product?: OrderProductSnapshot;
 }
 
 export interface Order {
@@ -148,6 +157,11 @@ export interface Order {
   updated_at: string;
 }
 
+export interface DownloadLink {
+  url: string;
+  expires_at: string;
+}
+
 export interface OrderListResponse {
   orders: Order[];
   total: number;
@@ -176,6 +190,14 @@ export interface SellerOrder {
   created_at: string;
 }
 
+export interface SellerDashboard {
+  analytics: SellerAnalytics;
+  products: Product[];
+  recent_orders: SellerOrder[];
+  recent_reviews: Review[];
+  timings_ms: Record<string, number>;
+}
+
 export interface Token {
   access_token: string;
   token_type: string;